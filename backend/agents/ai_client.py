@@ -9,17 +9,71 @@ Supports multiple AI providers with automatic fallback:
 5. Anthropic Claude (paid)
 
 Falls back to next provider if one fails.
+
+Calls honour the request's deadline (see backend/deadlines.py): each provider
+gets at most the remaining time, a cancelled request abandons its pending
+call, and no fallback starts once the deadline has passed.
+
+generate(..., hedge=True) is for latency-sensitive calls: if a provider has
+not answered within its p90 latency, the next provider is started as well
+and the first answer wins (within a global hedge budget, see hedging.py).
+
+Every provider call first takes a slot from scheduler.provider_queue, so
+interactive calls get ahead of batch work when providers are busy.
+
+With LOCAL_LLM_BASE_URL set, a locally hosted OpenAI-compatible model is
+added as the "Local" provider (see local_llm.py). Callers name their `task`,
+and tasks in LOCAL_LLM_TASKS (hashtags, short drafts, JSON repair) try it
+before the remote providers; other tasks use it only as the last fallback.
+
+Set AI_CLIENT_MODE to run reproducibly:
+- record: call providers as usual and save every response to AI_REPLAY_PATH
+- replay: serve recorded responses only, with no network access
+  (AI_REPLAY_LATENCY=true sleeps for the recorded latency)
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, wait, FIRST_COMPLETED
 from pathlib import Path
 from dotenv import load_dotenv
+import contextvars
 import json
+import time
+
+from .. import usage_ledger, deadlines, scheduler
+from .replay_store import ReplayStore
+from .hedging import LatencyStats, HedgeBudget
+from .local_llm import LocalLLM, LOCAL_LLM_BASE_URL, LOCAL_LLM_MODEL
 
 # Load .env from the backend directory
 env_path = Path(__file__).resolve().parent.parent / '.env'
 load_dotenv(env_path)
 
+# Threads running provider calls for requests with a deadline, so the request
+# can walk away from a call that is still waiting on the network
+PROVIDER_CALL_THREADS = int(os.getenv("PROVIDER_CALL_THREADS", "16"))
+# Upper bound for one provider call in seconds (0 = SDK default). Calls abandoned by a
+# cancelled request keep their provider slot until they end, so this bounds that too
+PROVIDER_CALL_TIMEOUT = float(os.getenv("PROVIDER_CALL_TIMEOUT", "120"))
+# How often a waiting request checks whether it was cancelled
+CANCEL_POLL_SECONDS = 0.25
+
+# Tasks callers pass to generate(task=...) for provider routing
+HASHTAGS = "hashtags"
+SHORT_DRAFT = "short_draft"
+JSON_REPAIR = "json_repair"
+LONG_FORM = "long_form"
+# Tasks sent to the local model first, and whether other tasks may fall back to it
+LOCAL_LLM_TASKS = {t.strip() for t in os.getenv("LOCAL_LLM_TASKS", "hashtags,short_draft,json_repair").split(",") if t.strip()}
+LOCAL_LLM_FALLBACK = os.getenv("LOCAL_LLM_FALLBACK", "true").lower() == "true"
+# Platforms whose posts count as short drafts
+SHORT_FORM_PLATFORMS = {"twitter", "x"}
+
+
+def draft_task(platform: str) -> str:
+    """Routing task for writing a post for `platform`."""
+    return SHORT_DRAFT if (platform or "").lower() in SHORT_FORM_PLATFORMS else LONG_FORM
+
 
 class AIClient:
     """
@@ -29,11 +83,35 @@ class AIClient:
     
     def __init__(self):
         self.providers = []
+        self.mode = os.getenv("AI_CLIENT_MODE", "live").lower()
+        self.replay_store = None
+        self._call_pool = _new_call_pool()
+        self.latency = LatencyStats()
+        self.hedge_budget = HedgeBudget()
+        if self.mode in ("record", "replay"):
+            self.replay_store = ReplayStore(os.getenv("AI_REPLAY_PATH", "./ai_replay.sqlite"))
+        self._init_providers()
+        
+    def reset_providers(self):
+        """Re-create provider clients, e.g. in a worker process forked from a preloaded master."""
+        self.providers = []
+        self._call_pool = _new_call_pool()
         self._init_providers()
         
     def _init_providers(self):
         """Initialize available AI providers based on API keys."""
         
+        # Offline replay replaces every remote provider
+        if self.mode == "replay":
+            self.providers.append({
+                "name": "Replay",
+                "model": "replay",
+                "client": self.replay_store,
+                "generate": self._replay_generate
+            })
+            print(f"[AIClient] ✓ Replay mode ({self.replay_store.count()} recorded responses)")
+            return
+        
         # 1. Google Gemini (FREE tier available)
         gemini_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
         if gemini_key:
@@ -42,6 +120,7 @@ class AIClient:
                 genai.configure(api_key=gemini_key)
                 self.providers.append({
                     "name": "Gemini",
+                    "model": "gemini-1.5-flash",
                     "client": genai,
                     "generate": self._gemini_generate
                 })
@@ -57,6 +136,7 @@ class AIClient:
                 client = Groq(api_key=groq_key)
                 self.providers.append({
                     "name": "Groq",
+                    "model": "llama-3.3-70b-versatile",
                     "client": client,
                     "generate": self._groq_generate
                 })
@@ -72,6 +152,7 @@ class AIClient:
                 client = cohere.Client(api_key=cohere_key)
                 self.providers.append({
                     "name": "Cohere",
+                    "model": "command",
                     "client": client,
                     "generate": self._cohere_generate
                 })
@@ -87,6 +168,7 @@ class AIClient:
                 client = OpenAI(api_key=openai_key)
                 self.providers.append({
                     "name": "OpenAI",
+                    "model": "gpt-3.5-turbo",
                     "client": client,
                     "generate": self._openai_generate
                 })
@@ -102,6 +184,7 @@ class AIClient:
                 client = anthropic.Anthropic(api_key=anthropic_key)
                 self.providers.append({
                     "name": "Anthropic",
+                    "model": "claude-3-haiku-20240307",
                     "client": client,
                     "generate": self._anthropic_generate
                 })
@@ -109,58 +192,287 @@ class AIClient:
             except ImportError:
                 print("[AIClient] ✗ Anthropic SDK not installed")
         
+        # 6. Local OpenAI-compatible server (llama.cpp, vLLM, Ollama); placed by route()
+        if LOCAL_LLM_BASE_URL:
+            self.providers.append({
+                "name": "Local",
+                "model": LOCAL_LLM_MODEL,
+                "client": LocalLLM(),
+                "generate": self._local_generate,
+                "local": True
+            })
+            print(f"[AIClient] ✓ Local model configured ({LOCAL_LLM_BASE_URL})")
+
         if not self.providers:
             print("[AIClient] ⚠ No AI providers configured! Add API keys to .env")
     
-    def generate(self, prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = 2000) -> str:
+    def route(self, task: str = None) -> list:
+        """
+        Providers to try for `task`, in order: the local model first for
+        LOCAL_LLM_TASKS, otherwise the remote providers with the local model
+        last (if LOCAL_LLM_FALLBACK).
+        """
+        remote = [p for p in self.providers if not p.get("local")]
+        local = [p for p in self.providers if p.get("local")]
+        if task in LOCAL_LLM_TASKS:
+            return local + remote
+        return remote + (local if LOCAL_LLM_FALLBACK else [])
+
+    def generate(self, prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = 2000,
+                 agent: str = None, hedge: bool = False, task: str = None) -> str:
         """
         Generate text using available AI providers with automatic fallback.
+        Every attempt is recorded in the usage ledger, attributed to `agent`.
+        Returns None when all providers fail or the request's deadline passes.
+        With `hedge`, slow providers are raced against the next one (see _generate_hedged).
+        `task` picks the provider order (see route).
         """
-        for provider in self.providers:
+        deadline = deadlines.current()
+        providers = self.route(task)
+        if hedge and len(providers) > 1 and self.hedge_budget.enabled:
+            return self._generate_hedged(providers, prompt, system_prompt, temperature, max_tokens, agent, deadline)
+        for depth, provider in enumerate(providers):
+            if deadline.expired():
+                print(f"[AIClient] ✗ Stopping before {provider['name']} ({deadline.stop_reason()})")
+                return None
+            try:
+                ticket = scheduler.provider_queue.acquire(deadline=deadline)
+            except deadlines.DeadlineExceeded as e:
+                print(f"[AIClient] ✗ No provider slot before the request ended: {e}")
+                return None
+            start = time.monotonic()
             try:
                 print(f"[AIClient] Trying {provider['name']}...")
-                result = provider["generate"](
-                    provider["client"],
-                    prompt,
-                    system_prompt,
-                    temperature,
-                    max_tokens
-                )
-                print(f"[AIClient] ✓ {provider['name']} succeeded")
+                result, usage = self._call(provider, deadline, ticket, prompt, system_prompt, temperature, max_tokens)
+                self._record_success(provider, depth, start, prompt, system_prompt, temperature, max_tokens,
+                                     result, usage, agent)
                 return result
+            except deadlines.DeadlineExceeded as e:
+                print(f"[AIClient] ✗ {provider['name']} abandoned: {e}")
+                usage_ledger.record(
+                    provider=provider["name"], model=provider["model"], agent=agent,
+                    latency_ms=int((time.monotonic() - start) * 1000), fallback_depth=depth,
+                    outcome=deadline.stop_reason(), error=str(e)
+                )
+                return None
             except Exception as e:
                 print(f"[AIClient] ✗ {provider['name']} failed: {e}")
+                usage_ledger.record(
+                    provider=provider["name"], model=provider["model"], agent=agent,
+                    latency_ms=int((time.monotonic() - start) * 1000), fallback_depth=depth,
+                    outcome="error", error=str(e)
+                )
                 continue
         
         print("[AIClient] ⚠ All providers failed!")
         return None
     
-    def generate_json(self, prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = 2000) -> dict:
-        """Generate and parse JSON response."""
+    def _generate_hedged(self, providers: list, prompt: str, system_prompt: str, temperature: float, max_tokens: int,
+                         agent: str, deadline: "deadlines.Deadline") -> str:
+        """
+        Fallback order as in generate(), but providers may overlap: once the
+        newest call has run longer than its provider's p90 latency, the next
+        provider is started too (if the hedge budget allows). The first
+        success wins; calls still running are abandoned and recorded as
+        "hedge_lost" (they end on their own timeout).
+        """
+        self.hedge_budget.earn()
+        pending = {}  # future -> (depth, provider, start)
+        next_depth = 0
+        hedge_checked = set()
+
+        def launch(ticket):
+            nonlocal next_depth
+            provider, depth = providers[next_depth], next_depth
+            next_depth += 1
+            print(f"[AIClient] Trying {provider['name']}...")
+            future = self._call_pool.submit(
+                contextvars.copy_context().run, provider["generate"], provider["client"], provider["model"],
+                prompt, system_prompt, temperature, max_tokens, timeout=_call_timeout(deadline)
+            )
+            # The slot is held until the call really ends, even if it is abandoned
+            future.add_done_callback(lambda _: scheduler.provider_queue.release(ticket))
+            pending[future] = (depth, provider, time.monotonic())
+
+        def abandon(outcome: str, error: str = None):
+            for future, (depth, provider, start) in pending.items():
+                future.cancel()
+                usage_ledger.record(
+                    provider=provider["name"], model=provider["model"], agent=agent,
+                    latency_ms=int((time.monotonic() - start) * 1000), fallback_depth=depth,
+                    outcome=outcome, error=error
+                )
+            pending.clear()
+
+        try:
+            launch(scheduler.provider_queue.acquire(deadline=deadline))
+        except deadlines.DeadlineExceeded as e:
+            print(f"[AIClient] ✗ No provider slot before the request ended: {e}")
+            return None
+        while pending:
+            # When to hedge the newest call, if there is a provider left to hedge with
+            newest = max(pending, key=lambda f: pending[f][2])
+            hedge_at = None
+            if next_depth < len(providers) and newest not in hedge_checked:
+                _, provider, start = pending[newest]
+                hedge_at = start + self.latency.hedge_delay(provider["name"])
+            timeout = CANCEL_POLL_SECONDS if hedge_at is None else min(CANCEL_POLL_SECONDS, max(0.0, hedge_at - time.monotonic()))
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                depth, provider, start = pending.pop(future)
+                try:
+                    result, usage = future.result()
+                except Exception as e:
+                    print(f"[AIClient] ✗ {provider['name']} failed: {e}")
+                    usage_ledger.record(
+                        provider=provider["name"], model=provider["model"], agent=agent,
+                        latency_ms=int((time.monotonic() - start) * 1000), fallback_depth=depth,
+                        outcome="error", error=str(e)
+                    )
+                    continue
+                self._record_success(provider, depth, start, prompt, system_prompt, temperature, max_tokens,
+                                     result, usage, agent)
+                abandon("hedge_lost", f"{provider['name']} answered first")
+                return result
+
+            if deadline.expired():
+                print(f"[AIClient] ✗ Request {deadline.stop_reason()}, abandoning {len(pending)} call(s)")
+                abandon(deadline.stop_reason(), "Request cancelled" if deadline.cancelled else "Request deadline exceeded")
+                return None
+            if next_depth >= len(providers):
+                continue
+            if not pending:
+                # Plain fallback after a failure
+                try:
+                    launch(scheduler.provider_queue.acquire(deadline=deadline))
+                except deadlines.DeadlineExceeded as e:
+                    print(f"[AIClient] ✗ No provider slot before the request ended: {e}")
+                    return None
+            elif hedge_at is not None and time.monotonic() >= hedge_at:
+                hedge_checked.add(newest)
+                slow = pending[newest][1]["name"]
+                # Hedges only use a free provider slot; they never queue behind other work
+                ticket = scheduler.provider_queue.try_acquire()
+                if ticket is None:
+                    print(f"[AIClient] ⏱ {slow} is slower than usual, but no provider slot is free")
+                elif self.hedge_budget.try_spend():
+                    print(f"[AIClient] ⏱ {slow} is slower than usual, hedging with {providers[next_depth]['name']}")
+                    launch(ticket)
+                else:
+                    scheduler.provider_queue.release(ticket)
+                    print(f"[AIClient] ⏱ {slow} is slower than usual, but the hedge budget is spent")
+
+        print("[AIClient] ⚠ All providers failed!")
+        return None
+
+    def _record_success(self, provider: dict, depth: int, start: float, prompt: str, system_prompt: str,
+                        temperature: float, max_tokens: int, result: str, usage: dict, agent: str):
+        print(f"[AIClient] ✓ {provider['name']} succeeded")
+        latency = time.monotonic() - start
+        latency_ms = int(latency * 1000)
+        self.latency.observe(provider["name"], latency)
+        if self.mode == "record":
+            self.replay_store.save(prompt, system_prompt, temperature, max_tokens, result,
+                                   provider["name"], provider["model"], latency_ms, usage)
+        usage_ledger.record(
+            provider=provider["name"], model=provider["model"], agent=agent,
+            prompt_tokens=usage.get("prompt_tokens"), completion_tokens=usage.get("completion_tokens"),
+            latency_ms=latency_ms, fallback_depth=depth, outcome="success"
+        )
+
+    def _call(self, provider: dict, deadline: "deadlines.Deadline", ticket, prompt: str, system_prompt: str,
+              temperature: float, max_tokens: int) -> tuple:
+        """
+        Run one provider call within the deadline on a provider slot (`ticket`,
+        released when the call ends). Without a deadline the call runs inline;
+        otherwise it runs on the call pool, and the request stops waiting as
+        soon as it is cancelled (the abandoned call ends on its own timeout,
+        see _call_timeout, and keeps its slot until then).
+        """
+        timeout = _call_timeout(deadline)
+        call = lambda: provider["generate"](
+            provider["client"], provider["model"], prompt, system_prompt, temperature, max_tokens, timeout=timeout
+        )
+        if deadline is deadlines.NO_DEADLINE:
+            try:
+                return call()
+            finally:
+                scheduler.provider_queue.release(ticket)
+
+        future = self._call_pool.submit(contextvars.copy_context().run, call)
+        future.add_done_callback(lambda _: scheduler.provider_queue.release(ticket))
+        while True:
+            try:
+                return future.result(timeout=CANCEL_POLL_SECONDS)
+            except FutureTimeout:
+                if deadline.expired():
+                    future.cancel()
+                    deadlines.check(deadline)
+    
+    def generate_json(self, prompt: str, system_prompt: str = None, temperature: float = 0.7, max_tokens: int = 2000,
+                      agent: str = None, task: str = None) -> dict:
+        """
+        Generate and parse JSON response. Malformed JSON is sent to the local
+        model for repair when JSON_REPAIR is routed to it (a free retry).
+        """
         json_prompt = prompt + "\n\nIMPORTANT: Return ONLY valid JSON, no markdown or explanation."
         json_system = (system_prompt or "") + " Always respond with valid JSON only."
         
-        result = self.generate(json_prompt, json_system, temperature, max_tokens)
+        result = self.generate(json_prompt, json_system, temperature, max_tokens, agent=agent, task=task)
         if result:
             try:
-                # Clean up markdown if present
-                cleaned = result.strip()
-                if cleaned.startswith("```json"):
-                    cleaned = cleaned[7:]
-                if cleaned.startswith("```"):
-                    cleaned = cleaned[3:]
-                if cleaned.endswith("```"):
-                    cleaned = cleaned[:-3]
-                return json.loads(cleaned.strip())
+                return _parse_json(result)
             except json.JSONDecodeError as e:
                 print(f"[AIClient] JSON parse error: {e}")
                 print(f"[AIClient] Raw response: {result[:200]}...")
+                return self._repair_json(result, max_tokens, agent)
         return None
+
+    def _repair_json(self, broken: str, max_tokens: int, agent: str) -> dict:
+        """Ask the local model to fix malformed JSON (only if JSON repair is routed to it)."""
+        if not any(p.get("local") for p in self.providers) or JSON_REPAIR not in LOCAL_LLM_TASKS:
+            return None
+        prompt = f"""Fix this malformed JSON. Keep every key and value; only repair the syntax.
+
+{broken}
+
+Return ONLY the corrected JSON."""
+        repaired = self.generate(prompt, "You repair JSON. Always respond with valid JSON only.", temperature=0.0,
+                                 max_tokens=max_tokens, agent=agent, task=JSON_REPAIR)
+        if repaired:
+            try:
+                result = _parse_json(repaired)
+                print("[AIClient] ✓ Repaired malformed JSON")
+                return result
+            except json.JSONDecodeError as e:
+                print(f"[AIClient] ✗ JSON repair failed: {e}")
+        return None
+    
+    def _replay_generate(self, client, model: str, prompt: str, system_prompt: str, temperature: float, max_tokens: int,
+                         timeout: float = None) -> tuple:
+        """Serve a recorded response (replay mode)."""
+        entry = client.load(prompt, system_prompt, temperature, max_tokens)
+        if entry is None:
+            raise LookupError("No recorded response for this prompt")
+        if os.getenv("AI_REPLAY_LATENCY", "false").lower() == "true":
+            latency = entry["latency_ms"] / 1000
+            if timeout is not None and latency > timeout:
+                time.sleep(timeout)
+                raise TimeoutError(f"Recorded latency {latency:.1f}s exceeds the {timeout:.1f}s timeout")
+            time.sleep(latency)
+        return entry["response"], entry["usage"]
     
-    def _gemini_generate(self, client, prompt: str, system_prompt: str, temperature: float, max_tokens: int) -> str:
+    def _local_generate(self, client, model: str, prompt: str, system_prompt: str, temperature: float, max_tokens: int,
+                        timeout: float = None) -> tuple:
+        """Generate using the local OpenAI-compatible server."""
+        return client.generate(prompt, system_prompt, temperature, max_tokens, timeout=timeout)
+    
+    def _gemini_generate(self, client, model: str, prompt: str, system_prompt: str, temperature: float, max_tokens: int,
+                         timeout: float = None) -> tuple:
         """Generate using Google Gemini."""
-        model = client.GenerativeModel(
-            'gemini-1.5-flash',
+        gemini_model = client.GenerativeModel(
+            model,
             system_instruction=system_prompt if system_prompt else None
         )
         
@@ -169,10 +481,17 @@ class AIClient:
             "max_output_tokens": max_tokens,
         }
         
-        response = model.generate_content(prompt, generation_config=generation_config)
-        return response.text
+        response = gemini_model.generate_content(
+            prompt, generation_config=generation_config, request_options={"timeout": timeout} if timeout else None
+        )
+        usage = getattr(response, "usage_metadata", None)
+        return response.text, {
+            "prompt_tokens": getattr(usage, "prompt_token_count", None),
+            "completion_tokens": getattr(usage, "candidates_token_count", None)
+        }
     
-    def _groq_generate(self, client, prompt: str, system_prompt: str, temperature: float, max_tokens: int) -> str:
+    def _groq_generate(self, client, model: str, prompt: str, system_prompt: str, temperature: float, max_tokens: int,
+                       timeout: float = None) -> tuple:
         """Generate using Groq (Llama/Mixtral - super fast)."""
         messages = []
         if system_prompt:
@@ -180,26 +499,34 @@ class AIClient:
         messages.append({"role": "user", "content": prompt})
         
         response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",  # Current free model (3.1 is decommissioned)
+            model=model,  # llama-3.3-70b-versatile: current free model (3.1 is decommissioned)
             messages=messages,
             temperature=temperature,
-            max_tokens=max_tokens
+            max_tokens=max_tokens,
+            **_timeout(timeout)
         )
-        return response.choices[0].message.content
+        return response.choices[0].message.content, _openai_usage(response)
     
-    def _cohere_generate(self, client, prompt: str, system_prompt: str, temperature: float, max_tokens: int) -> str:
+    def _cohere_generate(self, client, model: str, prompt: str, system_prompt: str, temperature: float, max_tokens: int,
+                         timeout: float = None) -> tuple:
         """Generate using Cohere."""
         full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
         
         response = client.generate(
-            model="command",
+            model=model,
             prompt=full_prompt,
             temperature=temperature,
-            max_tokens=max_tokens
+            max_tokens=max_tokens,
+            request_options={"timeout_in_seconds": max(1, int(timeout))} if timeout else None
         )
-        return response.generations[0].text
+        billed = getattr(getattr(response, "meta", None), "billed_units", None)
+        return response.generations[0].text, {
+            "prompt_tokens": getattr(billed, "input_tokens", None),
+            "completion_tokens": getattr(billed, "output_tokens", None)
+        }
     
-    def _openai_generate(self, client, prompt: str, system_prompt: str, temperature: float, max_tokens: int) -> str:
+    def _openai_generate(self, client, model: str, prompt: str, system_prompt: str, temperature: float, max_tokens: int,
+                         timeout: float = None) -> tuple:
         """Generate using OpenAI."""
         messages = []
         if system_prompt:
@@ -207,22 +534,65 @@ class AIClient:
         messages.append({"role": "user", "content": prompt})
         
         response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
+            model=model,
             messages=messages,
             temperature=temperature,
-            max_tokens=max_tokens
+            max_tokens=max_tokens,
+            **_timeout(timeout)
         )
-        return response.choices[0].message.content
+        return response.choices[0].message.content, _openai_usage(response)
     
-    def _anthropic_generate(self, client, prompt: str, system_prompt: str, temperature: float, max_tokens: int) -> str:
+    def _anthropic_generate(self, client, model: str, prompt: str, system_prompt: str, temperature: float, max_tokens: int,
+                            timeout: float = None) -> tuple:
         """Generate using Anthropic Claude."""
         message = client.messages.create(
-            model="claude-3-haiku-20240307",
+            model=model,
             max_tokens=max_tokens,
             system=system_prompt if system_prompt else "You are a helpful assistant.",
-            messages=[{"role": "user", "content": prompt}]
+            messages=[{"role": "user", "content": prompt}],
+            **_timeout(timeout)
         )
-        return message.content[0].text
+        return message.content[0].text, {
+            "prompt_tokens": getattr(message.usage, "input_tokens", None),
+            "completion_tokens": getattr(message.usage, "output_tokens", None)
+        }
+
+
+def _new_call_pool() -> ThreadPoolExecutor:
+    # Threads start on first use, so a pool created before a fork is safe to replace after it
+    return ThreadPoolExecutor(max_workers=PROVIDER_CALL_THREADS, thread_name_prefix="provider-call")
+
+
+def _parse_json(text: str):
+    """Parse a JSON answer, tolerating a surrounding markdown code fence."""
+    cleaned = text.strip()
+    if cleaned.startswith("```json"):
+        cleaned = cleaned[7:]
+    if cleaned.startswith("```"):
+        cleaned = cleaned[3:]
+    if cleaned.endswith("```"):
+        cleaned = cleaned[:-3]
+    return json.loads(cleaned.strip())
+
+
+def _call_timeout(deadline: "deadlines.Deadline") -> float:
+    """Timeout for one provider call: the deadline's remaining time, capped by PROVIDER_CALL_TIMEOUT."""
+    limits = [t for t in (deadline.remaining(), PROVIDER_CALL_TIMEOUT or None) if t is not None]
+    return min(limits) if limits else None
+
+
+def _timeout(timeout: float) -> dict:
+    """Per-request timeout for OpenAI-style SDKs (left out so None keeps the SDK default)."""
+    return {"timeout": timeout} if timeout else {}
+
+
+def _openai_usage(response) -> dict:
+    """Token usage from an OpenAI-compatible chat completion response."""
+    usage = getattr(response, "usage", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", None),
+        "completion_tokens": getattr(usage, "completion_tokens", None)
+    }
 
 
 # Singleton instance
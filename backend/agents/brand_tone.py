@@ -0,0 +1,220 @@
+"""
+Brand Tone Engine
+Scores how well a draft matches a project's brand tone without an LLM call.
+
+Each text is reduced to a small vector of tone dimensions (formality, energy,
+warmth, playfulness, authority, inspiration) from cheap stylometric signals:
+word and sentence length, contractions, exclamations, questions, emoji,
+pronouns and small tone lexicons. A project's BrandProfile combines
+
+- a target vector parsed from the free-text Project.tone ("Professional",
+  "Friendly and witty", ...), covering only the dimensions the tone names
+- the centroid of the tone vectors of approved past versions, once there
+  are enough of them
+
+and a draft's score is its similarity to both, on a 0-100 scale.
+score_batch() computes the tone vectors of many drafts as one NumPy matrix.
+
+Try it on a few sample texts with:
+
+    python -m backend.agents.brand_tone
+"""
+
+import re
+from functools import lru_cache
+
+import numpy as np
+
+DIMENSIONS = ("formality", "energy", "warmth", "playfulness", "authority", "inspiration")
+
+# Score when neither the tone text nor past versions say anything about the brand
+NEUTRAL_SCORE = 75
+# Approved versions needed before their style counts towards the profile
+MIN_HISTORY = 3
+# Weight of the Project.tone target vs. the approved-version centroid when both exist
+TONE_WEIGHT = 0.6
+
+# Tone words in Project.tone -> target values for the dimensions they imply
+TONE_TARGETS = {
+    "professional": {"formality": 0.8, "playfulness": 0.15, "authority": 0.6},
+    "formal": {"formality": 0.9, "playfulness": 0.1},
+    "corporate": {"formality": 0.85, "authority": 0.6, "playfulness": 0.1},
+    "casual": {"formality": 0.3, "warmth": 0.6},
+    "friendly": {"warmth": 0.8, "formality": 0.4},
+    "conversational": {"formality": 0.35, "warmth": 0.7},
+    "fun": {"playfulness": 0.75, "energy": 0.65, "formality": 0.3},
+    "playful": {"playfulness": 0.8, "energy": 0.6, "formality": 0.25},
+    "witty": {"playfulness": 0.7, "formality": 0.4},
+    "humorous": {"playfulness": 0.8, "formality": 0.3},
+    "quirky": {"playfulness": 0.75, "formality": 0.3},
+    "energetic": {"energy": 0.85},
+    "exciting": {"energy": 0.8},
+    "enthusiastic": {"energy": 0.8, "warmth": 0.6},
+    "bold": {"energy": 0.7, "authority": 0.6},
+    "inspirational": {"inspiration": 0.85, "energy": 0.6},
+    "inspiring": {"inspiration": 0.85, "energy": 0.6},
+    "motivational": {"inspiration": 0.85, "energy": 0.7},
+    "aspirational": {"inspiration": 0.8, "formality": 0.6},
+    "authoritative": {"authority": 0.85, "formality": 0.7},
+    "expert": {"authority": 0.85, "formality": 0.65},
+    "educational": {"authority": 0.7, "formality": 0.6, "playfulness": 0.2},
+    "informative": {"authority": 0.7, "formality": 0.6},
+    "empathetic": {"warmth": 0.85, "energy": 0.35},
+    "caring": {"warmth": 0.85},
+    "warm": {"warmth": 0.85},
+    "luxury": {"formality": 0.8, "playfulness": 0.1, "energy": 0.3},
+    "premium": {"formality": 0.8, "playfulness": 0.15},
+    "elegant": {"formality": 0.8, "playfulness": 0.1, "energy": 0.3},
+    "sophisticated": {"formality": 0.85, "playfulness": 0.1},
+    "calm": {"energy": 0.2},
+    "minimal": {"energy": 0.25, "playfulness": 0.2},
+    "youthful": {"playfulness": 0.65, "energy": 0.7, "formality": 0.25},
+    "trendy": {"playfulness": 0.6, "energy": 0.65, "formality": 0.3},
+}
+
+_LEXICONS = {
+    "formal": {"therefore", "furthermore", "however", "consequently", "moreover", "ensure", "leverage",
+               "strategic", "insights", "comprehensive", "significant", "additionally", "regarding",
+               "demonstrate", "objective", "approach", "framework", "optimize", "solutions", "thus"},
+    "casual": {"hey", "awesome", "cool", "gonna", "wanna", "super", "totally", "guys", "stuff", "yeah",
+               "okay", "ok", "pretty", "kinda", "literally", "honestly", "nope", "yep"},
+    "authority": {"proven", "data", "research", "expert", "experts", "study", "studies", "percent", "evidence",
+                  "results", "industry", "analysis", "according", "report", "statistics", "survey", "trusted"},
+    "inspiration": {"dream", "dreams", "inspire", "journey", "believe", "imagine", "transform", "empower",
+                    "passion", "future", "achieve", "potential", "purpose", "grow", "possible", "vision"},
+    "warmth": {"love", "care", "together", "community", "thank", "thanks", "happy", "welcome", "share",
+               "friend", "friends", "family", "support", "heart", "grateful", "kind"},
+    "playful": {"fun", "haha", "lol", "oops", "yay", "crazy", "wild", "epic", "vibe", "vibes", "omg",
+                "lit", "obsessed", "squad", "fam", "bestie", "woohoo", "yum"},
+}
+_LEXICON_NAMES = tuple(_LEXICONS)
+
+_WORD_RE = re.compile(r"[a-z][a-z']*")
+_SENTENCE_END_RE = re.compile(r"[.!?]+")
+_EMOJI_RE = re.compile("[\U0001F300-\U0001FAFF☀-➿]")
+_SECOND_PERSON = {"you", "your", "you're", "yours", "yourself", "you'll", "you've"}
+_FIRST_PLURAL = {"we", "our", "us", "we're", "ours", "we've", "we'll"}
+
+# Raw per-text signals, in this order
+_SIGNALS = _LEXICON_NAMES + (
+    "second_person", "first_plural", "contractions", "avg_word_length",
+    "words_per_sentence", "exclamations", "questions", "emoji",
+)
+
+
+def _signals(text: str) -> list:
+    """Per-word rates and per-sentence counts for one text."""
+    lowered = (text or "").lower()
+    words = _WORD_RE.findall(lowered)
+    n_words = max(1, len(words))
+    n_sentences = max(1, len(_SENTENCE_END_RE.findall(lowered)))
+    lexicon_hits = [sum(1 for w in words if w in _LEXICONS[name]) / n_words for name in _LEXICON_NAMES]
+    return lexicon_hits + [
+        sum(1 for w in words if w in _SECOND_PERSON) / n_words,
+        sum(1 for w in words if w in _FIRST_PLURAL) / n_words,
+        sum(1 for w in words if "'" in w) / n_words,
+        sum(len(w) for w in words) / n_words,
+        len(words) / n_sentences,
+        lowered.count("!") / n_sentences,
+        lowered.count("?") / n_sentences,
+        len(_EMOJI_RE.findall(text or "")) / n_sentences,
+    ]
+
+
+def _saturate(x, half):
+    """0 at x=0, 0.5 at x=half, approaching 1."""
+    return x / (x + half)
+
+
+def tone_vectors(texts: list) -> np.ndarray:
+    """(len(texts), len(DIMENSIONS)) matrix of tone dimensions in [0, 1]."""
+    if not texts:
+        return np.zeros((0, len(DIMENSIONS)))
+    s = np.array([_signals(t) for t in texts], dtype=float)
+    col = {name: s[:, i] for i, name in enumerate(_SIGNALS)}
+
+    formality = 0.5 + 0.12 * (col["avg_word_length"] - 4.7) + 0.01 * (col["words_per_sentence"] - 15) \
+        + 8 * (col["formal"] - col["casual"] - col["playful"]) - 4 * col["contractions"] \
+        - 0.3 * col["emoji"] - 0.25 * col["exclamations"]
+    energy = _saturate(col["exclamations"] + col["emoji"] + 0.5 * col["questions"], 0.4)
+    warmth = _saturate(col["second_person"] + col["first_plural"] + 2 * col["warmth"], 0.05)
+    playfulness = _saturate(3 * col["playful"] + col["casual"] + 0.02 * col["emoji"], 0.02)
+    authority = _saturate(2 * col["authority"] + 0.5 * col["formal"], 0.02)
+    inspiration = _saturate(2 * col["inspiration"], 0.03)
+
+    dims = np.stack([formality, energy, warmth, playfulness, authority, inspiration], axis=1)
+    return np.clip(dims, 0.0, 1.0)
+
+
+@lru_cache(maxsize=1024)
+def tone_target(tone: str) -> tuple:
+    """(target vector, weight mask) of the dimensions named by a Project.tone text."""
+    sums = np.zeros(len(DIMENSIONS))
+    counts = np.zeros(len(DIMENSIONS))
+    for word in re.findall(r"[a-z]+", (tone or "").lower()):
+        for dimension, value in TONE_TARGETS.get(word, {}).items():
+            index = DIMENSIONS.index(dimension)
+            sums[index] += value
+            counts[index] += 1
+    mask = (counts > 0).astype(float)
+    target = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+    return target, mask
+
+
+class BrandProfile:
+    """A project's tone target plus the style centroid of its approved versions."""
+
+    def __init__(self, tone: str, approved_texts: list = None):
+        self.tone = tone
+        self.target, self.mask = tone_target(tone)
+        approved = tone_vectors(list(approved_texts or []))
+        self.history_count = len(approved)
+        self.centroid = approved.mean(axis=0) if self.history_count >= MIN_HISTORY else None
+
+    def score_vectors(self, vectors: np.ndarray) -> np.ndarray:
+        """0-100 brand scores for rows of tone_vectors()."""
+        parts, weights = [], []
+        if self.mask.any():
+            distance = (np.abs(vectors - self.target) * self.mask).sum(axis=1) / self.mask.sum()
+            parts.append(1 - distance)
+            weights.append(TONE_WEIGHT)
+        if self.centroid is not None:
+            parts.append(1 - np.abs(vectors - self.centroid).mean(axis=1))
+            weights.append(1 - TONE_WEIGHT)
+        if not parts:
+            return np.full(len(vectors), NEUTRAL_SCORE)
+        similarity = np.average(np.stack(parts, axis=1), axis=1, weights=weights)
+        return np.rint(100 * similarity).astype(int)
+
+
+def score_batch(texts: list, profile: BrandProfile) -> list:
+    """Brand scores for many drafts at once."""
+    return profile.score_vectors(tone_vectors(texts)).tolist()
+
+
+def score(text: str, profile: BrandProfile) -> int:
+    return score_batch([text], profile)[0]
+
+
+if __name__ == "__main__":
+    import time
+
+    samples = {
+        "professional": "Our comprehensive analysis of industry data demonstrates a significant shift. "
+                        "Therefore, brands must leverage strategic insights to ensure sustainable growth. "
+                        "According to recent research, 72 percent of consumers prefer transparent companies.",
+        "fun": "OMG you guys, this is literally the most epic thing ever! 😂🔥 We're obsessed. "
+               "Who's ready to vibe with us this weekend? Tag your squad! 🎉",
+        "warm": "Thank you for being part of our community. We love sharing this journey with you, "
+                "and we're so grateful for your support. Together we can grow.",
+    }
+    for tone in ("Professional and authoritative", "Fun and playful", "Warm, friendly", "Unspecified"):
+        profile = BrandProfile(tone)
+        scores = dict(zip(samples, score_batch(list(samples.values()), profile)))
+        print(f"{tone:32} {scores}")
+
+    drafts = list(samples.values()) * 200
+    profile = BrandProfile("Friendly and witty", approved_texts=list(samples.values()))
+    start = time.perf_counter()
+    score_batch(drafts, profile)
+    print(f"Scored {len(drafts)} drafts in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -1,15 +1,25 @@
 """
 Content Strategy Agent
 
-Creates a comprehensive 14-day content calendar using a single optimized prompt
-to minimize API calls and costs.
+Creates a content calendar for a configurable horizon (14 days by default,
+up to a year). Short horizons are planned with a single optimized prompt.
+Longer horizons are split into week-sized chunks that are planned
+concurrently in waves: every chunk gets its own week focus and research
+angle, plus a compact summary of the topics planned in earlier waves, so
+chunks don't repeat each other and no single prompt has to produce
+hundreds of entries.
 """
 
 import os
+import re
+import contextvars
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
 from .base_agent import BaseAgent
 from .ai_client import get_ai_client
+from .. import topic_index
 from datetime import datetime, timedelta
 import json
 
@@ -17,48 +27,173 @@ import json
 env_path = Path(__file__).resolve().parent.parent / '.env'
 load_dotenv(env_path)
 
+DEFAULT_HORIZON_DAYS = 14
+MAX_HORIZON_DAYS = 365
+# Horizons up to this many days are planned with one prompt
+SINGLE_PROMPT_DAYS = 14
+CHUNK_DAYS = 7
+# Chunks planned at the same time (one wave); later waves see earlier topics
+STRATEGY_CONCURRENCY = int(os.getenv("STRATEGY_CONCURRENCY", "4"))
+# Size of the "already planned" summary sent with each chunk
+PRIOR_TOPICS_SHOWN = 20
+PRIOR_THEMES_SHOWN = 12
+
+WEEK_FOCUS = [
+    "awareness and education",
+    "engagement and community",
+    "authority and deep-dives",
+    "conversion and offers",
+]
+
+# Subjects for repeats of the template calendar once the niche and research
+# keywords are used up; enough for a year of distinct topics
+FOCUS_AREAS = [
+    "Pricing", "Social Media", "Email Newsletters", "Storytelling", "Local Partnerships",
+    "Online Reviews", "Festival Campaigns", "Video", "Budgeting", "Photography",
+    "Influencer Marketing", "Sustainability", "Referral Programs", "Website Design", "Analytics",
+    "Hiring", "Loyalty Rewards", "Packaging", "Competitor Research", "Mobile Shopping",
+    "Workshops", "Automation", "Year-End Planning", "First-Time Buyers",
+]
+
+_STOPWORDS = {
+    "about", "after", "your", "with", "from", "that", "this", "what", "when", "why", "how",
+    "the", "and", "for", "you", "are", "every", "things", "should", "know", "guide", "tips",
+    "into", "more", "most", "than", "their", "them", "they", "will", "best", "top", "our"
+}
+
+
+def _topic_key(topic: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", (topic or "").lower()).strip()
+
+
+def _summarize_topics(topics: list) -> str:
+    """Compact digest of already planned topics: recurring themes plus the latest titles."""
+    if not topics:
+        return ""
+    words = Counter(
+        w for topic in topics for w in set(re.findall(r"[a-z][a-z0-9']{2,}", topic.lower()))
+        if w not in _STOPWORDS
+    )
+    themes = ", ".join(w for w, _ in words.most_common(PRIOR_THEMES_SHOWN))
+    recent = "\n".join(f"- {t}" for t in topics[-PRIOR_TOPICS_SHOWN:])
+    return f"""ALREADY PLANNED ({len(topics)} topics) - do NOT repeat or closely paraphrase these:
+- Recurring themes so far: {themes}
+Most recent topics:
+{recent}"""
+
+
+def _rotate(items: list, index: int, count: int) -> list:
+    """`count` items starting at a chunk-specific offset, so concurrent chunks get different angles."""
+    if not items:
+        return []
+    start = (index * count) % len(items)
+    return [items[(start + i) % len(items)] for i in range(min(count, len(items)))]
+
 
 class ContentStrategyAgent(BaseAgent):
     """
-    Content Strategy Agent that creates a comprehensive 14-day content calendar
+    Content Strategy Agent that creates a content calendar for a given horizon
     based on market research and brand requirements.
-    
-    Uses a single prompt to generate all 14 days at once for efficiency.
+
+    Uses a single prompt for short calendars and concurrent week-sized
+    chunks for long ones.
     """
-    
+
     def __init__(self):
         super().__init__(name="ContentStrategyAgent")
         self.ai_client = get_ai_client()
 
-    def run(self, niche: str, audience: str, tone: str, research_data: dict = None):
-        print(f"[{self.name}] Creating content calendar for niche: {niche}")
-        
+    def run(self, niche: str, audience: str, tone: str, research_data: dict = None,
+            horizon_days: int = DEFAULT_HORIZON_DAYS):
+        horizon_days = max(1, min(int(horizon_days or DEFAULT_HORIZON_DAYS), MAX_HORIZON_DAYS))
+        print(f"[{self.name}] Creating {horizon_days}-day content calendar for niche: {niche}")
+        start_date = datetime.now()
+
         if self.ai_client.providers and research_data:
-            result = self._ai_strategy(niche, audience, tone, research_data)
+            if horizon_days <= SINGLE_PROMPT_DAYS:
+                result = self._ai_strategy(niche, audience, tone, research_data, start_date, 0, horizon_days)
+            else:
+                result = self._chunked_strategy(niche, audience, tone, research_data, start_date, horizon_days)
             if result:
                 return result
-        
+
         print(f"[{self.name}] Using template-based calendar...")
-        return self._template_strategy(niche, audience, tone, research_data)
-    
-    def _ai_strategy(self, niche: str, audience: str, tone: str, research_data: dict) -> list:
+        return self._template_strategy(niche, audience, tone, research_data, start_date, 0, horizon_days)
+
+    def _chunked_strategy(self, niche: str, audience: str, tone: str, research_data: dict,
+                          start_date: datetime, horizon_days: int) -> list:
         """
-        Use AI to create a strategic content calendar.
-        Generates all 14 days in a single API call for efficiency.
+        Plan a long calendar in week-sized chunks, STRATEGY_CONCURRENCY at a time.
+        Chunks that fail fall back to the template for their days.
         """
-        
-        from datetime import datetime
-        current_date = datetime.now().strftime("%B %Y")
-        current_year = datetime.now().year
-        
+        chunks = [
+            (index, offset, min(CHUNK_DAYS, horizon_days - offset))
+            for index, offset in enumerate(range(0, horizon_days, CHUNK_DAYS))
+        ]
+        print(f"[{self.name}] Planning {len(chunks)} chunks of up to {CHUNK_DAYS} days")
+
+        planned, seen = [], set()
+        workers = max(1, STRATEGY_CONCURRENCY)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for wave_start in range(0, len(chunks), workers):
+                prior = _summarize_topics([item["topic"] for item in planned])
+                wave = chunks[wave_start:wave_start + workers]
+                futures = [
+                    # Copy the usage scope into each worker thread
+                    pool.submit(
+                        contextvars.copy_context().run, self._ai_strategy,
+                        niche, audience, tone, research_data, start_date, offset, days, index, prior
+                    )
+                    for index, offset, days in wave
+                ]
+                for (index, offset, days), future in zip(wave, futures):
+                    items = future.result()
+                    if not items:
+                        print(f"[{self.name}] Chunk {index + 1} failed, using template days")
+                        items = self._template_strategy(niche, audience, tone, research_data, start_date, offset, days)
+                    for item in items:
+                        key = _topic_key(item["topic"])
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                        planned.append(item)
+
+        planned.sort(key=lambda item: item["date"])
+        print(f"[{self.name}] AI calendar created with {len(planned)} items over {horizon_days} days")
+        return planned
+
+    def _ai_strategy(self, niche: str, audience: str, tone: str, research_data: dict,
+                     start_date: datetime, offset: int, days: int, chunk_index: int = None,
+                     prior_topics: str = "") -> list:
+        """
+        Use AI to plan `days` calendar entries starting `offset` days after `start_date`.
+        Short horizons are generated in a single API call; for chunks of a long
+        horizon `chunk_index` selects the week focus and research angle.
+        """
+
+        current_date = start_date.strftime("%B %Y")
+        current_year = start_date.year
+        first_day = start_date + timedelta(days=offset)
+        last_day = first_day + timedelta(days=days - 1)
+
         # Extract research insights
         trends = research_data.get("trends", [])
         keywords = research_data.get("keyword_clusters", {}).get("primary", [])
         opportunities = research_data.get("content_opportunities", [])
         platforms = research_data.get("audience_insights", {}).get("platforms", ["Instagram", "LinkedIn", "Blog"])
-        
-        # Single comprehensive prompt for all 14 days
-        prompt = f"""Create a 14-day content calendar for a brand in the {niche} industry. Current date: {current_date}.
+
+        if chunk_index is None:
+            focus = """- Week 1: Focus on awareness and education
+- Week 2: Focus on engagement and conversion"""
+        else:
+            # Give concurrently planned chunks different angles on the research
+            focus = f"- This week's focus: {WEEK_FOCUS[chunk_index % len(WEEK_FOCUS)]}"
+            trends = _rotate(trends, chunk_index, 3)
+            keywords = _rotate(keywords, chunk_index, 3)
+            opportunities = _rotate(opportunities, chunk_index, 2)
+
+        prompt = f"""Create a {days}-day content calendar for a brand in the {niche} industry. Current date: {current_date}.
+This plan covers {first_day.strftime("%d %B %Y")} to {last_day.strftime("%d %B %Y")}.
 
 BRAND INFO:
 - Niche: {niche}
@@ -72,12 +207,14 @@ RESEARCH INSIGHTS:
 - Priority Platforms: {', '.join(platforms[:3]) if platforms else 'Instagram, LinkedIn, Blog'}
 
 IMPORTANT:
-- Consider any upcoming Indian festivals or events in the next 14 days
+- Consider any Indian festivals or events between these dates
 - Use {current_year} trends and current social media practices
 - Topics should be SPECIFIC and actionable, not generic
 
-Generate a JSON array with exactly 14 content entries. Each entry must have:
-- day: number (1-14)
+{prior_topics}
+
+Generate a JSON array with exactly {days} content entries. Each entry must have:
+- day: number (1-{days})
 - platform: one of "Instagram", "LinkedIn", "Twitter", "Blog"
 - content_type: appropriate for the platform (Carousel/Reel/Post/Article/Story/Thread/Poll)
 - topic: specific, actionable topic title (not generic)
@@ -85,30 +222,33 @@ Generate a JSON array with exactly 14 content entries. Each entry must have:
 
 GUIDELINES:
 - Mix platforms for variety (don't use same platform 2 days in a row)
-- Week 1: Focus on awareness and education
-- Week 2: Focus on engagement and conversion
+{focus}
 - Include 1 user-generated content prompt
 - Make topics SPECIFIC to the {niche} industry, not generic
 - Consider what would actually engage {audience}
 
-Return ONLY a valid JSON array with exactly 14 items."""
+Return ONLY a valid JSON array with exactly {days} items."""
 
-        system_prompt = f"""You are an expert social media strategist for Indian brands. 
+        system_prompt = f"""You are an expert social media strategist for Indian brands.
 You create content calendars that drive real engagement.
 Always respond with valid JSON array only, no markdown or explanation."""
 
-        result = self.ai_client.generate_json(prompt, system_prompt, temperature=0.7, max_tokens=2000)
-        
+        result = self.ai_client.generate_json(
+            prompt, system_prompt, temperature=0.7, max_tokens=max(600, 150 * days), agent=self.name
+        )
+
         if result and isinstance(result, list):
             # Process and add dates
-            start_date = datetime.now()
             processed = []
-            
-            for item in result:
+
+            for item in result[:days]:
                 day_num = item.get("day", len(processed) + 1)
-                day_offset = day_num - 1
-                date = (start_date + timedelta(days=day_offset)).strftime("%Y-%m-%d")
-                
+                try:
+                    day_offset = min(max(int(day_num), 1), days) - 1
+                except (TypeError, ValueError):
+                    day_offset = len(processed)
+                date = (first_day + timedelta(days=day_offset)).strftime("%Y-%m-%d")
+
                 processed.append({
                     "date": date,
                     "platform": item.get("platform", "Blog"),
@@ -116,60 +256,113 @@ Always respond with valid JSON array only, no markdown or explanation."""
                     "topic": item.get("topic", "Content Topic"),
                     "objective": item.get("objective", "Engagement")
                 })
-            
-            print(f"[{self.name}] AI calendar created with {len(processed)} items")
+
+            if chunk_index is None:
+                print(f"[{self.name}] AI calendar created with {len(processed)} items")
             return processed
-        
+
         return None
-    
-    def _template_strategy(self, niche: str, audience: str, tone: str, research_data: dict = None) -> list:
-        """Template-based content calendar when API is unavailable."""
-        
-        trends = []
+
+    def _template_strategy(self, niche: str, audience: str, tone: str, research_data: dict = None,
+                           start_date: datetime = None, offset: int = 0,
+                           days: int = DEFAULT_HORIZON_DAYS) -> list:
+        """
+        Template-based content calendar when API is unavailable.
+        The 28-day template repeats over longer horizons; every repeat covers
+        a different subject (the niche, then research keywords, then
+        FOCUS_AREAS), and topics too similar to an earlier one are swapped
+        for another subject, so long horizons survive deduplication.
+        """
+
+        trends, keywords = [], []
         if research_data:
             trends = research_data.get("trends", [])
-        
+            keywords = research_data.get("keyword_clusters", {}).get("primary", [])
+
+        start_date = start_date or datetime.now()
+
         # Varied content calendar template
         calendar_template = [
             # Week 1 - Awareness & Education
-            {"day": 0, "platform": "Instagram", "content_type": "Carousel", "topic": f"5 Things Every {audience} Should Know About {niche}"},
-            {"day": 1, "platform": "LinkedIn", "content_type": "Article", "topic": f"How {niche} is Transforming in 2024: An Industry Analysis"},
-            {"day": 2, "platform": "Twitter", "content_type": "Thread", "topic": f"The Ultimate Guide to {niche} for Beginners 🧵"},
-            {"day": 3, "platform": "Instagram", "content_type": "Reel", "topic": f"Day in the Life: Behind the Scenes at Our {niche} Brand"},
-            {"day": 4, "platform": "Blog", "content_type": "How-To", "topic": f"Step-by-Step: Getting Started with {niche}"},
-            {"day": 5, "platform": "LinkedIn", "content_type": "Post", "topic": f"3 Myths About {niche} That Are Holding You Back"},
-            {"day": 6, "platform": "Instagram", "content_type": "Story", "topic": f"Weekend Poll: What's Your Biggest {niche} Challenge?"},
+            {"platform": "Instagram", "content_type": "Carousel", "topic": "5 Things Every {audience} Should Know About {subject}"},
+            {"platform": "LinkedIn", "content_type": "Article", "topic": "How {subject} is Transforming in {year}: An Industry Analysis"},
+            {"platform": "Twitter", "content_type": "Thread", "topic": "The Ultimate Guide to {subject} for Beginners 🧵"},
+            {"platform": "Instagram", "content_type": "Reel", "topic": "Day in the Life: {subject} Behind the Scenes at Our Brand"},
+            {"platform": "Blog", "content_type": "How-To", "topic": "Step-by-Step: Getting Started with {subject}"},
+            {"platform": "LinkedIn", "content_type": "Post", "topic": "3 Myths About {subject} That Are Holding You Back"},
+            {"platform": "Instagram", "content_type": "Story", "topic": "Weekend Poll: What's Your Biggest {subject} Challenge?"},
             # Week 2 - Engagement & Conversion
-            {"day": 7, "platform": "Twitter", "content_type": "Thread", "topic": f"Case Study: How We Helped a Client Transform Their {niche} Strategy"},
-            {"day": 8, "platform": "Instagram", "content_type": "Carousel", "topic": f"Before vs After: {niche} Transformation Stories"},
-            {"day": 9, "platform": "Blog", "content_type": "Listicle", "topic": f"Top 10 {niche} Trends to Watch in India"},
-            {"day": 10, "platform": "LinkedIn", "content_type": "Post", "topic": f"Why {audience} Are Choosing Quality Over Quantity in {niche}"},
-            {"day": 11, "platform": "Instagram", "content_type": "Reel", "topic": f"Quick Tips: 60-Second {niche} Hacks That Actually Work"},
-            {"day": 12, "platform": "Twitter", "content_type": "Poll", "topic": f"Community Question: What Feature Do You Want Next?"},
-            {"day": 13, "platform": "Blog", "content_type": "Deep-Dive", "topic": f"The Complete {niche} Playbook for {audience}"},
+            {"platform": "Twitter", "content_type": "Thread", "topic": "Case Study: How We Helped a Client Transform Their {subject} Strategy"},
+            {"platform": "Instagram", "content_type": "Carousel", "topic": "Before vs After: {subject} Transformation Stories"},
+            {"platform": "Blog", "content_type": "Listicle", "topic": "Top 10 {subject} Trends to Watch in India in {year}"},
+            {"platform": "LinkedIn", "content_type": "Post", "topic": "Why {audience} Are Choosing Quality Over Quantity in {subject}"},
+            {"platform": "Instagram", "content_type": "Reel", "topic": "Quick Tips: 60-Second {subject} Hacks That Actually Work"},
+            {"platform": "Twitter", "content_type": "Poll", "topic": "Community Question: What {subject} Feature Do You Want Next?"},
+            {"platform": "Blog", "content_type": "Deep-Dive", "topic": "The Complete {subject} Playbook for {audience}"},
+            # Week 3 - Authority & Deep-Dives
+            {"platform": "LinkedIn", "content_type": "Article", "topic": "What We Learned From a Year of {subject}"},
+            {"platform": "Blog", "content_type": "Deep-Dive", "topic": "{subject}, Explained: The Numbers Behind It"},
+            {"platform": "Instagram", "content_type": "Carousel", "topic": "{subject} Checklist: Save This Post"},
+            {"platform": "Twitter", "content_type": "Thread", "topic": "Expert Answers: Your {subject} Questions"},
+            {"platform": "Blog", "content_type": "Interview", "topic": "Interview: A Founder's Take on {subject}"},
+            {"platform": "LinkedIn", "content_type": "Post", "topic": "Lessons From Getting {subject} Wrong"},
+            {"platform": "Instagram", "content_type": "Story", "topic": "Ask Us Anything About {subject}"},
+            # Week 4 - Conversion & Offers
+            {"platform": "Instagram", "content_type": "Reel", "topic": "{subject} on a Budget: What Works"},
+            {"platform": "Blog", "content_type": "Comparison", "topic": "{subject}: Do It Yourself or Hire a Pro?"},
+            {"platform": "LinkedIn", "content_type": "Post", "topic": "Customer Spotlight: Real {subject} Results"},
+            {"platform": "Twitter", "content_type": "Post", "topic": "One {subject} Tip You Can Use Today"},
+            {"platform": "Instagram", "content_type": "Carousel", "topic": "Our {subject} Toolkit, Revealed"},
+            {"platform": "Blog", "content_type": "How-To", "topic": "A 30-Day {subject} Plan for {audience}"},
+            {"platform": "Twitter", "content_type": "Poll", "topic": "Vote: Which {subject} Goal Comes First?"},
         ]
-        
-        # Add trending topic if available
-        if trends:
-            calendar_template.append({
-                "day": 14,
-                "platform": "Instagram",
-                "content_type": "Carousel",
-                "topic": f"Trending Now: {trends[0]} - What It Means for You"
-            })
-        
-        start_date = datetime.now()
-        result = []
-        
-        for item in calendar_template:
-            date = (start_date + timedelta(days=item["day"])).strftime("%Y-%m-%d")
+        # Each repeat of the template covers a different subject
+        subjects = [niche] + [k for k in keywords if k.lower() != niche.lower()]
+        subjects += [focus for focus in FOCUS_AREAS if focus.lower() not in {s.lower() for s in subjects}]
+
+        result, planned, used = [], [], set()
+        for day in range(offset, offset + days):
+            date = start_date + timedelta(days=day)
+            cycle, position = divmod(day, len(calendar_template))
+            # The day's template with the cycle's subject, unless that would near-duplicate an earlier
+            # topic (the dedup index would drop it); then other subjects, then templates for the same platform
+            platform = calendar_template[position]["platform"]
+            positions = [position] + [p for p in range(len(calendar_template))
+                                      if p != position and calendar_template[p]["platform"] == platform]
+            candidates = ((p, (cycle + k) % len(subjects)) for p in positions for k in range(len(subjects)))
+            item, topic = calendar_template[position], None
+            for p, s in candidates:
+                if (p, s) in used:
+                    continue
+                text = calendar_template[p]["topic"].format(
+                    audience=audience, niche=niche, subject=subjects[s], year=date.year
+                )
+                grams = topic_index.shingles(text)
+                if all(len(grams & other) < topic_index.DUPLICATE_THRESHOLD * len(grams | other) for other in planned):
+                    item, topic = calendar_template[p], text
+                    used.add((p, s))
+                    planned.append(grams)
+                    break
+            if topic is None:
+                topic = item["topic"].format(audience=audience, niche=niche, subject=subjects[cycle % len(subjects)], year=date.year)
+                topic = f"{topic} ({date.strftime('%B %d, %Y')})"
             result.append({
-                "date": date,
+                "date": date.strftime("%Y-%m-%d"),
                 "platform": item["platform"],
                 "content_type": item["content_type"],
-                "topic": item["topic"],
+                "topic": topic,
                 "objective": "Engagement"
             })
-        
+
+        # Add trending topic if available
+        if trends and offset == 0:
+            result.append({
+                "date": (start_date + timedelta(days=days)).strftime("%Y-%m-%d"),
+                "platform": "Instagram",
+                "content_type": "Carousel",
+                "topic": f"Trending Now: {trends[0]} - What It Means for You",
+                "objective": "Engagement"
+            })
+
         print(f"[{self.name}] Template calendar created with {len(result)} items")
         return result
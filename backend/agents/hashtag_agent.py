@@ -0,0 +1,97 @@
+"""
+Hashtag Agent
+Suggests hashtags for a content version. Uses the unified AI client when
+available and a local, LLM-free extractor otherwise (research trending tags,
+hashtags already in the body, and the body's most frequent keywords).
+"""
+
+import re
+from collections import Counter
+
+from .base_agent import BaseAgent
+from .ai_client import get_ai_client, HASHTAGS
+
+MAX_HASHTAGS = 15
+
+_STOPWORDS = {
+    "about", "after", "again", "also", "because", "been", "before", "being", "below", "between",
+    "both", "but", "can't", "could", "does", "doing", "don't", "down", "during", "each", "every",
+    "from", "further", "have", "having", "here", "into", "it's", "just", "know", "like", "make",
+    "more", "most", "much", "need", "only", "other", "ours", "over", "really", "same", "should",
+    "some", "such", "than", "that", "their", "them", "then", "there", "these", "they", "thing",
+    "things", "this", "those", "through", "today", "very", "want", "were", "what", "when",
+    "where", "which", "while", "will", "with", "would", "you're", "your", "yours"
+}
+
+
+def _to_hashtag(phrase: str) -> str:
+    """'made in india' / '#MadeInIndia' -> '#MadeInIndia'."""
+    phrase = phrase.strip()
+    if phrase.startswith("#"):
+        phrase = phrase[1:]
+    words = re.findall(r"[A-Za-z0-9]+", phrase)
+    if not words:
+        return ""
+    if len(words) == 1:
+        word = words[0]
+        return "#" + (word if any(c.isupper() for c in word) else word.capitalize())
+    return "#" + "".join(w if w.isupper() else w.capitalize() for w in words)
+
+
+class HashtagAgent(BaseAgent):
+    """
+    Hashtag Agent that generates platform-appropriate hashtags
+    for a piece of content.
+    """
+
+    def __init__(self):
+        super().__init__(name="HashtagAgent")
+        self.ai_client = get_ai_client()
+
+    def run(self, platform: str, topic: str, content: str, trending: list = None) -> dict:
+        """Return {"hashtags": [...], "source": "ai" | "local"}."""
+        print(f"[{self.name}] Generating hashtags for topic: '{topic}'")
+
+        if self.ai_client.providers:
+            result = self._ai_hashtags(platform, topic, content)
+            if result:
+                return {"hashtags": result, "source": "ai"}
+
+        print(f"[{self.name}] Using local keyword extraction...")
+        return {"hashtags": self.local(topic, content, trending), "source": "local"}
+
+    def _ai_hashtags(self, platform: str, topic: str, content: str) -> list:
+        prompt = f"""Generate 15 trending and relevant hashtags for this social media content.
+
+Platform: {platform}
+Topic: {topic}
+Content: {content[:500]}
+
+Return ONLY the hashtags, one per line, starting with #. Make them relevant for Indian audience.
+Mix popular hashtags with niche-specific ones."""
+
+        result = self.ai_client.generate(prompt, max_tokens=200, agent=self.name, task=HASHTAGS)
+        if result:
+            hashtags = [tag.strip() for tag in result.split('\n') if tag.strip().startswith('#')]
+            return hashtags[:MAX_HASHTAGS] or None
+        return None
+
+    def local(self, topic: str, content: str, trending: list = None) -> list:
+        """LLM-free hashtags from research trends, existing tags and keyword frequency."""
+        candidates = []
+        candidates.extend(trending or [])
+        candidates.extend(re.findall(r"#\w+", content or ""))
+
+        words = re.findall(r"[a-z][a-z']{3,}", f"{topic} {content or ''}".lower())
+        counts = Counter(w for w in words if w not in _STOPWORDS)
+        candidates.extend(word for word, _ in counts.most_common(MAX_HASHTAGS * 2))
+
+        hashtags, seen = [], set()
+        for candidate in candidates:
+            tag = _to_hashtag(candidate)
+            if tag and tag.lower() not in seen:
+                seen.add(tag.lower())
+                hashtags.append(tag)
+            if len(hashtags) == MAX_HASHTAGS:
+                break
+        return hashtags
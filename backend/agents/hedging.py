@@ -0,0 +1,84 @@
+"""
+Hedged Requests
+Support for AIClient's hedging mode (generate(..., hedge=True)): when the
+provider being tried has not answered within its usual (p90) latency, the
+same request is also sent to the next provider and the first answer wins.
+
+- LatencyStats keeps a rolling window of successful call latencies per
+  provider, seeded from the usage ledger so a fresh worker hedges sensibly
+  from its first request
+- HedgeBudget caps hedges to a fraction of hedgeable calls (a token bucket),
+  so a provider outage doesn't double the traffic sent to everyone else
+"""
+
+import os
+import threading
+from collections import deque
+
+import numpy as np
+
+from .. import usage_ledger
+
+# Hedges allowed per hedgeable call (0 disables hedging) and how many may be saved up
+HEDGE_BUDGET_RATIO = float(os.getenv("HEDGE_BUDGET_RATIO", "0.1"))
+HEDGE_BUDGET_BURST = float(os.getenv("HEDGE_BUDGET_BURST", "5"))
+# Percentile of a provider's latency after which the next provider is tried too
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "90"))
+# Delay before hedging while a provider has fewer than HEDGE_MIN_SAMPLES latencies
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "10"))
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+
+class LatencyStats:
+    """Rolling latency window per provider."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def _window(self, provider: str) -> deque:
+        samples = self._samples.get(provider)
+        if samples is None:
+            # First use in this process: start from the provider's recent history
+            seeded = [ms / 1000 for ms in reversed(usage_ledger.recent_latencies(provider, self.window))]
+            samples = self._samples[provider] = deque(seeded, maxlen=self.window)
+        return samples
+
+    def observe(self, provider: str, seconds: float):
+        with self._lock:
+            self._window(provider).append(seconds)
+
+    def hedge_delay(self, provider: str) -> float:
+        """Seconds to wait on `provider` before hedging: its HEDGE_PERCENTILE latency."""
+        with self._lock:
+            samples = list(self._window(provider))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return float(np.percentile(samples, HEDGE_PERCENTILE))
+
+
+class HedgeBudget:
+    """Token bucket: every hedgeable call earns `ratio` tokens, every hedge spends one."""
+
+    def __init__(self, ratio: float = HEDGE_BUDGET_RATIO, burst: float = HEDGE_BUDGET_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = burst
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ratio > 0
+
+    def earn(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
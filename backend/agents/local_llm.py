@@ -0,0 +1,175 @@
+"""
+Local LLM Provider
+Client for a locally hosted OpenAI-compatible server (llama.cpp server, vLLM,
+Ollama's /v1 API) at LOCAL_LLM_BASE_URL. It needs no SDK or API key and
+works offline.
+
+AIClient adds it as the "Local" provider and routes cheap, short tasks to it
+first (see AIClient.route): hashtags, short Twitter drafts and JSON repair.
+Long-form writing stays on the remote providers.
+
+A local server only handles a few generations at a time, so calls are
+limited to LOCAL_LLM_CONCURRENCY in flight. A call that finds every slot
+busy fails at once with LocalBusy, and AIClient falls back to a remote
+provider instead of queueing behind the local model.
+
+With LOCAL_LLM_BATCH_SIZE > 1, calls with the same sampling settings that
+arrive within LOCAL_LLM_BATCH_WINDOW seconds are sent together as one
+/completions request with a list of prompts (supported by vLLM and
+llama.cpp server). Batched prompts are sent as plain text, without the
+model's chat template.
+"""
+
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+# Server URL including the /v1 prefix (e.g. http://localhost:8080/v1); unset disables the provider
+LOCAL_LLM_BASE_URL = os.getenv("LOCAL_LLM_BASE_URL", "")
+LOCAL_LLM_MODEL = os.getenv("LOCAL_LLM_MODEL", "local")
+LOCAL_LLM_API_KEY = os.getenv("LOCAL_LLM_API_KEY", "")
+# Generations sent to the server at once (a batch counts as one)
+LOCAL_LLM_CONCURRENCY = int(os.getenv("LOCAL_LLM_CONCURRENCY", "2"))
+# Prompts per batched request (1 = no batching) and how long the first call waits for others
+LOCAL_LLM_BATCH_SIZE = int(os.getenv("LOCAL_LLM_BATCH_SIZE", "1"))
+LOCAL_LLM_BATCH_WINDOW = float(os.getenv("LOCAL_LLM_BATCH_WINDOW", "0.02"))
+# Timeout for calls made without a request deadline
+LOCAL_LLM_TIMEOUT = float(os.getenv("LOCAL_LLM_TIMEOUT", "60"))
+
+
+class LocalBusy(Exception):
+    """Every local slot is in use; the caller should try another provider."""
+
+
+class _Batch:
+    def __init__(self, size: int):
+        self.size = size
+        self.prompts = []
+        self.results = None
+        self.error = None
+        self.filled = threading.Event()
+        self.done = threading.Event()
+
+    @property
+    def full(self) -> bool:
+        return len(self.prompts) >= self.size
+
+
+class LocalLLM:
+    """OpenAI-compatible HTTP client with a concurrency limit and optional micro-batching."""
+
+    def __init__(self, base_url: str = LOCAL_LLM_BASE_URL, model: str = LOCAL_LLM_MODEL,
+                 api_key: str = LOCAL_LLM_API_KEY, concurrency: int = LOCAL_LLM_CONCURRENCY,
+                 batch_size: int = LOCAL_LLM_BATCH_SIZE, batch_window: float = LOCAL_LLM_BATCH_WINDOW):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+        self.batch_size = max(1, batch_size)
+        self.batch_window = batch_window
+        self._slots = threading.BoundedSemaphore(max(1, concurrency))
+        self._lock = threading.Lock()
+        self._open = {}  # (temperature, max_tokens) -> batch still accepting prompts
+
+    def generate(self, prompt: str, system_prompt: str, temperature: float, max_tokens: int,
+                 timeout: float = None) -> tuple:
+        """Returns (text, usage) like the other providers."""
+        timeout = timeout or LOCAL_LLM_TIMEOUT
+        if self.batch_size > 1:
+            return self._generate_batched(prompt, system_prompt, temperature, max_tokens, timeout)
+
+        start = time.monotonic()
+        if not self._slots.acquire(blocking=False):
+            raise LocalBusy("Local model busy, no free slot")
+        try:
+            messages = []
+            if system_prompt:
+                messages.append({"role": "system", "content": system_prompt})
+            messages.append({"role": "user", "content": prompt})
+            response = self._post("/chat/completions", {
+                "model": self.model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens
+            }, timeout - (time.monotonic() - start))
+        finally:
+            self._slots.release()
+        usage = response.get("usage") or {}
+        return response["choices"][0]["message"]["content"], {
+            "prompt_tokens": usage.get("prompt_tokens"),
+            "completion_tokens": usage.get("completion_tokens")
+        }
+
+    def _generate_batched(self, prompt: str, system_prompt: str, temperature: float, max_tokens: int,
+                          timeout: float) -> tuple:
+        start = time.monotonic()
+        key = (temperature, max_tokens)
+        text = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+        with self._lock:
+            batch = self._open.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._open[key] = _Batch(self.batch_size)
+            index = len(batch.prompts)
+            batch.prompts.append(text)
+            if batch.full:
+                del self._open[key]  # The next call starts a new batch
+                batch.filled.set()
+
+        if leader:
+            # Give concurrent calls a moment to join, then send everything collected
+            batch.filled.wait(self.batch_window)
+            with self._lock:
+                if self._open.get(key) is batch:
+                    del self._open[key]
+            self._send(batch, temperature, max_tokens, timeout - (time.monotonic() - start))
+        elif not batch.done.wait(timeout):
+            raise TimeoutError(f"Batched local call did not finish within {timeout:.1f}s")
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index], {"prompt_tokens": None, "completion_tokens": None}
+
+    def _send(self, batch: _Batch, temperature: float, max_tokens: int, timeout: float):
+        try:
+            if not self._slots.acquire(blocking=False):
+                raise LocalBusy("Local model busy, no free slot")
+            try:
+                response = self._post("/completions", {
+                    "model": self.model,
+                    "prompt": batch.prompts,
+                    "temperature": temperature,
+                    "max_tokens": max_tokens
+                }, timeout)
+            finally:
+                self._slots.release()
+            results = [None] * len(batch.prompts)
+            for position, choice in enumerate(response["choices"]):
+                results[choice.get("index", position)] = choice["text"]
+            if any(result is None for result in results):
+                raise ValueError("Local server returned fewer completions than prompts")
+            batch.results = results
+            if len(results) > 1:
+                print(f"[LocalLLM] ✓ Batched {len(results)} prompts in one request")
+        except Exception as e:
+            batch.error = e
+        finally:
+            batch.done.set()
+
+    def _post(self, path: str, payload: dict, timeout: float) -> dict:
+        if timeout <= 0:
+            raise TimeoutError("No time left for the local model")
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(
+            self.base_url + path, data=json.dumps(payload).encode("utf-8"), headers=headers, method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            detail = e.read()[:200].decode("utf-8", "replace")
+            raise RuntimeError(f"Local server returned {e.code}: {detail}")
@@ -10,6 +10,7 @@ from pathlib import Path
 from dotenv import load_dotenv
 from .base_agent import BaseAgent
 from .ai_client import get_ai_client
+import json
 
 # Load .env from the backend directory
 env_path = Path(__file__).resolve().parent.parent / '.env'
@@ -105,7 +106,7 @@ Remember:
 Your research is always specific, actionable, and based on real market data. 
 Always respond with valid JSON only, no markdown formatting."""
 
-        result = self.ai_client.generate_json(prompt, system_prompt, temperature=0.7, max_tokens=1500)
+        result = self.ai_client.generate_json(prompt, system_prompt, temperature=0.7, max_tokens=1500, agent=self.name)
         
         if result:
             print(f"[{self.name}] AI research completed successfully")
@@ -113,6 +114,79 @@ Always respond with valid JSON only, no markdown formatting."""
         
         return None
     
+    def refresh(self, niche: str, audience: str, previous: dict, sections: list) -> dict:
+        """
+        Regenerate only the given research sections (e.g. trends, keyword_clusters),
+        using the previous report as context so unchanged findings carry over.
+        Returns a dict containing just the refreshed sections.
+        """
+        print(f"[{self.name}] Refreshing sections {sections} for niche: {niche}")
+        
+        if self.ai_client.providers:
+            result = self._ai_refresh(niche, audience, previous, sections)
+            if result:
+                return result
+        
+        print(f"[{self.name}] Using fallback mock data...")
+        mock = self._mock_research(niche, audience)
+        return {section: mock.get(section) for section in sections + ["content_opportunities"]}
+    
+    def _ai_refresh(self, niche: str, audience: str, previous: dict, sections: list) -> dict:
+        """Use AI to update stale research sections given the prior report."""
+        
+        from datetime import datetime
+        current_date = datetime.now().strftime("%B %Y")
+        
+        section_formats = {
+            "trends": '"trends": ["5 specific, current trends with context"]',
+            "keyword_clusters": '"keyword_clusters": {"primary": ["5 high-volume keywords"], "secondary": ["5 long-tail buying-intent keywords"], "trending": ["3 trending hashtags or phrases"]}',
+            "competitors": '"competitors": ["5 real Indian competitors"]',
+            "audience_insights": '"audience_insights": {"pain_points": ["3 pain points"], "preferences": ["3 preferences"], "platforms": ["Top 3 platforms"]}',
+            "summary": '"summary": "2-3 sentence executive summary"'
+        }
+        requested = [section_formats[s] for s in sections if s in section_formats]
+        requested.append('"content_opportunities": ["3 specific content gaps based on the updated findings"]')
+        
+        previous_context = "\n".join(
+            f"- {section}: {json.dumps(previous.get(section), ensure_ascii=False)}"
+            for section in sections
+        )
+        
+        prompt = f"""You are a market research analyst. Today's date is {current_date}.
+You previously analyzed this business and now need to UPDATE part of that research.
+
+BUSINESS DETAILS:
+- Industry/Niche: {niche}
+- Target Audience: {audience}
+- Market: India
+
+PREVIOUS SUMMARY: {previous.get("summary", "")}
+
+PREVIOUS FINDINGS TO UPDATE:
+{previous_context}
+
+INSTRUCTIONS:
+1. Keep findings that are still accurate; replace anything outdated
+2. Add new developments since the previous research
+3. Stay specific to Indian market conditions
+
+Provide ONLY these sections in this JSON format:
+{{
+    {("," + chr(10) + "    ").join(requested)}
+}}"""
+        
+        system_prompt = """You are an expert market research analyst specializing in Indian markets and digital marketing. 
+You update existing research incrementally instead of starting over. 
+Always respond with valid JSON only, no markdown formatting."""
+        
+        result = self.ai_client.generate_json(prompt, system_prompt, temperature=0.7, max_tokens=800, agent=self.name)
+        
+        if result:
+            print(f"[{self.name}] AI research refresh completed successfully")
+            return result
+        
+        return None
+    
     def _mock_research(self, niche: str, audience: str) -> dict:
         """Fallback mock research when API is unavailable."""
         return {
@@ -0,0 +1,102 @@
+"""
+Replay Store
+On-disk store of AI request/response pairs for deterministic offline runs.
+
+In record mode AIClient saves every successful provider response here. In
+replay mode it serves them back without network access, optionally sleeping
+for the recorded latency so load tests see realistic timings.
+
+Requests are keyed by a hash of the normalized system prompt and prompt plus
+the sampling settings (temperature, max_tokens), so a draft written at 0.7 is
+never replayed for a low-temperature JSON repair of the same prompt.
+Normalization collapses whitespace and masks dates and years, which the agents
+embed in their prompts, so a recording made on one day replays on another.
+Responses are zlib-compressed in a single SQLite file.
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+_DATE_PATTERNS = [
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}\b"), "<DATE>"),
+    (re.compile(r"\b(January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{4}\b"), "<MONTH>"),
+    (re.compile(r"\b(19|20)\d{2}\b"), "<YEAR>"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def normalize(text: str) -> str:
+    text = text or ""
+    for pattern, replacement in _DATE_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text.strip()
+
+
+def request_key(prompt: str, system_prompt: str = None, temperature: float = None, max_tokens: int = None) -> str:
+    sampling = f"{'' if temperature is None else f'{float(temperature):g}'}/{'' if max_tokens is None else int(max_tokens)}"
+    payload = normalize(system_prompt) + "\x00" + normalize(prompt) + "\x00" + sampling
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReplayStore:
+    """SQLite-backed store of recorded AI responses."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("""CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            provider TEXT,
+            model TEXT,
+            response BLOB,
+            latency_ms INTEGER,
+            prompt_tokens INTEGER,
+            completion_tokens INTEGER,
+            recorded_at REAL
+        )""")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            self._local.conn = conn
+        return conn
+
+    def save(self, prompt: str, system_prompt: str, temperature: float, max_tokens: int, response: str,
+             provider: str, model: str, latency_ms: int, usage: dict):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                request_key(prompt, system_prompt, temperature, max_tokens), provider, model,
+                zlib.compress(response.encode("utf-8"), 9), latency_ms,
+                usage.get("prompt_tokens"), usage.get("completion_tokens"), time.time()
+            )
+        )
+        conn.commit()
+
+    def load(self, prompt: str, system_prompt: str = None, temperature: float = None, max_tokens: int = None) -> dict:
+        """Return the recorded response for a request, or None if it was never recorded."""
+        row = self._conn().execute(
+            "SELECT provider, model, response, latency_ms, prompt_tokens, completion_tokens FROM responses WHERE key = ?",
+            (request_key(prompt, system_prompt, temperature, max_tokens),)
+        ).fetchone()
+        if row is None:
+            return None
+        provider, model, response, latency_ms, prompt_tokens, completion_tokens = row
+        return {
+            "provider": provider,
+            "model": model,
+            "response": zlib.decompress(response).decode("utf-8"),
+            "latency_ms": latency_ms or 0,
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+        }
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
@@ -0,0 +1,139 @@
+"""
+Repurpose Agent
+Converts a finished content version into posts for other platforms.
+
+For multi-platform fan-out the source body is condensed once into a compact
+outline, and every platform conversion works from that outline concurrently
+instead of resending the full body. Outlines and conversions are cached per
+(version_id, platform) in the shared state store, so repeat views are free.
+"""
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from .base_agent import BaseAgent
+from .ai_client import get_ai_client, draft_task
+from ..shared_state import get_shared_state
+from .. import usage_ledger
+from ..tenancy import current_tenant
+
+# Max platform conversions run at the same time for one request
+REPURPOSE_CONCURRENCY = 5
+# Versions are immutable, so cached conversions only expire to bound storage
+REPURPOSE_CACHE_TTL = 7 * 24 * 3600
+
+PLATFORM_GUIDES = {
+    "Twitter": "Convert to a punchy tweet thread (max 280 chars per tweet, use emoji, make it viral)",
+    "Instagram": "Convert to an engaging Instagram caption with emojis and line breaks",
+    "LinkedIn": "Convert to a professional LinkedIn post with insights and a call-to-action",
+    "Blog": "Expand into a detailed blog post with headers and sections",
+    "Facebook": "Convert to a conversational Facebook post that encourages comments"
+}
+
+
+def _cache_key(version_id: int, name: str) -> str:
+    # Version ids repeat across per-tenant databases
+    return f"repurpose:{current_tenant()}:{version_id}:{name}"
+
+
+class RepurposeAgent(BaseAgent):
+    """
+    Repurpose Agent that adapts existing content to other platforms,
+    sharing one condensed outline of the source across all conversions.
+    """
+
+    def __init__(self):
+        super().__init__(name="RepurposeAgent")
+        self.ai_client = get_ai_client()
+        self.cache = get_shared_state()
+
+    def run(self, version_id: int, body: str, source_platform: str, target_platform: str) -> str:
+        """Repurpose the full source body for a single platform (cached)."""
+        cache_key = _cache_key(version_id, target_platform)
+        cached = self.cache.get(cache_key)
+        if cached:
+            print(f"[{self.name}] Cache hit for version {version_id} -> {target_platform}")
+            usage_ledger.record(agent=self.name, cache_hit=True)
+            return cached
+
+        result = self._convert(body, "ORIGINAL CONTENT", source_platform, target_platform)
+        if result:
+            self.cache.set(cache_key, result, ttl=REPURPOSE_CACHE_TTL)
+        return result
+
+    def run_many(self, version_id: int, body: str, source_platform: str, target_platforms: list) -> dict:
+        """
+        Repurpose one version for several platforms concurrently.
+        Returns {platform: content or None}.
+        """
+        results = {}
+        pending = []
+        for platform in dict.fromkeys(target_platforms):
+            cached = self.cache.get(_cache_key(version_id, platform))
+            if cached:
+                results[platform] = cached
+                usage_ledger.record(agent=self.name, cache_hit=True)
+            else:
+                pending.append(platform)
+
+        print(f"[{self.name}] Version {version_id}: {len(results)} cached, {len(pending)} to convert")
+        if not pending:
+            return results
+
+        outline = self.outline(version_id, body)
+        source, label = (outline, "SOURCE OUTLINE") if outline else (body, "ORIGINAL CONTENT")
+
+        with ThreadPoolExecutor(max_workers=min(len(pending), REPURPOSE_CONCURRENCY)) as pool:
+            futures = {
+                # Copy the usage scope into each worker thread
+                platform: pool.submit(
+                    contextvars.copy_context().run, self._convert, source, label, source_platform, platform
+                )
+                for platform in pending
+            }
+            for platform, future in futures.items():
+                content = future.result()
+                if content:
+                    self.cache.set(_cache_key(version_id, platform), content, ttl=REPURPOSE_CACHE_TTL)
+                results[platform] = content
+
+        return results
+
+    def outline(self, version_id: int, body: str) -> str:
+        """Condense a version into a reusable outline (cached per version)."""
+        cache_key = _cache_key(version_id, "outline")
+        cached = self.cache.get(cache_key)
+        if cached:
+            return cached
+
+        prompt = f"""Condense this content into a compact outline that another writer can turn into posts for any platform.
+
+CONTENT:
+{body}
+
+Include:
+- The core message in one sentence
+- 4-7 key points with any specific facts, numbers or examples
+- The call-to-action
+- Keywords and hashtags used
+
+Return ONLY the outline."""
+
+        result = self.ai_client.generate(prompt, temperature=0.3, max_tokens=400, agent=self.name)
+        if result:
+            self.cache.set(cache_key, result, ttl=REPURPOSE_CACHE_TTL)
+        return result
+
+    def _convert(self, source: str, label: str, source_platform: str, target_platform: str) -> str:
+        guide = PLATFORM_GUIDES.get(target_platform, "Adapt appropriately")
+        prompt = f"""Repurpose this content for {target_platform}.
+
+ORIGINAL PLATFORM: {source_platform}
+{label}:
+{source}
+
+TASK: {guide}
+
+Return ONLY the repurposed content, ready to post."""
+
+        return self.ai_client.generate(prompt, max_tokens=1000, agent=self.name, task=draft_task(target_platform))
@@ -1,23 +1,55 @@
+import threading
+from collections import OrderedDict
+
 from .base_agent import BaseAgent
+from .brand_tone import BrandProfile, score_batch
+
+# Projects whose brand profiles are kept in memory per worker
+PROFILE_CACHE_SIZE = 256
 
 class ScoringAgent(BaseAgent):
     def __init__(self):
         super().__init__(name="ScoringAgent")
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def profile(self, key, stamp, tone: str, load_approved) -> BrandProfile:
+        """
+        Cached brand profile for `key` (e.g. tenant and project id).
+        Rebuilt only when `stamp` (e.g. the project's latest version id) or the
+        tone changes; `load_approved` returns the approved texts on a miss.
+        """
+        with self._lock:
+            cached = self._profiles.get(key)
+            if cached and cached[0] == (stamp, tone):
+                self._profiles.move_to_end(key)
+                return cached[1]
+
+        profile = BrandProfile(tone, load_approved())
+        with self._lock:
+            self._profiles[key] = ((stamp, tone), profile)
+            self._profiles.move_to_end(key)
+            while len(self._profiles) > PROFILE_CACHE_SIZE:
+                self._profiles.popitem(last=False)
+        return profile
 
-    def run(self, seo_analysis: dict, brand_tone: str, content: str):
+    def run(self, seo_analysis: dict, brand_tone: str, content: str, profile: BrandProfile = None):
         print(f"[{self.name}] Calculating final content score...")
-        
-        # Base it largely on SEO for now, but in future could use LLM to check tone match
-        seo_score = seo_analysis.get("score", 0)
-        
-        # Mock brand check
-        brand_score = 85 # Assuming it matches for now
-        
-        # Weighted Average: 70% SEO, 30% Brand
-        final_weighted_score = (seo_score * 0.7) + (brand_score * 0.3)
-        
-        return {
-            "final_score": int(final_weighted_score),
-            "seo_score": seo_score,
-            "brand_score": brand_score
-        }
+        return self.run_batch([seo_analysis], [content], profile or BrandProfile(brand_tone))[0]
+
+    def run_batch(self, seo_analyses: list, contents: list, profile: BrandProfile) -> list:
+        """Final scores for several drafts at once (brand tone is scored locally, no LLM call)."""
+        brand_scores = score_batch(contents, profile)
+        results = []
+        for seo_analysis, brand_score in zip(seo_analyses, brand_scores):
+            seo_score = seo_analysis.get("score", 0)
+
+            # Weighted Average: 70% SEO, 30% Brand
+            final_weighted_score = (seo_score * 0.7) + (brand_score * 0.3)
+
+            results.append({
+                "final_score": int(final_weighted_score),
+                "seo_score": seo_score,
+                "brand_score": brand_score
+            })
+        return results
@@ -1,5 +1,5 @@
 from .base_agent import BaseAgent
-import textstat
+from . import readability
 import re
 
 class SEOAgent(BaseAgent):
@@ -14,9 +14,11 @@ class SEOAgent(BaseAgent):
         # 60-70 : Standard
         # 0-30 : Very Confusing
         try:
-            readability = textstat.flesch_reading_ease(content)
+            stats = readability.analyze(content)
+            readability_score = stats["flesch_reading_ease"]
         except:
-            readability = 50 # Fallback
+            stats = {}
+            readability_score = 50 # Fallback
             
         # 2. Keyword Density
         keyword_score = 0
@@ -41,12 +43,14 @@ class SEOAgent(BaseAgent):
         # Weight: 40% Readability, 60% Keyword Presence
         # We normalize readability (aiming for 60+) to a 0-100 scale approximately
         
-        normalized_readability = min(100, max(0, readability))
+        normalized_readability = min(100, max(0, readability_score))
         final_score = (normalized_readability * 0.4) + (keyword_score * 0.6)
         
         analysis = {
             "score": int(final_score),
-            "readability": readability,
+            "readability": readability_score,
+            "reading_grade": stats.get("flesch_kincaid_grade"),
+            "avg_sentence_length": stats.get("words_per_sentence"),
             "keyword_score": keyword_score,
             "feedback": feedback
         }
@@ -10,7 +10,8 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 from .base_agent import BaseAgent
-from .ai_client import get_ai_client
+from .ai_client import get_ai_client, draft_task
+from .. import deadlines
 import time
 
 # Load .env from the backend directory
@@ -30,7 +31,7 @@ class WriterAgent(BaseAgent):
         self.ai_client = get_ai_client()
 
     def run(self, topic: str, tone: str, platform: str = "Blog", feedback: str = None, 
-            research_context: dict = None, previous_version: dict = None):
+            research_context: dict = None, previous_version: dict = None, hedge: bool = False):
         print(f"[{self.name}] Writing content for topic: '{topic}'")
         print(f"[{self.name}] Tone: {tone}, Platform: {platform}")
         if feedback:
@@ -39,15 +40,19 @@ class WriterAgent(BaseAgent):
             print(f"[{self.name}] Improving on previous version (score: {previous_version.get('score', 'N/A')})")
 
         if self.ai_client.providers:
-            result = self._ai_write(topic, tone, platform, feedback, research_context, previous_version)
+            result = self._ai_write(topic, tone, platform, feedback, research_context, previous_version, hedge)
             if result:
                 return result
+            if deadlines.current().expired():
+                # The request ran out of time or was cancelled; a placeholder is no draft
+                print(f"[{self.name}] ✗ No draft: request {deadlines.current().stop_reason()}")
+                return None
         
         print(f"[{self.name}] Using mock content...")
         return self._mock_write(topic, tone, feedback)
     
     def _ai_write(self, topic: str, tone: str, platform: str, feedback: str, 
-                  research_context: dict, previous_version: dict = None) -> str:
+                  research_context: dict, previous_version: dict = None, hedge: bool = False) -> str:
         """Use AI to generate highly optimized marketing content."""
         
         # Build keyword context from research
@@ -178,7 +183,8 @@ Write in a {tone} tone. Create content that is:
 - Highly engaging (hooks, stories, CTAs)
 - Culturally relevant for Indian audiences"""
 
-        result = self.ai_client.generate(prompt, system_prompt, temperature=0.7, max_tokens=1500)
+        result = self.ai_client.generate(prompt, system_prompt, temperature=0.7, max_tokens=1500, agent=self.name, hedge=hedge,
+                                         task=draft_task(platform))
         
         if result:
             print(f"[{self.name}] AI content generation completed ({len(result)} chars)")
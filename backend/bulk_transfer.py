@@ -0,0 +1,440 @@
+"""
+Bulk Project Import/Export
+Moves whole project graphs (projects, research reports, calendar items and
+content versions) between databases, or out to analysis tools, without going
+through the API one row at a time:
+
+    python -m backend.bulk_transfer export ./dump --format parquet --projects 3,7
+    python -m backend.bulk_transfer import ./dump --tenant acme
+
+An export is a directory with one file per table plus manifest.json. Formats:
+
+- "parquet": columnar, zstd-compressed; readable by pandas, DuckDB, Spark, ...
+- "arrow": Arrow IPC files, for zero-copy reads
+- "ndjson": gzip-compressed JSON lines; needs no extra packages
+
+Parquet and Arrow need pyarrow (pip install pyarrow); without it exports
+default to NDJSON. Rows are read TRANSFER_BATCH at a time and written batch by
+batch, and imports insert each batch with one executemany, so memory stays
+flat however many versions a project has.
+
+IDs are kept, so foreign keys and links to versions stay valid. Rows are
+exported without their tenant and imported into the target tenant. An id that
+is already taken in the target database fails the import (nothing is
+written) unless --replace is given, which overwrites rows of the same tenant.
+
+Version bodies are exported as stored (latest in full, older versions as
+compressed deltas, see version_store). --decode-bodies writes every body as
+plain text instead, for analysis; such exports import as full bodies.
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import select, Integer, Float, Boolean, DateTime, LargeBinary, JSON
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from . import version_store, project_summary, topic_index, research_index
+from .db import SessionLocal, get_engine
+from .models import Project, ResearchReport, ContentCalendar, ContentVersion
+from .tenancy import current_tenant, tenant_scope, DEFAULT_TENANT
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pa = None
+
+PARQUET = "parquet"
+ARROW = "arrow"
+NDJSON = "ndjson"
+FORMATS = (PARQUET, ARROW, NDJSON)
+EXTENSIONS = {PARQUET: ".parquet", ARROW: ".arrow", NDJSON: ".ndjson.gz"}
+MANIFEST = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Rows per read batch, written file batch and insert statement
+TRANSFER_BATCH = int(os.getenv("TRANSFER_BATCH", "5000"))
+
+# Parents before children, so imports never insert a dangling foreign key
+TABLES = [Project.__table__, ResearchReport.__table__, ContentCalendar.__table__, ContentVersion.__table__]
+
+
+class TransferError(Exception):
+    """The export or import cannot be carried out (nothing was written)."""
+
+
+def default_format() -> str:
+    return PARQUET if pa is not None else NDJSON
+
+
+def _require_pyarrow(fmt: str):
+    if fmt != NDJSON and pa is None:
+        raise TransferError(f"The {fmt} format needs pyarrow (pip install pyarrow); use --format ndjson")
+
+
+def _columns(table) -> list:
+    """Columns that are transferred: everything except the tenant and index markers (re-indexed on import)."""
+    return [column for column in table.columns if column.name not in ("tenant_id", "indexed_at")]
+
+
+def _project_filter(table, project_ids):
+    """WHERE clause limiting `table` to the given projects (None = all projects)."""
+    if project_ids is None:
+        return None
+    if table is Project.__table__:
+        return table.c.id.in_(project_ids)
+    if table is ContentVersion.__table__:
+        calendar_ids = select(ContentCalendar.id).where(ContentCalendar.project_id.in_(project_ids))
+        return table.c.calendar_id.in_(calendar_ids)
+    return table.c.project_id.in_(project_ids)
+
+
+# --- Column encoding ---------------------------------------------------------
+
+def _arrow_type(column):
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column.type, LargeBinary):
+        return pa.binary()
+    return pa.string()  # Strings, text and JSON (serialized)
+
+
+def _arrow_schema(table):
+    return pa.schema([pa.field(column.name, _arrow_type(column)) for column in _columns(table)])
+
+
+def _encoders(table, fmt: str) -> dict:
+    """Per-column functions turning database values into file values (None values pass through)."""
+    encoders = {}
+    for column in _columns(table):
+        if isinstance(column.type, JSON):
+            if fmt != NDJSON:
+                encoders[column.name] = json.dumps
+        elif fmt == NDJSON and isinstance(column.type, DateTime):
+            encoders[column.name] = datetime.isoformat
+        elif fmt == NDJSON and isinstance(column.type, LargeBinary):
+            encoders[column.name] = lambda value: base64.b64encode(value).decode("ascii")
+    return encoders
+
+
+def _decoders(table, fmt: str) -> dict:
+    """Inverse of _encoders()."""
+    decoders = {}
+    for column in _columns(table):
+        if isinstance(column.type, JSON):
+            if fmt != NDJSON:
+                decoders[column.name] = json.loads
+        elif fmt == NDJSON and isinstance(column.type, DateTime):
+            decoders[column.name] = datetime.fromisoformat
+        elif fmt == NDJSON and isinstance(column.type, LargeBinary):
+            decoders[column.name] = base64.b64decode
+    return decoders
+
+
+def _convert(rows: list, converters: dict) -> list:
+    if converters:
+        for row in rows:
+            for name, convert in converters.items():
+                value = row.get(name)
+                if value is not None:
+                    row[name] = convert(value)
+    return rows
+
+
+# --- File writers and readers ------------------------------------------------
+
+class _NDJSONWriter:
+    def __init__(self, path: Path):
+        self._file = gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+
+    def write(self, rows: list):
+        self._file.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows))
+
+    def close(self):
+        self._file.close()
+
+
+class _ArrowWriter:
+    def __init__(self, path: Path, table, fmt: str):
+        self.schema = _arrow_schema(table)
+        if fmt == PARQUET:
+            self._writer = pa.parquet.ParquetWriter(str(path), self.schema, compression="zstd")
+        else:
+            self._sink = pa.OSFile(str(path), "wb")
+            options = pa.ipc.IpcWriteOptions(compression="zstd")
+            self._writer = pa.ipc.new_file(self._sink, self.schema, options=options)
+
+    def write(self, rows: list):
+        self._writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+        if hasattr(self, "_sink"):
+            self._sink.close()
+
+
+def _open_writer(path: Path, table, fmt: str):
+    return _NDJSONWriter(path) if fmt == NDJSON else _ArrowWriter(path, table, fmt)
+
+
+def _read_batches(path: Path, fmt: str, batch_size: int):
+    """Yield lists of row dicts from an exported table file."""
+    if fmt == PARQUET:
+        for batch in pa.parquet.ParquetFile(str(path)).iter_batches(batch_size=batch_size):
+            yield batch.to_pylist()
+    elif fmt == ARROW:
+        with pa.memory_map(str(path)) as source:
+            reader = pa.ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                yield reader.get_batch(index).to_pylist()
+    else:
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            batch = []
+            for line in file:
+                if line.strip():
+                    batch.append(json.loads(line))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+
+# --- Export ------------------------------------------------------------------
+
+def _stored_rows(db: Session, table, project_ids, batch_size: int):
+    query = select(*_columns(table)).where(table.c.tenant_id == current_tenant()).order_by(table.c.id)
+    where = _project_filter(table, project_ids)
+    if where is not None:
+        query = query.where(where)
+    result = db.execute(query.execution_options(yield_per=batch_size))
+    for partition in result.mappings().partitions(batch_size):
+        yield [dict(row) for row in partition]
+
+
+def _decoded_versions(db: Session, project_ids, batch_size: int):
+    """Versions with every body decoded to plain text (ordered by calendar item, not id)."""
+    names = [column.name for column in _columns(ContentVersion.__table__)]
+    columns = [getattr(ContentVersion, name) for name in names if name not in ("body", "body_delta")]
+    filters = [ContentVersion.tenant_id == current_tenant()]
+    if project_ids is not None:
+        filters.append(_project_filter(ContentVersion.__table__, project_ids))
+
+    batch = []
+    for version in version_store.iter_versions(db, columns, *filters, include_body=True, batch_size=batch_size):
+        version.update(body_delta=None, body_encoding=version_store.FULL)
+        batch.append({name: version[name] for name in names})
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_projects(directory: str, fmt: str = None, project_ids: list = None,
+                    decode_bodies: bool = False, batch_size: int = TRANSFER_BATCH) -> dict:
+    """Write the current tenant's projects (all, or `project_ids`) to `directory`. Returns the manifest."""
+    fmt = fmt or default_format()
+    _require_pyarrow(fmt)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    if (directory / MANIFEST).exists():
+        raise TransferError(f"{directory} already contains an export")
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "format": fmt,
+        "tenant": current_tenant(),
+        "project_ids": project_ids,
+        "decoded_bodies": decode_bodies,
+        "exported_at": datetime.utcnow().isoformat(),
+        "tables": {}
+    }
+    db = SessionLocal()
+    try:
+        for table in TABLES:
+            start = time.perf_counter()
+            path = directory / f"{table.name}{EXTENSIONS[fmt]}"
+            encoders = _encoders(table, fmt)
+            if decode_bodies and table is ContentVersion.__table__:
+                batches = _decoded_versions(db, project_ids, batch_size)
+            else:
+                batches = _stored_rows(db, table, project_ids, batch_size)
+
+            count = 0
+            writer = _open_writer(path, table, fmt)
+            try:
+                for rows in batches:
+                    writer.write(_convert(rows, encoders))
+                    count += len(rows)
+            finally:
+                writer.close()
+            manifest["tables"][table.name] = {
+                "file": path.name,
+                "rows": count,
+                "columns": [column.name for column in _columns(table)]
+            }
+            print(f"[BulkTransfer] ✓ Exported {count} {table.name} rows in {time.perf_counter() - start:.1f}s")
+    finally:
+        db.close()
+
+    # Written last: a directory without a manifest is an incomplete export
+    (directory / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+# --- Import ------------------------------------------------------------------
+
+def _insert_statement(table, columns: list, replace: bool):
+    statement = sqlite_insert(table)
+    if replace:
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.id],
+            set_={name: statement.excluded[name] for name in columns if name != "id"}
+        )
+    return statement
+
+
+def _check_ids(db: Session, table, ids: list, replace: bool):
+    """Refuse ids held by another tenant (or by anyone, without --replace)."""
+    query = select(table.c.id).where(table.c.id.in_(ids))
+    if replace:
+        query = query.where(table.c.tenant_id != current_tenant())
+    taken = db.execute(query.limit(5)).scalars().all()
+    if taken:
+        owner = "another tenant" if replace else "existing rows"
+        raise TransferError(f"{table.name} ids {taken} are already used by {owner}")
+
+
+def import_projects(directory: str, project_ids: list = None, replace: bool = False,
+                    batch_size: int = TRANSFER_BATCH) -> dict:
+    """
+    Load an export into the current tenant's database in one transaction.
+    Returns rows imported per table.
+    """
+    directory = Path(directory)
+    try:
+        manifest = json.loads((directory / MANIFEST).read_text())
+    except (OSError, ValueError) as e:
+        raise TransferError(f"{directory} is not a complete export: {e}")
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise TransferError(f"Unsupported export version {manifest.get('version')}")
+    fmt = manifest["format"]
+    _require_pyarrow(fmt)
+
+    tenant_id = current_tenant()
+    wanted = set(project_ids) if project_ids is not None else None
+    imported_projects, imported_reports, imported_calendars = set(), set(), set()
+    counts = {}
+    db = SessionLocal()
+    try:
+        for table in TABLES:
+            entry = manifest["tables"].get(table.name)
+            if entry is None:
+                continue
+            start = time.perf_counter()
+            known = {column.name for column in _columns(table)}
+            columns = [name for name in entry["columns"] if name in known]
+            statement = _insert_statement(table, columns, replace)
+            decoders = _decoders(table, fmt)
+
+            count = 0
+            for rows in _read_batches(directory / entry["file"], fmt, batch_size):
+                if table is Project.__table__:
+                    rows = [row for row in rows if wanted is None or row["id"] in wanted]
+                    imported_projects.update(row["id"] for row in rows)
+                elif table is ContentVersion.__table__:
+                    rows = [row for row in rows if row["calendar_id"] in imported_calendars]
+                else:
+                    rows = [row for row in rows if row["project_id"] in imported_projects]
+                    if table is ContentCalendar.__table__:
+                        imported_calendars.update(row["id"] for row in rows)
+                    else:
+                        imported_reports.update(row["id"] for row in rows)
+                if not rows:
+                    continue
+
+                _check_ids(db, table, [row["id"] for row in rows], replace)
+                rows = _convert([{name: row.get(name) for name in columns} for row in rows], decoders)
+                for row in rows:
+                    row["tenant_id"] = tenant_id
+                db.execute(statement, rows)
+                count += len(rows)
+            counts[table.name] = count
+            print(f"[BulkTransfer] ✓ Imported {count} {table.name} rows in {time.perf_counter() - start:.1f}s")
+
+        # Derived tables: re-index replaced topics and research, recompute dashboard aggregates
+        if replace:
+            topic_index.remove(db, imported_calendars)
+            research_index.remove(db, imported_reports)
+        for project_id in sorted(imported_projects):
+            topic_index.ensure_indexed(db, project_id)
+            project_summary.rebuild(db, project_id)
+        research_index.ensure_indexed(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return counts
+
+
+def _project_ids(value: str) -> list:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+if __name__ == "__main__":
+    import sys
+
+    from .db import Base, add_missing_columns
+
+    parser = argparse.ArgumentParser(prog="python -m backend.bulk_transfer", description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="write projects to a directory")
+    export_parser.add_argument("directory")
+    export_parser.add_argument("--format", choices=FORMATS, default=None,
+                               help="default: parquet if pyarrow is installed, else ndjson")
+    export_parser.add_argument("--decode-bodies", action="store_true",
+                               help="write every version body as plain text")
+    import_parser = commands.add_parser("import", help="load projects from an export directory")
+    import_parser.add_argument("directory")
+    import_parser.add_argument("--replace", action="store_true",
+                               help="overwrite rows with the same ids instead of failing")
+    for command_parser in (export_parser, import_parser):
+        command_parser.add_argument("--projects", type=_project_ids, default=None,
+                                    help="comma-separated project ids (default: all)")
+        command_parser.add_argument("--tenant", default=DEFAULT_TENANT)
+        command_parser.add_argument("--batch-size", type=int, default=TRANSFER_BATCH)
+    args = parser.parse_args()
+
+    with tenant_scope(args.tenant):
+        bind = get_engine()
+        Base.metadata.create_all(bind=bind)
+        add_missing_columns(bind)
+        try:
+            if args.command == "export":
+                manifest = export_projects(args.directory, args.format, args.projects,
+                                           args.decode_bodies, args.batch_size)
+                print(f"[BulkTransfer] ✓ Wrote {manifest['format']} export to {args.directory}")
+            else:
+                counts = import_projects(args.directory, args.projects, args.replace, args.batch_size)
+                print(f"[BulkTransfer] ✓ Imported {sum(counts.values())} rows into tenant '{args.tenant}'")
+        except TransferError as e:
+            print(f"[BulkTransfer] ✗ {e}")
+            sys.exit(1)
@@ -1,19 +1,93 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text, literal
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from pathlib import Path
+import os
+import threading
+
+from .tenancy import current_tenant, DEFAULT_TENANT
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./db.sqlite"
 
+# "shared": all tenants in db.sqlite, separated by tenant_id columns.
+# "file": each tenant except "default" gets its own SQLite file in TENANT_DB_DIR,
+# so large tenants don't slow down everyone's queries and can be moved to other nodes.
+TENANT_DATABASE = os.getenv("TENANT_DATABASE", "shared")
+TENANT_DB_DIR = os.getenv("TENANT_DB_DIR", "./tenants")
+
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_SessionFactory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+_tenant_engines = {}
+_tenant_engines_lock = threading.Lock()
+
+def get_engine(tenant_id: str = None):
+    """Engine holding the given (default: current) tenant's data."""
+    tenant_id = tenant_id or current_tenant()
+    if TENANT_DATABASE != "file" or tenant_id == DEFAULT_TENANT:
+        return engine
+    with _tenant_engines_lock:
+        tenant_engine = _tenant_engines.get(tenant_id)
+        if tenant_engine is None:
+            Path(TENANT_DB_DIR).mkdir(parents=True, exist_ok=True)
+            tenant_engine = create_engine(
+                f"sqlite:///{Path(TENANT_DB_DIR) / tenant_id}.sqlite",
+                connect_args={"check_same_thread": False}
+            )
+            Base.metadata.create_all(bind=tenant_engine)
+            add_missing_columns(tenant_engine)
+            _tenant_engines[tenant_id] = tenant_engine
+            print(f"[DB] Opened database for tenant '{tenant_id}'")
+        return tenant_engine
+
+def all_engines() -> list:
+    with _tenant_engines_lock:
+        return [engine] + list(_tenant_engines.values())
+
+def SessionLocal():
+    """Session on the current tenant's database."""
+    return _SessionFactory(bind=get_engine())
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+def add_missing_columns(bind=engine):
+    """
+    Add columns and indexes that exist on the models but not in an older database file.
+    create_all() only creates missing tables, so databases created before a
+    column was introduced are patched here with ALTER TABLE ADD COLUMN
+    (filling existing rows with the column's server default, if any).
+    """
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                col_type = column.type.compile(dialect=bind.dialect)
+                default = ""
+                if column.server_default is not None:
+                    value = literal(column.server_default.arg).compile(
+                        dialect=bind.dialect, compile_kwargs={"literal_binds": True}
+                    )
+                    default = f" DEFAULT {value}"
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {col_type}{default}'))
+                print(f"[DB] Added column {table.name}.{column.name}")
+
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(conn)
+                    print(f"[DB] Added index {index.name}")
@@ -0,0 +1,106 @@
+"""
+Request Deadlines and Cancellation
+A generation request carries a Deadline: an optional point in time after
+which no more work should start, plus a cancellation flag that the route
+sets when the client disconnects.
+
+Like the usage ledger scope and the tenant, the deadline lives in a context
+variable, so it reaches AIClient without every agent passing it around:
+
+    deadline = Deadline(timeout=30)
+    with deadline_scope(deadline):
+        ...  # AIClient calls in here stop once the deadline passes
+
+- AIClient gives each provider call at most the remaining time, abandons a
+  pending call as soon as the request is cancelled, and starts no further
+  fallbacks once the deadline has passed
+- the Orchestrator starts no rewrite that cannot finish in time and saves
+  the best draft scored so far
+"""
+
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Default time limit for generation requests in seconds (0 = none); clients
+# can ask for a shorter one with the X-Request-Timeout header
+GENERATION_DEADLINE = float(os.getenv("GENERATION_DEADLINE", "0"))
+DEADLINE_HEADER = "X-Request-Timeout"
+
+
+class DeadlineExceeded(Exception):
+    """Raised when work is started after the request's deadline or cancellation."""
+
+
+class Deadline:
+    def __init__(self, timeout: float = None):
+        self.expires_at = time.monotonic() + timeout if timeout else None
+        self.reason = None
+        self._cancelled = threading.Event()
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._cancelled.is_set():
+            self.reason = reason
+            self._cancelled.set()
+            print(f"[Deadline] ✗ Request {reason}")
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def remaining(self) -> float:
+        """Seconds left (None if there is no time limit, 0 once cancelled)."""
+        if self.cancelled:
+            return 0.0
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() == 0.0
+
+    def stop_reason(self) -> str:
+        """Why work stopped: the client went away ("cancelled") or time ran out ("deadline")."""
+        return "cancelled" if self.cancelled else "deadline"
+
+    def wait(self, seconds: float) -> bool:
+        """Sleep up to `seconds`, waking early on cancellation. Returns True if cancelled."""
+        return self._cancelled.wait(seconds)
+
+
+# A deadline that never expires, for work outside any request
+NO_DEADLINE = Deadline()
+
+_deadline = contextvars.ContextVar("request_deadline", default=NO_DEADLINE)
+
+
+@contextmanager
+def deadline_scope(deadline: Deadline):
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def current() -> Deadline:
+    return _deadline.get()
+
+
+def check(deadline: Deadline = None):
+    """Raise DeadlineExceeded if the (current) request is out of time or cancelled."""
+    deadline = deadline or current()
+    if deadline.expired():
+        raise DeadlineExceeded("Request cancelled" if deadline.cancelled else "Request deadline exceeded")
+
+
+def request_timeout(header_value: str = None) -> float:
+    """Time limit for a request: the client's X-Request-Timeout, capped by GENERATION_DEADLINE."""
+    try:
+        requested = float(header_value) if header_value else 0.0
+    except ValueError:
+        requested = 0.0
+    limits = [t for t in (requested, GENERATION_DEADLINE) if t > 0]
+    return min(limits) if limits else None
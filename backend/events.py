@@ -0,0 +1,219 @@
+"""
+Live Project Events
+Push channel for the UI, so pages don't have to re-fetch to learn that
+something finished. The Orchestrator and routes publish events per project:
+
+- research.completed: a research run or refresh saved its report
+- calendar.updated: calendar items were added or removed
+- version.created: a content version was saved (with its scores)
+
+and GET /projects/{id}/events streams them to browsers as server-sent events.
+
+Like the shared state, the bus has two backends (EVENTS_BACKEND):
+
+- "memory": in-process fan-out, for a single uvicorn process (default)
+- "sqlite": events are appended to a table in SHARED_STATE_PATH and every
+  worker polls it, so subscribers see events published by any worker
+
+Events are scoped to the publishing tenant. publish() never raises:
+notifications must not break generation.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .tenancy import current_tenant
+
+RESEARCH_COMPLETED = "research.completed"
+CALENDAR_UPDATED = "calendar.updated"
+VERSION_CREATED = "version.created"
+
+# Events buffered per subscriber before the oldest are dropped (slow clients)
+SUBSCRIBER_BUFFER = 100
+# How often sqlite-backend workers look for new events, and how long events are kept
+EVENTS_POLL_INTERVAL = float(os.getenv("EVENTS_POLL_INTERVAL", "0.5"))
+EVENTS_RETENTION = 300
+
+# Delivered to subscriptions when the bus closes, ending their streams
+CLOSED = {"type": "closed"}
+
+
+class Subscription:
+    """Events of one project, queued for one client on its event loop."""
+
+    def __init__(self, key: tuple):
+        self.key = key
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_BUFFER)
+
+    def deliver(self, event: dict):
+        # Called from any thread; the queue belongs to the subscriber's loop
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # Loop already closed; the subscriber is gone
+
+    def _put(self, event: dict):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+
+class MemoryEventBus:
+    """Per-process publish/subscribe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+        self._ids = itertools.count(1)
+        self.closed = False
+
+    def subscribe(self, tenant_id: str, project_id: int) -> Subscription:
+        subscription = Subscription((tenant_id, project_id))
+        with self._lock:
+            self._subscriptions.setdefault(subscription.key, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.key, set())
+            subscribers.discard(subscription)
+            if not subscribers:
+                self._subscriptions.pop(subscription.key, None)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subscriptions.values())
+
+    def publish(self, tenant_id: str, project_id: int, event_type: str, data: dict):
+        self._dispatch(tenant_id, {
+            "id": next(self._ids), "type": event_type, "project_id": project_id,
+            "data": data, "created_at": time.time()
+        })
+
+    def _dispatch(self, tenant_id: str, event: dict):
+        with self._lock:
+            subscribers = list(self._subscriptions.get((tenant_id, event["project_id"]), ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    def close(self):
+        """End every open stream (e.g. on worker shutdown)."""
+        with self._lock:
+            self.closed = True
+            subscribers = [s for subs in self._subscriptions.values() for s in subs]
+        for subscription in subscribers:
+            subscription.deliver(CLOSED)
+
+
+class SQLiteEventBus(MemoryEventBus):
+    """Events shared by all workers on the host through a SQLite table."""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._local = threading.local()
+        self._poller_pid = None
+        self._stop = threading.Event()
+        self._last_id = 0
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY AUTOINCREMENT, tenant_id TEXT, "
+            "project_id INTEGER, type TEXT, data TEXT, created_at REAL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread (and per process, since forked workers get new threads)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def subscribe(self, tenant_id: str, project_id: int) -> Subscription:
+        self._ensure_poller()
+        return super().subscribe(tenant_id, project_id)
+
+    def publish(self, tenant_id: str, project_id: int, event_type: str, data: dict):
+        # Delivered by each worker's poller, including this one
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO events (tenant_id, project_id, type, data, created_at) VALUES (?, ?, ?, ?, ?)",
+            (tenant_id, project_id, event_type, json.dumps(data), now)
+        )
+        conn.execute("DELETE FROM events WHERE created_at < ?", (now - EVENTS_RETENTION,))
+
+    def _ensure_poller(self):
+        """
+        Start this process's poller on its first subscriber. Only events
+        published from then on are delivered: the bus may have been built
+        long before (in the gunicorn master with preload_app), and older
+        events must not be replayed to the new stream.
+        """
+        with self._lock:
+            if self._poller_pid == os.getpid():
+                return
+            self._poller_pid = os.getpid()
+            self._last_id = self._conn().execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+        threading.Thread(target=self._poll, name="events-poller", daemon=True).start()
+
+    def close(self):
+        self._stop.set()
+        super().close()
+
+    def _poll(self):
+        while not self._stop.wait(EVENTS_POLL_INTERVAL):
+            try:
+                rows = self._conn().execute(
+                    "SELECT id, tenant_id, project_id, type, data, created_at FROM events WHERE id > ? ORDER BY id",
+                    (self._last_id,)
+                ).fetchall()
+            except sqlite3.Error as e:
+                print(f"[Events] ✗ Failed to read events: {e}")
+                continue
+            for event_id, tenant_id, project_id, event_type, data, created_at in rows:
+                self._last_id = event_id
+                self._dispatch(tenant_id, {
+                    "id": event_id, "type": event_type, "project_id": project_id,
+                    "data": json.loads(data), "created_at": created_at
+                })
+
+
+# Singleton instance
+_event_bus = None
+
+def get_event_bus():
+    """Get the configured event bus for this process."""
+    global _event_bus
+    if _event_bus is None:
+        backend = os.getenv("EVENTS_BACKEND", "memory").lower()
+        if backend == "sqlite":
+            _event_bus = SQLiteEventBus(os.getenv("SHARED_STATE_PATH", "./shared_state.sqlite"))
+        else:
+            _event_bus = MemoryEventBus()
+        print(f"[Events] Using {backend} backend")
+    return _event_bus
+
+
+def publish(project_id: int, event_type: str, **data):
+    """Publish an event for the current tenant's project. Never raises."""
+    try:
+        get_event_bus().publish(current_tenant(), project_id, event_type, data)
+    except Exception as e:
+        print(f"[Events] ✗ Failed to publish {event_type}: {e}")
+
+
+def format_sse(event: dict) -> str:
+    """One server-sent event frame."""
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
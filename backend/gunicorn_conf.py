@@ -0,0 +1,49 @@
+"""
+Gunicorn configuration for multi-worker serving.
+
+Runs one uvicorn worker per core with the app preloaded in the master, a
+SQLite-backed shared cache/rate-limit store, and graceful draining of
+in-flight generations on reload (kill -HUP) or shutdown:
+
+    gunicorn -c backend/gunicorn_conf.py backend.main:app
+
+Tunable with environment variables: BIND, WEB_CONCURRENCY, GRACEFUL_TIMEOUT,
+WORKER_TIMEOUT, SHARED_STATE_PATH, EVENTS_BACKEND, GENERATION_RATE_LIMIT,
+DRAIN_TIMEOUT.
+"""
+
+import multiprocessing
+import os
+
+# Workers must share cache and rate-limit state, and see each other's live events
+os.environ.setdefault("SHARED_STATE_BACKEND", "sqlite")
+os.environ.setdefault("EVENTS_BACKEND", "sqlite")
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app (and warm it up) once in the master, then fork
+preload_app = True
+
+# A content generation with feedback iterations can take minutes
+timeout = int(os.getenv("WORKER_TIMEOUT", "300"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "180"))
+keepalive = 5
+
+
+def on_starting(server):
+    from backend import serving
+    serving.warm_up()
+
+
+def post_fork(server, worker):
+    from backend import serving
+    serving.after_fork()
+    server.log.info(f"Worker {worker.pid} ready")
+
+
+def worker_exit(server, worker):
+    from backend import serving
+    if serving.in_flight():
+        server.log.warning(f"Worker {worker.pid} exiting with {serving.in_flight()} generation(s) in flight")
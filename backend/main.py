@@ -1,17 +1,53 @@
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, Request, Response, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List, Optional
+from contextlib import asynccontextmanager
+import asyncio
+from starlette.concurrency import run_in_threadpool
+import os
 
-from .db import engine, Base, get_db
-from .models import Project, ResearchReport, ContentCalendar, ContentVersion
-from .orchestrator import Orchestrator
+from .db import engine, Base, get_db, add_missing_columns, SessionLocal
+from .models import Project, ResearchReport, ContentCalendar, ContentVersion, GenerationIteration
+from .orchestrator import Orchestrator, LoopPolicy
+from .agents.content_strategy_agent import DEFAULT_HORIZON_DAYS, MAX_HORIZON_DAYS
+from . import version_store, project_summary, serving, usage_ledger, http_cache, serialization, topic_index, tenancy, deadlines, events, profiling
+from . import research_index, scheduler
+from .serialization import FastJSONResponse
 
 # Create tables
 Base.metadata.create_all(bind=engine)
+add_missing_columns()
+# Index research reports saved before the analytics tables existed, so analytics routes only read
+if research_index.backfill():
+    print("[Startup] ✓ Indexed research reports for analytics")
 
-app = FastAPI(title="Agentic AI Marketing Platform")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # End open event streams as soon as shutdown starts; the server waits for them before the code below runs
+    serving.on_exit_signal(events.get_event_bus().close)
+    yield
+    # Let in-flight generations finish before this worker exits (reload/deploy)
+    events.get_event_bus().close()
+    await run_in_threadpool(serving.drain)
+
+async def bind_tenant(x_tenant_id: Optional[str] = Header(None)):
+    """
+    Run the request as the tenant named in X-Tenant-ID (default tenant if absent).
+    The header is trusted as-is: tenants partition data but do not restrict
+    access (see tenancy).
+    """
+    # Async so the context variable is set in the request's own context
+    try:
+        tenancy.set_tenant(x_tenant_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+app = FastAPI(title="Agentic AI Marketing Platform", lifespan=lifespan, dependencies=[Depends(bind_tenant)])
 
 # CORS Setup
 origins = [
@@ -25,10 +61,54 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# Compress JSON responses above the threshold; prefer brotli when brotli-asgi is installed
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1000"))
+try:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESS_MIN_SIZE, gzip_fallback=True)
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESS_MIN_SIZE)
+
+# Opt-in request profiles (PROFILE_SLOW_MS / PROFILE_SAMPLE_RATE), served under /diagnostics
+if profiling.ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+
 orchestrator = Orchestrator()
 
+def generation_guard(request: Request):
+    """Rate-limit LLM-heavy routes and track them so shutdown can drain them."""
+    if serving.is_draining():
+        raise HTTPException(status_code=503, detail="Server is restarting, please retry")
+    client_id = request.client.host if request.client else "unknown"
+    if not serving.allow_generation(client_id):
+        raise HTTPException(status_code=429, detail="Too many generation requests, please slow down")
+    with serving.track_generation():
+        yield
+
+def scheduled(priority: str):
+    """
+    Dependency running the route as `priority` work: it waits (without a
+    thread) for a request slot of its class, tenants taking turns, and its
+    provider calls are scheduled with that priority (see backend/scheduler.py).
+    """
+    async def admit(request: Request):
+        scheduler.set_priority(priority)
+        try:
+            ticket = await scheduler.request_queue.acquire_async(priority, is_cancelled=request.is_disconnected)
+        except scheduler.QueueTimeout as e:
+            raise HTTPException(status_code=503, detail=f"Server busy: {e}", headers={"Retry-After": "10"})
+        try:
+            yield
+        finally:
+            scheduler.request_queue.release(ticket)
+    return admit
+
+interactive_work = Depends(scheduled(scheduler.INTERACTIVE))
+batch_work = Depends(scheduled(scheduler.BATCH))
+
 # Pydantic Schemas
 class ProjectCreate(BaseModel):
     niche: str
@@ -41,6 +121,32 @@ class ProjectResponse(ProjectCreate):
     class Config:
         from_attributes = True
 
+class ResearchReportResponse(BaseModel):
+    summary: Optional[str] = None
+    keyword_clusters: dict = {}
+    competitors: list = []
+    trends: list = []
+    audience_insights: dict = {}
+
+class CalendarItemResponse(BaseModel):
+    id: int
+    project_id: int
+    platform: Optional[str] = None
+    date: Optional[str] = None
+    content_type: Optional[str] = None
+    topic: Optional[str] = None
+    objective: Optional[str] = None
+
+class ContentVersionResponse(BaseModel):
+    id: int
+    calendar_id: int
+    title: Optional[str] = None
+    body: str = ""
+    seo_score: Optional[int] = None
+    readability_score: Optional[int] = None
+    brand_score: Optional[int] = None
+    version_number: Optional[int] = None
+
 # Routes
 
 @app.post("/projects/", response_model=ProjectResponse)
@@ -57,145 +163,298 @@ def create_project(project: ProjectCreate, db: Session = Depends(get_db)):
     return db_project
 
 @app.get("/projects/{project_id}", response_model=ProjectResponse)
-def get_project(project_id: int, db: Session = Depends(get_db)):
-    project = db.query(Project).filter(Project.id == project_id).first()
+def get_project(project_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    project = db.query(Project).filter(Project.tenant_id == tenancy.current_tenant(), Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    return project
+    etag = http_cache.make_etag("project", project.id, project.updated_at)
+    return http_cache.conditional(request, response, etag) or project
 
-@app.post("/projects/{project_id}/research")
-def start_research(project_id: int, background_tasks: BackgroundTasks):
+@app.get("/projects/{project_id}/summary")
+def get_project_summary(project_id: int, db: Session = Depends(get_db)):
+    """Dashboard aggregates for a project: generation progress, per-item scores and platform/objective counts."""
+    project = db.query(Project).filter(Project.tenant_id == tenancy.current_tenant(), Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return project_summary.get_summary(db, project_id)
+
+@app.post("/projects/{project_id}/research", dependencies=[Depends(generation_guard), batch_work])
+def start_research(project_id: int, background_tasks: BackgroundTasks, mode: str = "full",
+                   horizon_days: int = DEFAULT_HORIZON_DAYS, include_research: bool = True):
     # We run this in background or synchronously based on preference. 
     # For a demo, synchronous is often easier to debug, but let's do synchronous for simplicity of "Viva" showing it happening.
     # Actually, the user might want a spinner, but let's keep it simple.
+    # mode=refresh only regenerates stale research sections and merges the calendar.
+    # horizon_days plans that many days ahead; long horizons are planned in week-sized chunks.
+    # include_research=false leaves the (large) report out; GET /projects/{id}/research serves it.
+    if mode not in ("full", "refresh"):
+        raise HTTPException(status_code=400, detail="mode must be 'full' or 'refresh'")
+    if not 1 <= horizon_days <= MAX_HORIZON_DAYS:
+        raise HTTPException(status_code=400, detail=f"horizon_days must be between 1 and {MAX_HORIZON_DAYS}")
     try:
-        result = orchestrator.start_project(project_id)
+        result = orchestrator.start_project(project_id, mode=mode, horizon_days=horizon_days)
+        if not include_research:
+            result.pop("research_data", None)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/projects/{project_id}/research")
-def get_research(project_id: int, db: Session = Depends(get_db)):
-    """Fetch existing research report for a project."""
-    report = db.query(ResearchReport).filter(ResearchReport.project_id == project_id).first()
-    if not report:
+@app.get("/projects/{project_id}/research", response_model=ResearchReportResponse)
+def get_research(project_id: int, request: Request, db: Session = Depends(get_db)):
+    """
+    Fetch the project's research report. Research runs update it in place;
+    projects researched before that may have older reports, and the latest wins.
+    """
+    count, latest_id, updated_at = http_cache.row_version(
+        db, ResearchReport, ResearchReport.tenant_id == tenancy.current_tenant(), ResearchReport.project_id == project_id
+    )
+    if not count:
         raise HTTPException(status_code=404, detail="No research found. Please run research first.")
-    return {
-        "summary": report.summary,
-        "keyword_clusters": report.keyword_clusters or {},
-        "competitors": report.competitors or [],
-        "trends": report.trends or [],
-        "audience_insights": report.audience_insights or {}
-    }
+    etag = http_cache.make_etag("research", project_id, latest_id, updated_at)
+    if http_cache.not_modified(request, etag):
+        return Response(status_code=304, headers=http_cache.validators(etag))
+
+    row = db.query(*serialization.columns(ResearchReport, ResearchReportResponse)).filter(
+        ResearchReport.id == latest_id
+    ).one()
+    return FastJSONResponse({
+        "summary": row.summary,
+        "keyword_clusters": row.keyword_clusters or {},
+        "competitors": row.competitors or [],
+        "trends": row.trends or [],
+        "audience_insights": row.audience_insights or {}
+    }, headers=http_cache.validators(etag))
+
+@app.get("/projects/{project_id}/calendar", response_model=List[CalendarItemResponse])
+def get_calendar(project_id: int, request: Request, db: Session = Depends(get_db)):
+    version = http_cache.row_version(
+        db, ContentCalendar, ContentCalendar.tenant_id == tenancy.current_tenant(), ContentCalendar.project_id == project_id
+    )
+    etag = http_cache.make_etag("calendar", project_id, *version)
+    if http_cache.not_modified(request, etag):
+        return Response(status_code=304, headers=http_cache.validators(etag))
+
+    rows = db.query(*serialization.columns(ContentCalendar, CalendarItemResponse)).filter(
+        ContentCalendar.tenant_id == tenancy.current_tenant(), ContentCalendar.project_id == project_id
+    ).order_by(ContentCalendar.id).all()
+    return FastJSONResponse(serialization.to_dicts(rows, CalendarItemResponse), headers=http_cache.validators(etag))
+
+@app.get("/projects/{project_id}/calendar/duplicates")
+def get_calendar_duplicates(project_id: int, db: Session = Depends(get_db)):
+    """Groups of near-duplicate calendar topics in a project (see topic_index)."""
+    project = db.query(Project).filter(Project.tenant_id == tenancy.current_tenant(), Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    groups = topic_index.duplicate_groups(db, project_id)
+    db.commit()  # Persist any rows indexed on first lookup
+    return {"threshold": topic_index.DUPLICATE_THRESHOLD, "groups": groups}
+
+class GenerationOptions(BaseModel):
+    """Optional per-request overrides for the feedback loop (see LoopPolicy)."""
+    max_iterations: Optional[int] = None
+    quality_threshold: Optional[int] = None
+    min_improvement: Optional[float] = None
+    patience: Optional[int] = None
+    time_budget: Optional[float] = None
+    token_budget: Optional[int] = None
 
-@app.get("/projects/{project_id}/calendar")
-def get_calendar(project_id: int, db: Session = Depends(get_db)):
-    calendar = db.query(ContentCalendar).filter(ContentCalendar.project_id == project_id).all()
-    return calendar
+# How often a running generation checks whether its client has gone away
+DISCONNECT_POLL_SECONDS = 0.5
 
-@app.post("/generate/{calendar_id}")
-def generate_content(calendar_id: int):
+async def _run_generation(calendar_id: int, options: Optional[GenerationOptions], request: Request,
+                          request_timeout: Optional[str], hedge: bool = False):
+    """
+    Run the feedback loop in a worker thread under a request deadline
+    (X-Request-Timeout, capped by GENERATION_DEADLINE). The deadline is
+    cancelled if the client disconnects, so abandoned requests stop calling
+    providers and keep the best draft so far. If no draft was finished in
+    time, the response is 504 (deadline) or 499 (client went away).
+    `hedge` races slow providers (interactive requests only; see AIClient.generate).
+    """
+    try:
+        policy = LoopPolicy(**options.model_dump()) if options else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    deadline = deadlines.Deadline(deadlines.request_timeout(request_timeout))
+    work = asyncio.ensure_future(run_in_threadpool(orchestrator.generate_content, calendar_id, policy, deadline, hedge))
+    while not work.done():
+        await asyncio.wait({work}, timeout=DISCONNECT_POLL_SECONDS)
+        if not work.done() and not deadline.cancelled and await request.is_disconnected():
+            deadline.cancel("cancelled by client disconnect")
     try:
         # This runs the loop
-        result = orchestrator.generate_content(calendar_id)
-        return {"status": "completed", "version_id": result.id, "score": result.seo_score}
+        result = work.result()
+        return {
+            "status": "completed",
+            "version_id": result.id,
+            "score": result.seo_score,
+            "iterations": result.iterations_run,
+            "stop_reason": result.stop_reason
+        }
+    except deadlines.DeadlineExceeded as e:
+        raise HTTPException(status_code=499 if deadline.cancelled else 504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/content/{calendar_id}/versions")
-def get_content_versions(calendar_id: int, db: Session = Depends(get_db)):
-    versions = db.query(ContentVersion).filter(ContentVersion.calendar_id == calendar_id).all()
-    return versions
+@app.post("/generate/{calendar_id}", dependencies=[Depends(generation_guard), batch_work])
+async def generate_content(calendar_id: int, request: Request, options: Optional[GenerationOptions] = None,
+                           x_request_timeout: Optional[str] = Header(None)):
+    return await _run_generation(calendar_id, options, request, x_request_timeout)
+
+@app.get("/content/{calendar_id}/versions", response_model=List[ContentVersionResponse])
+def get_content_versions(calendar_id: int, request: Request, include_body: bool = True, db: Session = Depends(get_db)):
+    """Versions of a calendar item, oldest first (include_body=false skips loading and decoding bodies)."""
+    # Validate against row versions first so unchanged bodies are never reconstructed or resent
+    version = http_cache.row_version(
+        db, ContentVersion, ContentVersion.tenant_id == tenancy.current_tenant(), ContentVersion.calendar_id == calendar_id
+    )
+    etag = http_cache.make_etag("versions", calendar_id, include_body, *version)
+    if http_cache.not_modified(request, etag):
+        return Response(status_code=304, headers=http_cache.validators(etag))
+
+    extra = (ContentVersion.body_delta, ContentVersion.body_encoding) if include_body else ()
+    fields = [name for name in ContentVersionResponse.model_fields if include_body or name != "body"]
+    rows = db.query(*[getattr(ContentVersion, name) for name in fields], *extra).filter(
+        ContentVersion.tenant_id == tenancy.current_tenant(), ContentVersion.calendar_id == calendar_id
+    ).order_by(ContentVersion.id).all()
+    versions = [dict(zip(fields, row)) for row in rows]
+    if include_body:
+        bodies = version_store.reconstruct_bodies(rows)
+        for v in versions:
+            v["body"] = bodies[v["id"]]
+    return FastJSONResponse(versions, headers=http_cache.validators(etag))
+
+@app.get("/projects/{project_id}/versions", response_model=List[ContentVersionResponse])
+def get_project_versions(project_id: int, request: Request, include_body: bool = False, db: Session = Depends(get_db)):
+    """
+    Every version of a project, streamed by calendar item (newest version first).
+    Rows are read in batches from the database and encoded as they go, so memory
+    stays flat for projects with thousands of versions. Bodies are only
+    decoded with include_body=true.
+    """
+    project = db.query(Project.id).filter(Project.tenant_id == tenancy.current_tenant(), Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    filters = (
+        ContentVersion.tenant_id == tenancy.current_tenant(),
+        ContentVersion.calendar_id.in_(
+            select(ContentCalendar.id).where(
+                ContentCalendar.tenant_id == tenancy.current_tenant(), ContentCalendar.project_id == project_id
+            )
+        )
+    )
+    etag = http_cache.make_etag("project-versions", project_id, include_body, *http_cache.row_version(db, ContentVersion, *filters))
+    if http_cache.not_modified(request, etag):
+        return Response(status_code=304, headers=http_cache.validators(etag))
+
+    columns = [getattr(ContentVersion, name) for name in ContentVersionResponse.model_fields if name != "body"]
+
+    def rows():
+        # The request's session closes before the body is sent, so the stream opens its own
+        stream_db = SessionLocal()
+        try:
+            yield from version_store.iter_versions(stream_db, columns, *filters, include_body=include_body)
+        finally:
+            stream_db.close()
+
+    return StreamingResponse(serialization.json_array(rows()), media_type="application/json",
+                             headers=http_cache.validators(etag))
+
+@app.post("/content/{calendar_id}/write", dependencies=[Depends(generation_guard), interactive_work])
+async def write_content(calendar_id: int, request: Request, options: Optional[GenerationOptions] = None,
+                        x_request_timeout: Optional[str] = Header(None)):
+    """Generate/regenerate content for a calendar item (the editor's interactive path, so provider calls are hedged)."""
+    return await _run_generation(calendar_id, options, request, x_request_timeout, hedge=True)
+
+@app.get("/content/{calendar_id}/iterations")
+def get_generation_iterations(calendar_id: int, db: Session = Depends(get_db)):
+    """Per-iteration scores, timing and estimated tokens of the feedback loop, by version."""
+    rows = db.query(GenerationIteration).filter(
+        GenerationIteration.tenant_id == tenancy.current_tenant(), GenerationIteration.calendar_id == calendar_id
+    ).order_by(GenerationIteration.version_id, GenerationIteration.iteration).all()
+    return [
+        {
+            "version_id": r.version_id,
+            "iteration": r.iteration,
+            "seo_score": r.seo_score,
+            "readability_score": r.readability_score,
+            "keyword_score": r.keyword_score,
+            "brand_score": r.brand_score,
+            "feedback": r.feedback or [],
+            "duration_ms": r.duration_ms,
+            "estimated_tokens": r.estimated_tokens,
+            "decision": r.decision
+        }
+        for r in rows
+    ]
 
-@app.post("/content/{calendar_id}/write")
-def write_content(calendar_id: int):
-    """Generate/regenerate content for a calendar item."""
+@app.post("/content/{calendar_id}/hashtags", dependencies=[Depends(generation_guard), interactive_work])
+def generate_hashtags(calendar_id: int, refresh: bool = False):
+    """Get hashtags for a content piece (stored per version; refresh=true regenerates)."""
     try:
-        result = orchestrator.generate_content(calendar_id)
-        return {"status": "completed", "version_id": result.id, "score": result.seo_score}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        return orchestrator.generate_hashtags(calendar_id, refresh=refresh)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
-@app.post("/content/{calendar_id}/hashtags")
-def generate_hashtags(calendar_id: int, db: Session = Depends(get_db)):
-    """Generate hashtags for a content piece."""
-    from .agents.ai_client import get_ai_client
-    
-    # Get the calendar item and latest content
-    calendar_item = db.query(ContentCalendar).filter(ContentCalendar.id == calendar_id).first()
-    if not calendar_item:
-        raise HTTPException(status_code=404, detail="Calendar item not found")
-    
-    latest_version = db.query(ContentVersion).filter(
-        ContentVersion.calendar_id == calendar_id
-    ).order_by(ContentVersion.version_number.desc()).first()
-    
-    content_text = latest_version.body if latest_version else calendar_item.topic
-    
-    ai_client = get_ai_client()
-    prompt = f"""Generate 15 trending and relevant hashtags for this social media content.
-    
-Platform: {calendar_item.platform}
-Topic: {calendar_item.topic}
-Content: {content_text[:500]}
+class RepurposeRequest(BaseModel):
+    target_platform: str
 
-Return ONLY the hashtags, one per line, starting with #. Make them relevant for Indian audience.
-Mix popular hashtags with niche-specific ones."""
+@app.post("/content/{calendar_id}/repurpose", dependencies=[Depends(generation_guard), interactive_work])
+def repurpose_content(calendar_id: int, request: RepurposeRequest, db: Session = Depends(get_db)):
+    """Repurpose content for a different platform."""
+    calendar_item, latest_version = _repurpose_source(calendar_id, db)
     
-    result = ai_client.generate(prompt, max_tokens=200)
+    with usage_ledger.usage_scope(project_id=calendar_item.project_id, calendar_id=calendar_id):
+        result = orchestrator.repurpose_agent.run(
+            latest_version.id, latest_version.body, calendar_item.platform, request.target_platform
+        )
     
     if result:
-        hashtags = [tag.strip() for tag in result.split('\n') if tag.strip().startswith('#')]
-        return {"hashtags": hashtags[:15]}
+        return {"platform": request.target_platform, "content": result}
     
-    return {"hashtags": ["#Marketing", "#Business", "#India", "#Growth", "#Content"]}
+    raise HTTPException(status_code=500, detail="Failed to repurpose content")
 
-class RepurposeRequest(BaseModel):
-    target_platform: str
+class RepurposeManyRequest(BaseModel):
+    target_platforms: list[str]
 
-@app.post("/content/{calendar_id}/repurpose")
-def repurpose_content(calendar_id: int, request: RepurposeRequest, db: Session = Depends(get_db)):
-    """Repurpose content for a different platform."""
-    from .agents.ai_client import get_ai_client
+@app.post("/content/{calendar_id}/repurpose-many", dependencies=[Depends(generation_guard), interactive_work])
+def repurpose_content_many(calendar_id: int, request: RepurposeManyRequest, db: Session = Depends(get_db)):
+    """Repurpose content for several platforms at once from a shared outline of the source."""
+    if not request.target_platforms:
+        raise HTTPException(status_code=400, detail="target_platforms must not be empty")
     
-    calendar_item = db.query(ContentCalendar).filter(ContentCalendar.id == calendar_id).first()
+    calendar_item, latest_version = _repurpose_source(calendar_id, db)
+    
+    with usage_ledger.usage_scope(project_id=calendar_item.project_id, calendar_id=calendar_id):
+        results = orchestrator.repurpose_agent.run_many(
+            latest_version.id, latest_version.body, calendar_item.platform, request.target_platforms
+        )
+    
+    return {
+        "version_id": latest_version.id,
+        "results": [
+            {"platform": platform, "content": content}
+            for platform, content in results.items() if content
+        ],
+        "failed": [platform for platform, content in results.items() if not content]
+    }
+
+def _repurpose_source(calendar_id: int, db: Session):
+    """Load the calendar item and its latest version once for repurposing."""
+    calendar_item = db.query(ContentCalendar).filter(
+        ContentCalendar.tenant_id == tenancy.current_tenant(), ContentCalendar.id == calendar_id
+    ).first()
     if not calendar_item:
         raise HTTPException(status_code=404, detail="Calendar item not found")
     
     latest_version = db.query(ContentVersion).filter(
-        ContentVersion.calendar_id == calendar_id
+        ContentVersion.tenant_id == tenancy.current_tenant(), ContentVersion.calendar_id == calendar_id
     ).order_by(ContentVersion.version_number.desc()).first()
     
     if not latest_version:
         raise HTTPException(status_code=404, detail="No content found to repurpose")
     
-    platform_guides = {
-        "Twitter": "Convert to a punchy tweet thread (max 280 chars per tweet, use emoji, make it viral)",
-        "Instagram": "Convert to an engaging Instagram caption with emojis and line breaks",
-        "LinkedIn": "Convert to a professional LinkedIn post with insights and a call-to-action",
-        "Blog": "Expand into a detailed blog post with headers and sections",
-        "Facebook": "Convert to a conversational Facebook post that encourages comments"
-    }
-    
-    guide = platform_guides.get(request.target_platform, "Adapt appropriately")
-    
-    ai_client = get_ai_client()
-    prompt = f"""Repurpose this content for {request.target_platform}.
-
-ORIGINAL PLATFORM: {calendar_item.platform}
-ORIGINAL CONTENT:
-{latest_version.body}
-
-TASK: {guide}
-
-Return ONLY the repurposed content, ready to post."""
-    
-    result = ai_client.generate(prompt, max_tokens=1000)
-    
-    if result:
-        return {"platform": request.target_platform, "content": result}
-    
-    raise HTTPException(status_code=500, detail="Failed to repurpose content")
+    return calendar_item, latest_version
 
 class TemplateRequest(BaseModel):
     topics: list[str]
@@ -206,13 +465,13 @@ def apply_template(project_id: int, request: TemplateRequest, db: Session = Depe
     """Add template topics to the content calendar."""
     from datetime import datetime, timedelta
     
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = db.query(Project).filter(Project.tenant_id == tenancy.current_tenant(), Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     
     # Get the last date in calendar or start from today
     last_calendar = db.query(ContentCalendar).filter(
-        ContentCalendar.project_id == project_id
+        ContentCalendar.tenant_id == tenancy.current_tenant(), ContentCalendar.project_id == project_id
     ).order_by(ContentCalendar.date.desc()).first()
     
     if last_calendar and last_calendar.date:
@@ -220,9 +479,13 @@ def apply_template(project_id: int, request: TemplateRequest, db: Session = Depe
     else:
         start_date = datetime.now()
     
+    # Skip topics that near-duplicate existing calendar items or each other
+    unique, duplicates = topic_index.filter_duplicates(db, project_id, [{"topic": t} for t in request.topics])
+
     # Add each topic as a new calendar item
     added_items = []
-    for i, topic in enumerate(request.topics):
+    calendar_entries = []
+    for i, topic in enumerate(item["topic"] for item in unique):
         calendar_entry = ContentCalendar(
             project_id=project_id,
             platform=request.platform,
@@ -231,21 +494,176 @@ def apply_template(project_id: int, request: TemplateRequest, db: Session = Depe
             topic=topic
         )
         db.add(calendar_entry)
+        calendar_entries.append(calendar_entry)
         added_items.append({
             "topic": topic,
             "date": calendar_entry.date,
             "platform": request.platform
         })
     
+    db.flush()
+    topic_index.add(db, calendar_entries)
+    project_summary.record_calendar_items(db, project_id, calendar_entries)
     db.commit()
+    if calendar_entries:
+        events.publish(project_id, events.CALENDAR_UPDATED, source="template", kept=0,
+                       added=len(calendar_entries), removed=0, duplicates=len(duplicates))
     
     return {
         "status": "success",
         "added": len(added_items),
-        "items": added_items
+        "items": added_items,
+        "skipped_duplicates": duplicates
     }
 
+# Comment frames keep idle event streams open through proxies
+EVENTS_KEEPALIVE_SECONDS = 15
+
+def _project_exists(project_id: int) -> bool:
+    db = SessionLocal()
+    try:
+        return db.query(Project.id).filter(Project.tenant_id == tenancy.current_tenant(), Project.id == project_id).first() is not None
+    finally:
+        db.close()
+
+@app.get("/projects/{project_id}/events")
+async def project_events(project_id: int, request: Request, tenant: Optional[str] = None):
+    """
+    Server-sent events for a project (research.completed, calendar.updated,
+    version.created). EventSource cannot send headers, so the tenant may be
+    given as ?tenant= instead of X-Tenant-ID. Like the header, the value is
+    not checked against the caller's identity (see tenancy).
+    """
+    if tenant:
+        try:
+            tenancy.set_tenant(tenant)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if events.get_event_bus().closed:
+        raise HTTPException(status_code=503, detail="Server is restarting, please retry")
+    if not await run_in_threadpool(_project_exists, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    subscription = events.get_event_bus().subscribe(tenancy.current_tenant(), project_id)
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is events.CLOSED:
+                    break
+                yield events.format_sse(event)
+        finally:
+            events.get_event_bus().unsubscribe(subscription)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/usage/summary")
+def get_usage_summary(group_by: str = "agent", db: Session = Depends(get_db)):
+    """Aggregate LLM calls, tokens, estimated cost and latency by project, agent, provider or model."""
+    if group_by not in usage_ledger.GROUP_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {list(usage_ledger.GROUP_COLUMNS)}")
+    return usage_ledger.summarize(db, group_by=group_by, tenant_id=tenancy.current_tenant())
+
+@app.get("/projects/{project_id}/usage")
+def get_project_usage(project_id: int, group_by: str = "agent", db: Session = Depends(get_db)):
+    """LLM usage for one project, by agent (default), calendar item, provider or model."""
+    if group_by not in usage_ledger.GROUP_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {list(usage_ledger.GROUP_COLUMNS)}")
+    return usage_ledger.summarize(db, group_by=group_by, project_id=project_id, tenant_id=tenancy.current_tenant())
+
+@app.get("/scheduler/metrics")
+def get_scheduler_metrics():
+    """Queue depth, running work and wait times per priority class for this worker."""
+    return scheduler.metrics()
+
+# Most rows an analytics endpoint returns per group
+MAX_ANALYTICS_LIMIT = 100
+
+def _check_limit(limit: int):
+    if not 1 <= limit <= MAX_ANALYTICS_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_ANALYTICS_LIMIT}")
+
+@app.get("/analytics/keywords")
+def get_top_keywords(niche: Optional[str] = None, cluster: Optional[str] = None, limit: int = 10,
+                     db: Session = Depends(get_db)):
+    """Top research keywords per niche, by number of projects listing them (see research_index)."""
+    _check_limit(limit)
+    if cluster is not None and cluster not in research_index.KEYWORD_CLUSTERS:
+        raise HTTPException(status_code=400, detail=f"cluster must be one of {list(research_index.KEYWORD_CLUSTERS)}")
+    return research_index.top_keywords(db, niche=niche, cluster=cluster, limit=limit)
+
+@app.get("/analytics/trends")
+def get_trend_frequency(niche: Optional[str] = None, interval: str = "week", days: int = 90,
+                        limit: int = 10, db: Session = Depends(get_db)):
+    """Most reported trends with the number of projects reporting them per day/week/month."""
+    _check_limit(limit)
+    if days < 1:
+        raise HTTPException(status_code=400, detail="days must be at least 1")
+    if interval not in research_index.INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {list(research_index.INTERVALS)}")
+    return research_index.trend_frequency(db, niche=niche, interval=interval, days=days, limit=limit)
+
+@app.get("/analytics/competitors")
+def get_top_competitors(niche: Optional[str] = None, limit: int = 20, db: Session = Depends(get_db)):
+    """Competitors named by the most projects."""
+    _check_limit(limit)
+    return research_index.top_competitors(db, niche=niche, limit=limit)
+
+@app.get("/projects/{project_id}/competitor-overlap")
+def get_competitor_overlap(project_id: int, limit: int = 10, db: Session = Depends(get_db)):
+    """Projects whose research names the same competitors, most shared first."""
+    _check_limit(limit)
+    project = db.query(Project).filter(Project.tenant_id == tenancy.current_tenant(), Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return research_index.competitor_overlap(db, project_id, limit=limit)
+
+def diagnostics_access(x_diagnostics_token: Optional[str] = Header(None)):
+    """Diagnostics exist only while profiling is enabled, behind DIAGNOSTICS_TOKEN if set."""
+    if not profiling.ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (set PROFILE_SLOW_MS or PROFILE_SAMPLE_RATE)")
+    if profiling.DIAGNOSTICS_TOKEN and x_diagnostics_token != profiling.DIAGNOSTICS_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid diagnostics token")
+
+@app.get("/diagnostics/profiles", dependencies=[Depends(diagnostics_access)])
+def list_profiles():
+    """Stored request profiles, newest first (duration, SQL totals, sample count)."""
+    return profiling.list_profiles()
+
+@app.get("/diagnostics/profiles/{profile_id}", dependencies=[Depends(diagnostics_access)])
+def get_profile(profile_id: str):
+    """A request profile: hottest frames, SQL statements by total time and collapsed stacks."""
+    profile = profiling.load_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+@app.get("/diagnostics/profiles/{profile_id}/collapsed", response_class=PlainTextResponse,
+         dependencies=[Depends(diagnostics_access)])
+def get_profile_collapsed(profile_id: str):
+    """Collapsed stacks for flamegraph.pl or speedscope."""
+    profile = profiling.load_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return "\n".join(profile["collapsed"]) + "\n"
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Agentic AI Marketing Platform API"}
 
+@app.get("/health")
+def health():
+    """Worker health for load balancers; reports draining workers as unavailable."""
+    return {
+        "status": "draining" if serving.is_draining() else "ok",
+        "pid": os.getpid(),
+        "in_flight": serving.in_flight()
+    }
+
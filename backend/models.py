@@ -1,55 +1,213 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, JSON, LargeBinary, DateTime, Boolean, Float, Index
+from sqlalchemy.orm import relationship, deferred
+from datetime import datetime
 from .db import Base
+from .tenancy import current_tenant, DEFAULT_TENANT
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (Index("ix_projects_tenant", "tenant_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(String, default=current_tenant, server_default=DEFAULT_TENANT)  # Owning tenant (see tenancy)
     niche = Column(String, index=True)
     audience = Column(String)
     tone = Column(String)
     goals = Column(String)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # Row version for ETags
 
     research_reports = relationship("ResearchReport", back_populates="project")
     content_calendars = relationship("ContentCalendar", back_populates="project")
 
 class ResearchReport(Base):
     __tablename__ = "research_reports"
+    __table_args__ = (Index("ix_research_reports_tenant_project", "tenant_id", "project_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(String, default=current_tenant, server_default=DEFAULT_TENANT)
     project_id = Column(Integer, ForeignKey("projects.id"))
     summary = Column(Text)
     keyword_clusters = Column(JSON)  # Stores dict with primary, secondary, trending
     competitors = Column(JSON)       # Stores list of competitor names
     trends = Column(JSON)            # Stores list of trend strings
     audience_insights = Column(JSON) # Stores dict with pain_points, preferences, platforms
+    created_at = Column(DateTime)
+    section_updated_at = Column(JSON) # Stores dict of section name -> ISO timestamp of last refresh
+    indexed_at = Column(DateTime)     # When research_index last indexed the report (NULL = not yet)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     project = relationship("Project", back_populates="research_reports")
 
 class ContentCalendar(Base):
     __tablename__ = "content_calendar"
+    __table_args__ = (Index("ix_content_calendar_tenant_project", "tenant_id", "project_id", "date"),)
 
     id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(String, default=current_tenant, server_default=DEFAULT_TENANT)
     project_id = Column(Integer, ForeignKey("projects.id"))
     platform = Column(String)
     date = Column(String)
     content_type = Column(String)
     topic = Column(String)
+    objective = Column(String)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     project = relationship("Project", back_populates="content_calendars")
     versions = relationship("ContentVersion", back_populates="calendar_item")
 
 class ContentVersion(Base):
     __tablename__ = "content_versions"
+    __table_args__ = (Index("ix_content_versions_tenant_calendar", "tenant_id", "calendar_id", "version_number"),)
 
     id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(String, default=current_tenant, server_default=DEFAULT_TENANT)
     calendar_id = Column(Integer, ForeignKey("content_calendar.id"))
     title = Column(String, default="")
-    body = Column(Text, default="")
+    # Bodies load on first access only, so listing or summarizing versions doesn't pull every text
+    body = deferred(Column(Text, default=""))     # Full text; only kept for the latest version
+    body_delta = deferred(Column(LargeBinary))    # Compressed delta/text for older versions (see version_store)
+    body_encoding = Column(String, default="full")  # "full", "delta" or "zlib"
     seo_score = Column(Integer, default=0)
     readability_score = Column(Integer, default=0)
     brand_score = Column(Integer, default=0)
     version_number = Column(Integer, default=1)
+    hashtags = Column(JSON)          # Stores list of suggested hashtags for this version
+    hashtags_source = Column(String) # "ai" or "local" (keyword extraction without an LLM)
+    iterations_run = Column(Integer)  # Feedback loop iterations that produced this version
+    stop_reason = Column(String)      # Why the feedback loop stopped (see LoopPolicy)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     calendar_item = relationship("ContentCalendar", back_populates="versions")
+    iterations = relationship("GenerationIteration", back_populates="version")
+
+class GenerationIteration(Base):
+    """One scored draft of the WriterAgent -> SEOAgent feedback loop."""
+    __tablename__ = "generation_iterations"
+    __table_args__ = (
+        Index("ix_generation_iterations_tenant_calendar", "tenant_id", "calendar_id", "version_id", "iteration"),
+        Index("ix_generation_iterations_tenant_version", "tenant_id", "version_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(String, default=current_tenant, server_default=DEFAULT_TENANT)
+    version_id = Column(Integer, ForeignKey("content_versions.id"), index=True)
+    calendar_id = Column(Integer, ForeignKey("content_calendar.id"), index=True)
+    iteration = Column(Integer)
+    seo_score = Column(Integer)
+    readability_score = Column(Integer)
+    keyword_score = Column(Integer)
+    brand_score = Column(Integer)     # Local brand-tone score (see agents/brand_tone)
+    feedback = Column(JSON)           # Stores list of SEO feedback points
+    duration_ms = Column(Integer)     # Writer + SEO time for this draft
+    estimated_tokens = Column(Integer)
+    decision = Column(String)         # "rewrite", "accepted", "no_improvement", "max_iterations", "time_budget", "token_budget"
+
+    version = relationship("ContentVersion", back_populates="iterations")
+
+class CalendarItemStats(Base):
+    """Per calendar item score aggregates, maintained by project_summary."""
+    __tablename__ = "calendar_item_stats"
+    __table_args__ = (Index("ix_calendar_item_stats_tenant_project", "tenant_id", "project_id"),)
+
+    calendar_id = Column(Integer, ForeignKey("content_calendar.id"), primary_key=True)
+    tenant_id = Column(String, default=current_tenant, server_default=DEFAULT_TENANT)
+    project_id = Column(Integer, ForeignKey("projects.id"), index=True)
+    version_count = Column(Integer, default=0)
+    latest_version_id = Column(Integer)
+    latest_seo_score = Column(Integer)
+    latest_readability_score = Column(Integer)
+    latest_brand_score = Column(Integer)
+    best_seo_score = Column(Integer)
+    best_readability_score = Column(Integer)
+    best_brand_score = Column(Integer)
+
+class ProjectSummary(Base):
+    """Per project dashboard aggregates, maintained by project_summary."""
+    __tablename__ = "project_summaries"
+    __table_args__ = (Index("ix_project_summaries_tenant_project", "tenant_id", "project_id"),)
+
+    project_id = Column(Integer, ForeignKey("projects.id"), primary_key=True)
+    tenant_id = Column(String, default=current_tenant, server_default=DEFAULT_TENANT)
+    items_total = Column(Integer, default=0)
+    items_generated = Column(Integer, default=0)
+    versions_total = Column(Integer, default=0)
+    platform_counts = Column(JSON)   # {platform: {"planned": n, "generated": n}}
+    objective_counts = Column(JSON)  # {objective: {"planned": n, "generated": n}}
+
+class TopicBand(Base):
+    """One MinHash LSH bucket of a calendar topic, maintained by topic_index."""
+    __tablename__ = "topic_bands"
+    __table_args__ = (Index("ix_topic_bands_tenant_project_bucket", "tenant_id", "project_id", "bucket"),)
+
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(String, default=current_tenant, server_default=DEFAULT_TENANT)
+    project_id = Column(Integer, ForeignKey("projects.id"))
+    calendar_id = Column(Integer, ForeignKey("content_calendar.id"), index=True)
+    bucket = Column(Integer)  # Hash of one band of the topic's MinHash signature
+
+class ResearchKeyword(Base):
+    """One keyword of a project's latest research report, maintained by research_index."""
+    __tablename__ = "research_keywords"
+    __table_args__ = (Index("ix_research_keywords_tenant_niche_keyword", "tenant_id", "niche", "keyword"),)
+
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(String, default=current_tenant, server_default=DEFAULT_TENANT)
+    report_id = Column(Integer, ForeignKey("research_reports.id"), index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), index=True)
+    niche = Column(String)      # Normalized project niche
+    cluster = Column(String)    # "primary", "secondary" or "trending"
+    keyword = Column(String)    # Normalized for grouping
+    label = Column(String)      # As written in the report
+    position = Column(Integer)  # Rank within its cluster
+
+class ResearchTrend(Base):
+    """One trend seen in a research report; kept across refreshes for trend history."""
+    __tablename__ = "research_trends"
+    __table_args__ = (
+        Index("ix_research_trends_tenant_niche_observed", "tenant_id", "niche", "observed_at"),
+        Index("ix_research_trends_tenant_trend_observed", "tenant_id", "trend", "observed_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(String, default=current_tenant, server_default=DEFAULT_TENANT)
+    report_id = Column(Integer, ForeignKey("research_reports.id"), index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), index=True)
+    niche = Column(String)
+    trend = Column(String)
+    label = Column(String)
+    observed_at = Column(DateTime)  # When the trends section was (re)generated
+
+class ResearchCompetitor(Base):
+    """One competitor of a project's latest research report, maintained by research_index."""
+    __tablename__ = "research_competitors"
+    __table_args__ = (Index("ix_research_competitors_tenant_competitor", "tenant_id", "competitor", "project_id"),)
+
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(String, default=current_tenant, server_default=DEFAULT_TENANT)
+    report_id = Column(Integer, ForeignKey("research_reports.id"), index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), index=True)
+    niche = Column(String)
+    competitor = Column(String)
+    label = Column(String)
+
+class LLMUsage(Base):
+    """One AI provider call (or avoided call), recorded by usage_ledger."""
+    __tablename__ = "llm_usage"
+    __table_args__ = (Index("ix_llm_usage_tenant_created", "tenant_id", "created_at"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(String, default=current_tenant, server_default=DEFAULT_TENANT)
+    created_at = Column(DateTime, index=True)
+    provider = Column(String)
+    model = Column(String)
+    agent = Column(String, index=True)
+    project_id = Column(Integer, index=True)
+    calendar_id = Column(Integer)
+    prompt_tokens = Column(Integer)
+    completion_tokens = Column(Integer)
+    cost_usd = Column(Float)
+    latency_ms = Column(Integer)
+    cache_hit = Column(Boolean, default=False)
+    fallback_depth = Column(Integer)  # 0 = first provider in priority order
+    outcome = Column(String)          # "success" or "error"
+    error = Column(String)
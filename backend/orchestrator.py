@@ -1,12 +1,94 @@
+from sqlalchemy import func, or_
 from sqlalchemy.orm import Session
 from .db import SessionLocal
-from .models import Project, ResearchReport, ContentCalendar, ContentVersion
+from .models import Project, ResearchReport, ContentCalendar, ContentVersion, GenerationIteration
 from .agents.market_research_agent import MarketResearchAgent
-from .agents.content_strategy_agent import ContentStrategyAgent
+from .agents.content_strategy_agent import ContentStrategyAgent, DEFAULT_HORIZON_DAYS
 from .agents.writer_agent import WriterAgent
 from .agents.seo_agent import SEOAgent
 from .agents.scoring_agent import ScoringAgent
+from .agents.repurpose_agent import RepurposeAgent
+from .agents.hashtag_agent import HashtagAgent
+from . import version_store, project_summary, serving, topic_index, research_index
+from . import usage_ledger, deadlines, events, scheduler
+from .usage_ledger import usage_scope
+from .tenancy import current_tenant, tenant_scope
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import difflib
 import json
+import os
+import re
+import time
+
+# Research sections regenerated by an incremental refresh once older than this
+RESEARCH_MAX_AGE = {
+    "trends": timedelta(days=7),
+    "keyword_clusters": timedelta(days=14),
+}
+RESEARCH_SECTIONS = ("summary", "keyword_clusters", "competitors", "trends", "audience_insights")
+
+# Generate AI hashtags in the background whenever a new version is saved
+EAGER_HASHTAGS = os.getenv("EAGER_HASHTAGS", "true").lower() == "true"
+
+# Calendar topics at least this similar are treated as unchanged when merging
+TOPIC_MATCH_RATIO = 0.85
+
+# Past versions scoring at least this much shape the project's brand profile
+BRAND_APPROVED_MIN_SCORE = int(os.getenv("BRAND_APPROVED_MIN_SCORE", "70"))
+BRAND_HISTORY_SIZE = 50
+
+class LoopPolicy:
+    """
+    Controls the WriterAgent -> SEOAgent feedback loop.
+
+    The loop stops when a draft scores above `quality_threshold`, when the score
+    improves by less than `min_improvement` for `patience` rewrites in a row,
+    after `max_iterations` scored drafts, or when another rewrite would exceed
+    `time_budget` seconds or `token_budget` estimated output tokens (0 = no limit).
+    Independently of the policy, no rewrite starts that the request's deadline
+    (see backend/deadlines.py) leaves no time for.
+    Defaults come from GENERATION_* environment variables. Out-of-range values
+    raise ValueError.
+    """
+
+    def __init__(self, max_iterations: int = None, quality_threshold: int = None,
+                 min_improvement: float = None, patience: int = None,
+                 time_budget: float = None, token_budget: int = None):
+        self.max_iterations = max_iterations if max_iterations is not None else int(os.getenv("GENERATION_MAX_ITERATIONS", "3"))
+        self.quality_threshold = quality_threshold if quality_threshold is not None else int(os.getenv("GENERATION_QUALITY_THRESHOLD", "70"))
+        self.min_improvement = min_improvement if min_improvement is not None else float(os.getenv("GENERATION_MIN_IMPROVEMENT", "2"))
+        self.patience = patience if patience is not None else int(os.getenv("GENERATION_PATIENCE", "1"))
+        self.time_budget = time_budget if time_budget is not None else float(os.getenv("GENERATION_TIME_BUDGET", "0"))
+        self.token_budget = token_budget if token_budget is not None else int(os.getenv("GENERATION_TOKEN_BUDGET", "0"))
+
+        if self.max_iterations < 1:
+            raise ValueError("max_iterations must be at least 1")
+        if self.patience < 1:
+            raise ValueError("patience must be at least 1")
+        if not 0 <= self.quality_threshold <= 100:
+            raise ValueError("quality_threshold must be between 0 and 100")
+        if self.min_improvement < 0 or self.time_budget < 0 or self.token_budget < 0:
+            raise ValueError("min_improvement, time_budget and token_budget must not be negative")
+
+def _estimate_tokens(text: str) -> int:
+    """Rough output token count (~4 characters per token)."""
+    return len(text or "") // 4
+
+def _normalize_topic(topic: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", (topic or "").lower()).strip()
+
+def _fuzzy_match(key: str, candidates):
+    """First candidate whose normalized topic is at least TOPIC_MATCH_RATIO similar to `key`."""
+    matcher = difflib.SequenceMatcher(None, b=key)
+    for candidate in candidates:
+        matcher.set_seq1(_normalize_topic(candidate.topic))
+        # Cheap upper bounds first; ratio() is quadratic and long calendars compare many pairs
+        if (matcher.real_quick_ratio() >= TOPIC_MATCH_RATIO
+                and matcher.quick_ratio() >= TOPIC_MATCH_RATIO
+                and matcher.ratio() >= TOPIC_MATCH_RATIO):
+            return candidate
+    return None
 
 class Orchestrator:
     def __init__(self):
@@ -15,218 +97,546 @@ class Orchestrator:
         self.writer_agent = WriterAgent()
         self.seo_agent = SEOAgent()
         self.scoring_agent = ScoringAgent()
+        self.repurpose_agent = RepurposeAgent()
+        self.hashtag_agent = HashtagAgent()
+        self._background = ThreadPoolExecutor(max_workers=2, thread_name_prefix="orchestrator-bg")
 
     def get_db(self):
         return SessionLocal()
 
-    def start_project(self, project_id: int):
+    def start_project(self, project_id: int, mode: str = "full", horizon_days: int = DEFAULT_HORIZON_DAYS):
         """
         Initialize a project with market research and content calendar.
         This is the main orchestration entry point.
+
+        mode="full" reruns the complete market research and overwrites the
+        project's report (one report per project).
+        mode="refresh" regenerates only stale research sections of the latest
+        report (using it as context) and skips all LLM work if nothing is stale.
+        In both modes the new calendar is merged into the existing one, keeping
+        items (and their generated content) whose topics did not change.
+        horizon_days sets how far ahead the calendar is planned (up to a year).
         """
-        print(f"[Orchestrator] Starting project {project_id}")
-        db = self.get_db()
-        try:
-            project = db.query(Project).filter(Project.id == project_id).first()
-            if not project:
-                raise ValueError("Project not found")
-
-            # 1. Market Research - deeply analyze niche and audience
-            print(f"[Orchestrator] Step 1: Running Market Research Agent")
-            research_data = self.market_research_agent.run(project.niche, project.audience)
-            
-            # Save Research Report
-            report = ResearchReport(
-                project_id=project.id,
-                summary=research_data.get("summary", ""),
-                keyword_clusters=research_data.get("keyword_clusters", {}),
-                competitors=research_data.get("competitors", []),
-                trends=research_data.get("trends", []),
-                audience_insights=research_data.get("audience_insights", {})
-            )
-            db.add(report)
-            db.commit()
-            db.refresh(report)
-            
-            # Store full research data for content strategy
-            project_research = {
-                "summary": research_data.get("summary", ""),
-                "trends": research_data.get("trends", []),
-                "keyword_clusters": research_data.get("keyword_clusters", {}),
-                "content_opportunities": research_data.get("content_opportunities", []),
-                "audience_insights": research_data.get("audience_insights", {})
-            }
-            
-            # 2. Content Strategy - create 14-day calendar with AI
-            print(f"[Orchestrator] Step 2: Running Content Strategy Agent")
-            calendar_data = self.content_strategy_agent.run(
-                niche=project.niche,
-                audience=project.audience,
-                tone=project.tone,
-                research_data=project_research
-            )
-            
-            # Save Calendar Items
-            for item in calendar_data:
-                calendar_entry = ContentCalendar(
-                    project_id=project.id,
-                    platform=item.get("platform", "Blog"),
-                    date=item.get("date"),
-                    content_type=item.get("content_type", "Post"),
-                    topic=item.get("topic", "")
+        print(f"[Orchestrator] Starting project {project_id} (mode: {mode})")
+        with usage_scope(project_id=project_id):
+            db = self.get_db()
+            try:
+                project = db.query(Project).filter(Project.tenant_id == current_tenant(), Project.id == project_id).first()
+                if not project:
+                    raise ValueError("Project not found")
+
+                report = db.query(ResearchReport).filter(
+                    ResearchReport.tenant_id == current_tenant(), ResearchReport.project_id == project.id
+                ).order_by(ResearchReport.id.desc()).first()
+
+                now = datetime.utcnow()
+                if mode == "refresh" and report:
+                    # 1. Incremental Market Research - only stale sections
+                    stale_sections = self._stale_research_sections(report, now)
+                    if not stale_sections:
+                        print(f"[Orchestrator] Research is fresh, nothing to refresh")
+                        return {
+                            "status": "fresh",
+                            "research_id": report.id,
+                            "refreshed_sections": [],
+                            "calendar_diff": {"kept": 0, "added": 0, "removed": 0, "duplicates": 0},
+                            "research_data": self._report_data(report)
+                        }
+
+                    print(f"[Orchestrator] Step 1: Refreshing stale research sections {stale_sections}")
+                    refreshed = self.market_research_agent.refresh(
+                        project.niche, project.audience, self._report_data(report), stale_sections
+                    )
+                    updated_at = dict(report.section_updated_at or {})
+                    for section in stale_sections:
+                        if refreshed.get(section):
+                            setattr(report, section, refreshed[section])
+                            updated_at[section] = now.isoformat()
+                    report.section_updated_at = updated_at
+                    research_index.record_report(db, report, project.niche, stale_sections)
+                    db.commit()
+                    db.refresh(report)
+
+                    research_data = self._report_data(report)
+                    research_data["content_opportunities"] = refreshed.get("content_opportunities", [])
+                    refreshed_sections = stale_sections
+                else:
+                    # 1. Market Research - deeply analyze niche and audience
+                    print(f"[Orchestrator] Step 1: Running Market Research Agent")
+                    research_data = self.market_research_agent.run(project.niche, project.audience)
+                    
+                    # Save Research Report - a project keeps one report, overwritten by each full run
+                    # (trend history is kept in the research index)
+                    if report is None:
+                        report = ResearchReport(project_id=project.id)
+                        db.add(report)
+                    report.summary = research_data.get("summary", "")
+                    report.keyword_clusters = research_data.get("keyword_clusters", {})
+                    report.competitors = research_data.get("competitors", [])
+                    report.trends = research_data.get("trends", [])
+                    report.audience_insights = research_data.get("audience_insights", {})
+                    report.created_at = now
+                    report.section_updated_at = {section: now.isoformat() for section in RESEARCH_SECTIONS}
+                    db.flush()
+                    research_index.record_report(db, report, project.niche)
+                    db.commit()
+                    db.refresh(report)
+                    refreshed_sections = list(RESEARCH_SECTIONS)
+                
+                # Store full research data for content strategy
+                project_research = {
+                    "summary": research_data.get("summary", ""),
+                    "trends": research_data.get("trends", []),
+                    "keyword_clusters": research_data.get("keyword_clusters", {}),
+                    "content_opportunities": research_data.get("content_opportunities", []),
+                    "audience_insights": research_data.get("audience_insights", {})
+                }
+                
+                # 2. Content Strategy - create calendar for the horizon with AI
+                print(f"[Orchestrator] Step 2: Running Content Strategy Agent ({horizon_days} days)")
+                calendar_data = self.content_strategy_agent.run(
+                    niche=project.niche,
+                    audience=project.audience,
+                    tone=project.tone,
+                    research_data=project_research,
+                    horizon_days=horizon_days
                 )
-                db.add(calendar_entry)
-            
-            db.commit()
-            print(f"[Orchestrator] Project initialized successfully!")
-            print(f"[Orchestrator] - Research Report ID: {report.id}")
-            print(f"[Orchestrator] - Calendar Items: {len(calendar_data)}")
-            
-            return {
-                "status": "started", 
-                "research_id": report.id, 
-                "calendar_size": len(calendar_data),
-                "research_data": research_data
-            }
-
-        finally:
-            db.close()
-
-    def generate_content(self, calendar_id: int):
+                
+                # Merge Calendar Items into the existing calendar
+                calendar_diff = self._merge_calendar(db, project.id, calendar_data)
+                db.commit()
+                events.publish(project.id, events.RESEARCH_COMPLETED, research_id=report.id, mode=mode,
+                               refreshed_sections=refreshed_sections)
+                if calendar_diff["added"] or calendar_diff["removed"]:
+                    events.publish(project.id, events.CALENDAR_UPDATED, source="research", **calendar_diff)
+                print(f"[Orchestrator] Project initialized successfully!")
+                print(f"[Orchestrator] - Research Report ID: {report.id}")
+                print(f"[Orchestrator] - Calendar Items: {len(calendar_data)} "
+                      f"(kept {calendar_diff['kept']}, added {calendar_diff['added']}, removed {calendar_diff['removed']}, "
+                      f"skipped {calendar_diff['duplicates']} duplicates)")
+                
+                return {
+                    "status": "started" if mode == "full" else "refreshed", 
+                    "research_id": report.id, 
+                    "calendar_size": len(calendar_data),
+                    "refreshed_sections": refreshed_sections,
+                    "calendar_diff": calendar_diff,
+                    "research_data": research_data
+                }
+
+            finally:
+                db.close()
+
+    def _report_data(self, report: ResearchReport) -> dict:
+        return {
+            "summary": report.summary or "",
+            "trends": report.trends or [],
+            "keyword_clusters": report.keyword_clusters or {},
+            "competitors": report.competitors or [],
+            "audience_insights": report.audience_insights or {}
+        }
+
+    def _stale_research_sections(self, report: ResearchReport, now: datetime) -> list:
+        """Sections whose last update is older than RESEARCH_MAX_AGE (or unknown)."""
+        updated_at = report.section_updated_at or {}
+        stale = []
+        for section, max_age in RESEARCH_MAX_AGE.items():
+            stamp = updated_at.get(section)
+            if not stamp or now - datetime.fromisoformat(stamp) > max_age:
+                stale.append(section)
+        return stale
+
+    def _merge_calendar(self, db: Session, project_id: int, calendar_data: list) -> dict:
+        """
+        Diff a freshly planned calendar against the project's existing items.
+        - Existing items whose topic matches a planned topic are kept as-is
+          (including their generated versions).
+        - Existing upcoming items within the planned date range that no longer
+          match and have no content yet are removed.
+        - Existing items with generated content are never removed.
+        - Planned topics that near-duplicate an existing item or another planned
+          topic (see topic_index) are skipped.
+        - Remaining planned topics are bulk-inserted.
+        """
+        existing = db.query(ContentCalendar).filter(
+            ContentCalendar.tenant_id == current_tenant(), ContentCalendar.project_id == project_id
+        ).all()
+        generated_ids = {
+            row[0] for row in db.query(ContentVersion.calendar_id).join(
+                ContentCalendar, ContentCalendar.id == ContentVersion.calendar_id
+            ).filter(ContentCalendar.project_id == project_id).distinct()
+        }
+
+        unmatched = {item.id: item for item in existing}
+        by_topic = {}
+        for item in existing:
+            by_topic.setdefault(_normalize_topic(item.topic), []).append(item)
+
+        kept, planned = 0, []
+        for item in calendar_data:
+            key = _normalize_topic(item.get("topic", ""))
+            match = next((c for c in by_topic.get(key, []) if c.id in unmatched), None)
+            if match is None:
+                match = _fuzzy_match(key, unmatched.values())
+            if match is not None:
+                del unmatched[match.id]
+                kept += 1
+                continue
+            planned.append(item)
+
+        planned, duplicates = topic_index.filter_duplicates(db, project_id, planned)
+        for duplicate in duplicates:
+            # A near-duplicate of an item that would otherwise be removed keeps that item
+            if unmatched.pop(duplicate["calendar_id"], None) is not None:
+                kept += 1
+
+        new_entries = [
+            ContentCalendar(
+                project_id=project_id,
+                platform=item.get("platform", "Blog"),
+                date=item.get("date"),
+                content_type=item.get("content_type", "Post"),
+                topic=item.get("topic", ""),
+                objective=item.get("objective")
+            )
+            for item in planned
+        ]
+        # One flush inserts all new rows in a single executemany
+        db.add_all(new_entries)
+
+        today = datetime.now().strftime("%Y-%m-%d")
+        # Items planned beyond this (shorter) calendar's last day are left alone
+        horizon_end = max((item.get("date") or "" for item in calendar_data), default=today)
+        removed_ids = []
+        for item in unmatched.values():
+            if item.id not in generated_ids and today <= (item.date or "") <= horizon_end:
+                db.delete(item)
+                removed_ids.append(item.id)
+        topic_index.remove(db, removed_ids)
+        db.flush()
+        topic_index.add(db, new_entries)
+
+        if removed_ids:
+            project_summary.rebuild(db, project_id)
+        else:
+            project_summary.record_calendar_items(db, project_id, new_entries)
+
+        return {"kept": kept, "added": len(new_entries), "removed": len(removed_ids), "duplicates": len(duplicates)}
+
+    def generate_content(self, calendar_id: int, policy: "LoopPolicy" = None, deadline: "deadlines.Deadline" = None,
+                         hedge: bool = False):
         """
         Generate content with SEO feedback loop.
         This implements the core agentic behavior where the WriterAgent
         iteratively improves content based on SEOAgent feedback.
         When regenerating, passes previous version data for improvement.
+        The loop is controlled by `policy` (see LoopPolicy) and every scored
+        draft is saved as a GenerationIteration row.
+        Once `deadline` passes or is cancelled, no further rewrite is started
+        and the best draft scored so far is saved; if that happens during the
+        first draft, nothing is saved and DeadlineExceeded is raised.
+        With `hedge`, writer calls race a slow provider against the next one
+        (for interactive requests, see AIClient._generate_hedged).
         """
         print(f"[Orchestrator] Generating content for Calendar ID {calendar_id}")
-        db = self.get_db()
-        try:
-            calendar_item = db.query(ContentCalendar).filter(ContentCalendar.id == calendar_id).first()
-            if not calendar_item:
-                raise ValueError("Calendar item not found")
-                
-            project = calendar_item.project
-            
-            # Fetch research context for better content
-            research_report = db.query(ResearchReport).filter(
-                ResearchReport.project_id == project.id
-            ).first()
-            
-            research_context = None
-            if research_report:
-                research_context = {
-                    "keyword_clusters": research_report.keyword_clusters or {},
-                    "summary": research_report.summary
-                }
-            
-            # Fetch previous version for improvement (if regenerating)
-            previous_version = None
-            latest_version = db.query(ContentVersion).filter(
-                ContentVersion.calendar_id == calendar_id
-            ).order_by(ContentVersion.version_number.desc()).first()
-            
-            if latest_version:
-                print(f"[Orchestrator] Found previous version (v{latest_version.version_number}, score: {latest_version.seo_score})")
-                previous_version = {
-                    "score": latest_version.seo_score,
-                    "readability": latest_version.readability_score,
-                    "brand_score": latest_version.brand_score,
-                    "content": latest_version.body[:500],  # First 500 chars for context
-                    "feedback": f"Previous score was {latest_version.seo_score}. Readability was {latest_version.readability_score}. Target: 85+ on both."
-                }
-            
-            # Initial Draft with full context
-            topic = calendar_item.topic
-            tone = project.tone
-            platform = calendar_item.platform
-            
-            print(f"[Orchestrator] Creating {'improved' if previous_version else 'initial'} draft...")
-            print(f"[Orchestrator] Topic: {topic}")
-            print(f"[Orchestrator] Platform: {platform}, Tone: {tone}")
-            
-            current_draft = self.writer_agent.run(
-                topic=topic, 
-                tone=tone, 
-                platform=platform,
-                research_context=research_context,
-                previous_version=previous_version
-            )
-            
-            # Feedback Loop (Max 3 iterations)
-            max_iterations = 3
-            iteration = 0
-            best_draft = current_draft
-            best_score = 0
-            
-            while iteration < max_iterations:
-                print(f"[Orchestrator] ─── Iteration {iteration + 1}/{max_iterations} ───")
-                
-                # Analyze current draft
-                seo_analysis = self.seo_agent.run(current_draft)
-                score = seo_analysis["score"]
-                
-                print(f"[Orchestrator] SEO Score: {score}")
-                
-                # Track best version
-                if score > best_score:
-                    best_score = score
-                    best_draft = current_draft
-                
-                # Check if quality threshold is met
-                if score > 70:
-                    print(f"[Orchestrator] ✓ Score {score} > 70. Quality approved!")
-                    break
-                
-                # Generate feedback for improvement
-                print(f"[Orchestrator] ✗ Score {score} <= 70. Requesting improvements...")
-                feedback_points = seo_analysis.get('feedback', [])
-                feedback = f"Current SEO score: {score}/100. Please improve: {'; '.join(feedback_points)}"
-                
-                # Request rewrite with feedback
+        deadline = deadline or deadlines.current()
+        with usage_scope(calendar_id=calendar_id), deadlines.deadline_scope(deadline):
+            db = self.get_db()
+            try:
+                calendar_item = db.query(ContentCalendar).filter(
+                    ContentCalendar.tenant_id == current_tenant(), ContentCalendar.id == calendar_id
+                ).first()
+                if not calendar_item:
+                    raise ValueError("Calendar item not found")
+                    
+                project = calendar_item.project
+                usage_ledger.bind(project_id=project.id)
+                
+                # Fetch research context for better content
+                research_context = self._research_context(db, project.id)
+                
+                # Fetch previous version for improvement (if regenerating)
+                previous_version = None
+                latest_version = db.query(ContentVersion).filter(
+                    ContentVersion.tenant_id == current_tenant(), ContentVersion.calendar_id == calendar_id
+                ).order_by(ContentVersion.version_number.desc()).first()
+                
+                if latest_version:
+                    print(f"[Orchestrator] Found previous version (v{latest_version.version_number}, score: {latest_version.seo_score})")
+                    previous_version = {
+                        "score": latest_version.seo_score,
+                        "readability": latest_version.readability_score,
+                        "brand_score": latest_version.brand_score,
+                        "content": latest_version.body[:500],  # First 500 chars for context
+                        "feedback": f"Previous score was {latest_version.seo_score}. Readability was {latest_version.readability_score}. Target: 85+ on both."
+                    }
+                
+                # Initial Draft with full context
+                topic = calendar_item.topic
+                tone = project.tone
+                platform = calendar_item.platform
+                
+                print(f"[Orchestrator] Creating {'improved' if previous_version else 'initial'} draft...")
+                print(f"[Orchestrator] Topic: {topic}")
+                print(f"[Orchestrator] Platform: {platform}, Tone: {tone}")
+                
+                policy = policy or LoopPolicy()
+                target_keywords = ((research_context or {}).get("keyword_clusters") or {}).get("primary", [])[:5]
+                loop_start = time.monotonic()
+                
+                draft_start = time.monotonic()
                 current_draft = self.writer_agent.run(
                     topic=topic, 
-                    tone=tone,
+                    tone=tone, 
                     platform=platform,
-                    feedback=feedback,
-                    research_context=research_context
+                    research_context=research_context,
+                    previous_version=previous_version,
+                    hedge=hedge
                 )
-                iteration += 1
-            
-            # Use best performing draft
-            if best_score > seo_analysis["score"]:
-                current_draft = best_draft
-                seo_analysis = self.seo_agent.run(current_draft)
-            
-            # Final scoring
-            final_scores = self.scoring_agent.run(seo_analysis, tone, current_draft)
-            
-            print(f"[Orchestrator] Final Scores:")
-            print(f"[Orchestrator] - SEO: {final_scores['seo_score']}")
-            print(f"[Orchestrator] - Brand: {final_scores['brand_score']}")
-            print(f"[Orchestrator] - Readability: {seo_analysis['readability']:.1f}")
-            
-            # Count existing versions
-            existing_versions = db.query(ContentVersion).filter(
-                ContentVersion.calendar_id == calendar_item.id
-            ).count()
-            
-            # Save Version
-            version = ContentVersion(
-                calendar_id=calendar_item.id,
-                title=f"{calendar_item.topic[:50]}...",
-                body=current_draft,
-                seo_score=final_scores["seo_score"],
-                readability_score=seo_analysis["readability"],
-                brand_score=final_scores["brand_score"],
-                version_number=existing_versions + 1
-            )
-            db.add(version)
-            db.commit()
-            db.refresh(version)
-            
-            print(f"[Orchestrator] ✓ Content saved as Version {version.version_number}")
-            return version
-
-        finally:
-            db.close()
+                write_seconds = time.monotonic() - draft_start
+                if deadline.expired():
+                    # Nothing scored yet, so there is nothing worth saving
+                    print(f"[Orchestrator] ✗ Request {deadline.stop_reason()} during the first draft. Nothing saved.")
+                    deadlines.check(deadline)
+                draft_tokens = _estimate_tokens(current_draft)
+                tokens_used = draft_tokens
+                
+                # Feedback Loop - stops on quality, stalled scores, or budget
+                iterations, drafts = [], []
+                previous_score, stalls = None, 0
+                
+                for iteration in range(1, policy.max_iterations + 1):
+                    print(f"[Orchestrator] ─── Iteration {iteration}/{policy.max_iterations} ───")
+                    
+                    # Analyze current draft against the research keywords
+                    seo_start = time.monotonic()
+                    seo_analysis = self.seo_agent.run(current_draft, target_keywords)
+                    seo_seconds = time.monotonic() - seo_start
+                    score = seo_analysis["score"]
+                    
+                    print(f"[Orchestrator] SEO Score: {score}")
+                    
+                    drafts.append((current_draft, seo_analysis))
+                    
+                    if previous_score is not None:
+                        stalls = stalls + 1 if score - previous_score < policy.min_improvement else 0
+                    
+                    elapsed = time.monotonic() - loop_start
+                    remaining = deadline.remaining()
+                    if score > policy.quality_threshold:
+                        decision = "accepted"
+                        print(f"[Orchestrator] ✓ Score {score} > {policy.quality_threshold}. Quality approved!")
+                    elif stalls >= policy.patience:
+                        decision = "no_improvement"
+                        print(f"[Orchestrator] ✗ Score is not improving ({previous_score} -> {score}). Stopping.")
+                    elif iteration == policy.max_iterations:
+                        decision = "max_iterations"
+                    elif remaining is not None and remaining < write_seconds:
+                        decision = deadline.stop_reason()
+                        print(f"[Orchestrator] ✗ Request {decision}: no time left for another rewrite. Stopping.")
+                    elif policy.time_budget and elapsed + write_seconds > policy.time_budget:
+                        decision = "time_budget"
+                        print(f"[Orchestrator] ✗ Another rewrite would exceed the {policy.time_budget}s budget. Stopping.")
+                    elif policy.token_budget and tokens_used + draft_tokens > policy.token_budget:
+                        decision = "token_budget"
+                        print(f"[Orchestrator] ✗ Another rewrite would exceed the {policy.token_budget} token budget. Stopping.")
+                    else:
+                        decision = "rewrite"
+                    
+                    iterations.append({
+                        "iteration": iteration,
+                        "seo_score": score,
+                        "readability_score": seo_analysis["readability"],
+                        "keyword_score": seo_analysis["keyword_score"],
+                        "feedback": seo_analysis.get("feedback", []),
+                        "duration_ms": int((write_seconds + seo_seconds) * 1000),
+                        "estimated_tokens": draft_tokens,
+                        "decision": decision
+                    })
+                    if decision != "rewrite":
+                        break
+                    
+                    # Generate feedback for improvement
+                    print(f"[Orchestrator] ✗ Score {score} <= {policy.quality_threshold}. Requesting improvements...")
+                    feedback_points = seo_analysis.get('feedback', [])
+                    feedback = f"Current SEO score: {score}/100. Please improve: {'; '.join(feedback_points) or 'readability (shorter sentences, simpler words)'}"
+                    
+                    # Request rewrite with feedback
+                    previous_score = score
+                    draft_start = time.monotonic()
+                    current_draft = self.writer_agent.run(
+                        topic=topic, 
+                        tone=tone,
+                        platform=platform,
+                        feedback=feedback,
+                        research_context=research_context,
+                        hedge=hedge
+                    )
+                    write_seconds = time.monotonic() - draft_start
+                    if deadline.expired():
+                        # The rewrite was abandoned mid-call; keep the drafts scored so far
+                        iterations[-1]["decision"] = deadline.stop_reason()
+                        print(f"[Orchestrator] ✗ Request {deadline.stop_reason()} during rewrite. Keeping the best draft so far.")
+                        break
+                    draft_tokens = _estimate_tokens(current_draft)
+                    tokens_used += draft_tokens
+                
+                # Final scoring of every draft in one batch (local brand tone, no LLM call)
+                profile = self._brand_profile(db, project)
+                scored = self.scoring_agent.run_batch([a for _, a in drafts], [d for d, _ in drafts], profile)
+                for record, scores in zip(iterations, scored):
+                    record["brand_score"] = scores["brand_score"]
+                
+                # Use best performing draft by weighted SEO + brand score
+                best = max(range(len(drafts)), key=lambda i: scored[i]["final_score"])
+                current_draft, seo_analysis = drafts[best]
+                final_scores = scored[best]
+                
+                print(f"[Orchestrator] Final Scores:")
+                print(f"[Orchestrator] - SEO: {final_scores['seo_score']}")
+                print(f"[Orchestrator] - Brand: {final_scores['brand_score']}")
+                print(f"[Orchestrator] - Readability: {seo_analysis['readability']:.1f}")
+                
+                # Count existing versions
+                existing_versions = db.query(ContentVersion).filter(
+                    ContentVersion.tenant_id == current_tenant(), ContentVersion.calendar_id == calendar_item.id
+                ).count()
+                
+                # Save Version
+                version = ContentVersion(
+                    calendar_id=calendar_item.id,
+                    title=f"{calendar_item.topic[:50]}...",
+                    body=current_draft,
+                    seo_score=final_scores["seo_score"],
+                    readability_score=seo_analysis["readability"],
+                    brand_score=final_scores["brand_score"],
+                    version_number=existing_versions + 1,
+                    # Instant LLM-free hashtags; upgraded to AI hashtags in the background
+                    hashtags=self.hashtag_agent.local(topic, current_draft, self._trending(research_context)),
+                    hashtags_source="local",
+                    iterations_run=len(iterations),
+                    stop_reason=iterations[-1]["decision"]
+                )
+                version_store.add_version(db, version)
+                db.flush()
+                for record in iterations:
+                    db.add(GenerationIteration(version_id=version.id, calendar_id=calendar_item.id, **record))
+                project_summary.record_version(db, calendar_item, version)
+                db.commit()
+                db.refresh(version)
+                events.publish(
+                    project.id, events.VERSION_CREATED, calendar_id=calendar_item.id, version_id=version.id,
+                    version_number=version.version_number, seo_score=version.seo_score,
+                    readability_score=version.readability_score, brand_score=version.brand_score,
+                    final_score=final_scores["final_score"], stop_reason=version.stop_reason
+                )
+                
+                if EAGER_HASHTAGS and self.hashtag_agent.ai_client.providers:
+                    self._background.submit(self._precompute_hashtags, version.id, current_tenant(), current_draft)
+                
+                print(f"[Orchestrator] ✓ Content saved as Version {version.version_number}")
+                return version
+
+            finally:
+                db.close()
+
+    def generate_hashtags(self, calendar_id: int, refresh: bool = False) -> dict:
+        """
+        Hashtags for the latest version of a calendar item.
+        AI hashtags stored against the version are served without any LLM call;
+        otherwise they are generated now and stored for next time.
+        """
+        with usage_scope(calendar_id=calendar_id):
+            db = self.get_db()
+            try:
+                calendar_item = db.query(ContentCalendar).filter(
+                    ContentCalendar.tenant_id == current_tenant(), ContentCalendar.id == calendar_id
+                ).first()
+                if not calendar_item:
+                    raise ValueError("Calendar item not found")
+                usage_ledger.bind(project_id=calendar_item.project_id)
+                
+                latest_version = db.query(ContentVersion).filter(
+                    ContentVersion.tenant_id == current_tenant(), ContentVersion.calendar_id == calendar_id
+                ).order_by(ContentVersion.version_number.desc()).first()
+                
+                if latest_version and latest_version.hashtags_source == "ai" and not refresh:
+                    usage_ledger.record(agent=self.hashtag_agent.name, cache_hit=True)
+                    return {"hashtags": latest_version.hashtags, "source": "ai", "cached": True}
+                
+                trending = self._trending(self._research_context(db, calendar_item.project_id))
+                content_text = latest_version.body if latest_version else calendar_item.topic
+                result = self.hashtag_agent.run(calendar_item.platform, calendar_item.topic, content_text, trending)
+                
+                if latest_version and (result["source"] == "ai" or not latest_version.hashtags):
+                    latest_version.hashtags = result["hashtags"]
+                    latest_version.hashtags_source = result["source"]
+                    db.commit()
+                
+                return {**result, "cached": False}
+            finally:
+                db.close()
+
+    def _precompute_hashtags(self, version_id: int, tenant_id: str, body: str):
+        """
+        Background task: store AI hashtags against a freshly saved version.
+        The body is passed in because a newer version may already have
+        demoted this one to a delta by the time the task runs.
+        """
+        with tenant_scope(tenant_id), serving.track_generation(), usage_scope(), scheduler.priority_scope(scheduler.BACKGROUND):
+            db = self.get_db()
+            try:
+                version = db.query(ContentVersion).filter(
+                    ContentVersion.tenant_id == current_tenant(), ContentVersion.id == version_id
+                ).first()
+                if not version or version.hashtags_source == "ai":
+                    return
+                calendar_item = version.calendar_item
+                usage_ledger.bind(project_id=calendar_item.project_id, calendar_id=calendar_item.id)
+                result = self.hashtag_agent.run(calendar_item.platform, calendar_item.topic, body)
+                if result["source"] == "ai":
+                    version.hashtags = result["hashtags"]
+                    version.hashtags_source = "ai"
+                    db.commit()
+                    print(f"[Orchestrator] ✓ Precomputed hashtags for version {version_id}")
+            except Exception as e:
+                print(f"[Orchestrator] ✗ Hashtag precompute failed for version {version_id}: {e}")
+            finally:
+                db.close()
+
+    def _brand_profile(self, db: Session, project: Project):
+        """
+        Brand profile from Project.tone and the project's approved versions (latest
+        versions scoring at least BRAND_APPROVED_MIN_SCORE). Cached by the scoring
+        agent until a new version is saved or the tone changes.
+        """
+        project_versions = db.query(ContentVersion).join(
+            ContentCalendar, ContentCalendar.id == ContentVersion.calendar_id
+        ).filter(ContentCalendar.tenant_id == current_tenant(), ContentCalendar.project_id == project.id)
+        stamp = project_versions.with_entities(func.max(ContentVersion.id)).scalar()
+
+        def load_approved():
+            # Latest versions keep their full body, so no delta decoding is needed
+            rows = project_versions.with_entities(ContentVersion.body).filter(
+                or_(ContentVersion.body_encoding == version_store.FULL, ContentVersion.body_encoding.is_(None)),
+                ContentVersion.seo_score >= BRAND_APPROVED_MIN_SCORE
+            ).order_by(ContentVersion.id.desc()).limit(BRAND_HISTORY_SIZE).all()
+            return [row.body for row in rows if row.body]
+
+        return self.scoring_agent.profile((current_tenant(), project.id), stamp, project.tone, load_approved)
+
+    def _research_context(self, db: Session, project_id: int) -> dict:
+        research_report = db.query(ResearchReport).filter(
+            ResearchReport.tenant_id == current_tenant(), ResearchReport.project_id == project_id
+        ).order_by(ResearchReport.id.desc()).first()
+        if not research_report:
+            return None
+        return {
+            "keyword_clusters": research_report.keyword_clusters or {},
+            "summary": research_report.summary
+        }
+
+    def _trending(self, research_context: dict) -> list:
+        if not research_context:
+            return []
+        return (research_context.get("keyword_clusters") or {}).get("trending", [])
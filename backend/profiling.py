@@ -0,0 +1,299 @@
+"""
+Request Profiling
+Opt-in profiles of slow or sampled requests, for finding where time goes
+inside e.g. /generate or /projects/{id}/research.
+
+While a request is being profiled, a sampling thread records the Python
+stacks of the server's busy threads every PROFILE_INTERVAL seconds (idle
+pool threads are skipped), so work done in the threadpool, the strategy
+chunk pool and provider-call threads is included. SQLAlchemy events count
+and time every SQL statement the request runs.
+
+A profile is kept when the request took at least PROFILE_SLOW_MS, or when it
+was one of every PROFILE_SAMPLE_RATE requests. Profiles are stored as JSON
+in PROFILE_DIR (newest PROFILE_KEEP are kept) and served by the
+/diagnostics/profiles routes, including collapsed stacks that flamegraph.pl
+and speedscope read directly.
+
+Samples cover all busy threads, so requests running at the same time show
+up in each other's profiles; each profile records how many requests were in
+flight while it ran.
+"""
+
+import contextvars
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+
+# Keep profiles of requests slower than this (ms; 0 = off) and of one in N requests (0 = off)
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+PROFILE_SAMPLE_RATE = int(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+# Optional shared secret for the diagnostics routes (X-Diagnostics-Token header)
+DIAGNOSTICS_TOKEN = os.getenv("DIAGNOSTICS_TOKEN", "")
+
+# Long-lived or self-referential routes are never profiled
+SKIP_PATHS = re.compile(r"^/(diagnostics|health$)|/events$")
+
+ENABLED = PROFILE_SLOW_MS > 0 or PROFILE_SAMPLE_RATE > 0
+
+# Innermost frames of threads waiting for work
+_IDLE_FRAMES = {
+    ("threading.py", "wait"), ("selectors.py", "select"), ("queue.py", "get"),
+    ("thread.py", "_worker"), ("events.py", "_poll"), ("profiling.py", "_run"),
+}
+_ROOT = str(Path(__file__).resolve().parent.parent)
+_THREAD_NUMBER = re.compile(r"[-_]?\d+(_\d+)?$")
+_SQL_SLOWEST = 10
+
+_active = contextvars.ContextVar("request_profile", default=None)
+_request_ids = itertools.count(1)
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+
+class SQLStats:
+    """SQL statement counts and timings of one request (shared by its threads)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_ms = 0.0
+        self.by_statement = {}
+
+    def add(self, statement: str, ms: float):
+        key = " ".join(statement.split())[:300]
+        with self._lock:
+            self.count += 1
+            self.total_ms += ms
+            calls, total = self.by_statement.get(key, (0, 0.0))
+            self.by_statement[key] = (calls + 1, total + ms)
+
+    def summary(self) -> dict:
+        with self._lock:
+            slowest = sorted(self.by_statement.items(), key=lambda item: item[1][1], reverse=True)[:_SQL_SLOWEST]
+            return {
+                "count": self.count,
+                "total_ms": round(self.total_ms, 2),
+                "statements": [
+                    {"sql": sql, "calls": calls, "total_ms": round(total, 2)} for sql, (calls, total) in slowest
+                ]
+            }
+
+
+class Profile:
+    def __init__(self, method: str, path: str, sampled: bool):
+        self.method = method
+        self.path = path
+        self.sampled = sampled
+        self.started_at = time.time()
+        self.stacks = Counter()
+        self.sql = SQLStats()
+        self.max_in_flight = 1
+        self._lock = threading.Lock()
+
+    def add_samples(self, stacks: list, in_flight: int):
+        with self._lock:
+            self.stacks.update(stacks)
+            self.max_in_flight = max(self.max_in_flight, in_flight)
+
+    def to_dict(self, profile_id: str, status: int, duration_ms: float) -> dict:
+        with self._lock:
+            stacks = dict(self.stacks)
+        self_counts, total_counts = Counter(), Counter()
+        for stack, count in stacks.items():
+            self_counts[stack[-1]] += count
+            for frame in set(stack[1:]):
+                total_counts[frame] += count
+        samples = sum(stacks.values())
+        return {
+            "id": profile_id,
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            "duration_ms": round(duration_ms, 1),
+            "started_at": self.started_at,
+            "reason": "sampled" if self.sampled else "slow",
+            "interval_ms": PROFILE_INTERVAL * 1000,
+            "samples": samples,
+            "max_in_flight": self.max_in_flight,
+            "sql": self.sql.summary(),
+            "top_self": [{"frame": f, "samples": n} for f, n in self_counts.most_common(25)],
+            "top_total": [{"frame": f, "samples": n} for f, n in total_counts.most_common(25)],
+            "collapsed": [f"{';'.join(stack)} {count}" for stack, count in sorted(stacks.items())]
+        }
+
+
+class _Sampler:
+    """One thread sampling all busy threads while any request is being profiled."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles = set()
+        self._thread = None
+
+    def start(self, profile: Profile):
+        with self._lock:
+            self._profiles.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+
+    def stop(self, profile: Profile):
+        with self._lock:
+            self._profiles.discard(profile)
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                profiles = list(self._profiles)
+                if not profiles:
+                    self._thread = None
+                    return
+            names = {t.ident: t.name for t in threading.enumerate()}
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = _stack(frame)
+                if stack:
+                    stacks.append((_THREAD_NUMBER.sub("", names.get(ident, "thread")),) + stack)
+            for profile in profiles:
+                profile.add_samples(stacks, _in_flight)
+            time.sleep(PROFILE_INTERVAL)
+
+
+_sampler = _Sampler()
+
+
+def _label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(_ROOT):
+        filename = filename[len(_ROOT) + 1:]
+    elif "site-packages" in filename:
+        filename = filename.split("site-packages/", 1)[1]
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _stack(frame) -> tuple:
+    """Root-to-leaf frame labels, or () for a thread waiting for work."""
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+        return ()
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    return tuple(reversed(labels))
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active.get() is not None:
+        conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _active.get()
+    starts = conn.info.get("profile_query_start")
+    if profile is not None and starts:
+        profile.sql.add(statement, (time.perf_counter() - starts.pop()) * 1000)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests per PROFILE_SLOW_MS / PROFILE_SAMPLE_RATE."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or SKIP_PATHS.search(scope["path"]):
+            return await self.app(scope, receive, send)
+
+        global _in_flight
+        sampled = PROFILE_SAMPLE_RATE > 0 and next(_request_ids) % PROFILE_SAMPLE_RATE == 0
+        profile = Profile(scope["method"], scope["path"], sampled)
+        status = {}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        token = _active.set(profile)
+        with _in_flight_lock:
+            _in_flight += 1
+        _sampler.start(profile)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            _sampler.stop(profile)
+            with _in_flight_lock:
+                _in_flight -= 1
+            _active.reset(token)
+            if sampled or (PROFILE_SLOW_MS > 0 and duration_ms >= PROFILE_SLOW_MS):
+                # Building and writing the profile is blocking file work; keep it off the event loop
+                await run_in_threadpool(save, profile, status.get("code", 500), duration_ms)
+
+
+def save(profile: Profile, status: int, duration_ms: float):
+    """Store a profile and prune old ones. Never raises."""
+    profile_id = f"{int(profile.started_at * 1000)}-{os.getpid()}-{next(_request_ids)}"
+    try:
+        directory = Path(PROFILE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        data = profile.to_dict(profile_id, status, duration_ms)
+        (directory / f"{profile_id}.json").write_text(json.dumps(data))
+        for old in sorted(directory.glob("*.json"), key=lambda p: p.stat().st_mtime)[:-PROFILE_KEEP]:
+            old.unlink(missing_ok=True)
+        print(f"[Profiling] Saved {data['reason']} profile {profile_id} ({profile.method} {profile.path}, "
+              f"{duration_ms:.0f} ms, {data['samples']} samples, {data['sql']['count']} SQL queries)")
+    except Exception as e:
+        print(f"[Profiling] ✗ Failed to save profile: {e}")
+
+
+def list_profiles() -> list:
+    """Stored profiles, newest first, without their stacks."""
+    directory = Path(PROFILE_DIR)
+    if not directory.exists():
+        return []
+    summaries = []
+    for path in sorted(directory.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue  # Pruned or being written by another worker
+        summaries.append({
+            key: data[key] for key in
+            ("id", "method", "path", "status", "duration_ms", "started_at", "reason", "samples", "max_in_flight")
+        } | {"sql_queries": data["sql"]["count"], "sql_ms": data["sql"]["total_ms"]})
+    return summaries
+
+
+def load_profile(profile_id: str) -> dict:
+    """A stored profile, or None if it doesn't exist."""
+    if not re.fullmatch(r"[0-9-]+", profile_id):
+        return None
+    path = Path(PROFILE_DIR) / f"{profile_id}.json"
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
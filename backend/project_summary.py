@@ -0,0 +1,190 @@
+"""
+Project Summary Aggregates
+Materialized per-project dashboard numbers so the frontend does not have to
+download every calendar item and version to work out project status.
+
+The aggregates are updated incrementally:
+- record_calendar_items() when calendar entries are added
+- record_version() when the Orchestrator saves a ContentVersion
+
+Projects without a summary row (e.g. databases created before this table
+existed) are rebuilt from the source tables with a few grouped queries.
+"""
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .models import ContentCalendar, ContentVersion, CalendarItemStats, ProjectSummary
+from .tenancy import current_tenant
+
+UNSPECIFIED = "Unspecified"
+
+
+def _bump(counts: dict, key: str, field: str, by: int = 1) -> dict:
+    """Return a copy of `counts` with counts[key][field] incremented (JSON columns need reassignment)."""
+    counts = {k: dict(v) for k, v in (counts or {}).items()}
+    entry = counts.setdefault(key or UNSPECIFIED, {"planned": 0, "generated": 0})
+    entry[field] = entry.get(field, 0) + by
+    return counts
+
+
+def record_calendar_items(db: Session, project_id: int, items: list):
+    """Count newly added ContentCalendar rows. The caller commits the session."""
+    summary = db.query(ProjectSummary).filter(
+        ProjectSummary.tenant_id == current_tenant(), ProjectSummary.project_id == project_id
+    ).first()
+    if summary is None:
+        db.flush()
+        return rebuild(db, project_id)
+
+    for item in items:
+        summary.platform_counts = _bump(summary.platform_counts, item.platform, "planned")
+        summary.objective_counts = _bump(summary.objective_counts, item.objective, "planned")
+    summary.items_total = (summary.items_total or 0) + len(items)
+    return summary
+
+
+def record_version(db: Session, calendar_item: ContentCalendar, version: ContentVersion):
+    """Fold a newly saved version into the aggregates. The caller commits the session."""
+    summary = db.query(ProjectSummary).filter(
+        ProjectSummary.tenant_id == current_tenant(), ProjectSummary.project_id == calendar_item.project_id
+    ).first()
+    if summary is None:
+        db.flush()
+        return rebuild(db, calendar_item.project_id)
+
+    stats = db.query(CalendarItemStats).filter(
+        CalendarItemStats.tenant_id == current_tenant(), CalendarItemStats.calendar_id == calendar_item.id
+    ).first()
+    if stats is None:
+        stats = CalendarItemStats(calendar_id=calendar_item.id, project_id=calendar_item.project_id, version_count=0)
+        db.add(stats)
+        summary.items_generated = (summary.items_generated or 0) + 1
+        summary.platform_counts = _bump(summary.platform_counts, calendar_item.platform, "generated")
+        summary.objective_counts = _bump(summary.objective_counts, calendar_item.objective, "generated")
+
+    stats.version_count = (stats.version_count or 0) + 1
+    stats.latest_version_id = version.id
+    stats.latest_seo_score = version.seo_score
+    stats.latest_readability_score = version.readability_score
+    stats.latest_brand_score = version.brand_score
+    stats.best_seo_score = max(stats.best_seo_score or 0, version.seo_score or 0)
+    stats.best_readability_score = max(stats.best_readability_score or 0, version.readability_score or 0)
+    stats.best_brand_score = max(stats.best_brand_score or 0, version.brand_score or 0)
+
+    summary.versions_total = (summary.versions_total or 0) + 1
+    return summary
+
+
+def rebuild(db: Session, project_id: int) -> ProjectSummary:
+    """Recompute a project's aggregates from the source tables."""
+    items = db.query(
+        ContentCalendar.id, ContentCalendar.platform, ContentCalendar.objective
+    ).filter(ContentCalendar.project_id == project_id).all()
+    item_lookup = {item.id: item for item in items}
+
+    per_item = db.query(
+        ContentVersion.calendar_id,
+        func.count(ContentVersion.id).label("version_count"),
+        func.max(ContentVersion.version_number).label("latest_number"),
+        func.max(ContentVersion.seo_score).label("best_seo"),
+        func.max(ContentVersion.readability_score).label("best_readability"),
+        func.max(ContentVersion.brand_score).label("best_brand"),
+    ).join(ContentCalendar, ContentCalendar.id == ContentVersion.calendar_id).filter(
+        ContentCalendar.project_id == project_id
+    ).group_by(ContentVersion.calendar_id).subquery()
+
+    rows = db.query(per_item, ContentVersion).join(
+        ContentVersion,
+        (ContentVersion.calendar_id == per_item.c.calendar_id)
+        & (ContentVersion.version_number == per_item.c.latest_number)
+    ).all()
+
+    db.query(CalendarItemStats).filter(
+        CalendarItemStats.tenant_id == current_tenant(), CalendarItemStats.project_id == project_id
+    ).delete()
+
+    summary = db.query(ProjectSummary).filter(
+        ProjectSummary.tenant_id == current_tenant(), ProjectSummary.project_id == project_id
+    ).first()
+    if summary is None:
+        summary = ProjectSummary(project_id=project_id)
+        db.add(summary)
+
+    platform_counts, objective_counts = {}, {}
+    for item in items:
+        platform_counts = _bump(platform_counts, item.platform, "planned")
+        objective_counts = _bump(objective_counts, item.objective, "planned")
+
+    seen = set()
+    versions_total = 0
+    for row in rows:
+        latest = row.ContentVersion
+        if latest.calendar_id in seen:
+            continue  # Duplicate version numbers: keep the first match
+        seen.add(latest.calendar_id)
+        versions_total += row.version_count
+
+        item = item_lookup.get(latest.calendar_id)
+        if item is not None:
+            platform_counts = _bump(platform_counts, item.platform, "generated")
+            objective_counts = _bump(objective_counts, item.objective, "generated")
+
+        db.add(CalendarItemStats(
+            calendar_id=latest.calendar_id,
+            project_id=project_id,
+            version_count=row.version_count,
+            latest_version_id=latest.id,
+            latest_seo_score=latest.seo_score,
+            latest_readability_score=latest.readability_score,
+            latest_brand_score=latest.brand_score,
+            best_seo_score=row.best_seo,
+            best_readability_score=row.best_readability,
+            best_brand_score=row.best_brand,
+        ))
+
+    summary.items_total = len(items)
+    summary.items_generated = len(seen)
+    summary.versions_total = versions_total
+    summary.platform_counts = platform_counts
+    summary.objective_counts = objective_counts
+    return summary
+
+
+def get_summary(db: Session, project_id: int) -> dict:
+    """Return the dashboard summary for a project, rebuilding it if missing."""
+    summary = db.query(ProjectSummary).filter(
+        ProjectSummary.tenant_id == current_tenant(), ProjectSummary.project_id == project_id
+    ).first()
+    if summary is None:
+        summary = rebuild(db, project_id)
+        db.commit()
+
+    stats = db.query(CalendarItemStats).filter(
+        CalendarItemStats.tenant_id == current_tenant(), CalendarItemStats.project_id == project_id
+    ).all()
+    return {
+        "project_id": project_id,
+        "items_total": summary.items_total or 0,
+        "items_generated": summary.items_generated or 0,
+        "versions_total": summary.versions_total or 0,
+        "platform_counts": summary.platform_counts or {},
+        "objective_counts": summary.objective_counts or {},
+        "items": {
+            s.calendar_id: {
+                "version_count": s.version_count,
+                "latest_version_id": s.latest_version_id,
+                "latest": {
+                    "seo_score": s.latest_seo_score,
+                    "readability_score": s.latest_readability_score,
+                    "brand_score": s.latest_brand_score
+                },
+                "best": {
+                    "seo_score": s.best_seo_score,
+                    "readability_score": s.best_readability_score,
+                    "brand_score": s.best_brand_score
+                }
+            }
+            for s in stats
+        }
+    }
@@ -0,0 +1,350 @@
+"""
+Research Analytics Index
+Keywords, trends and competitors from ResearchReport's JSON columns, copied
+into indexed side tables so cross-project questions are answered with
+grouped SQL instead of loading and parsing every report:
+
+- research_keywords / research_competitors hold each project's latest
+  report (a newer report or a refreshed section replaces its rows)
+- research_trends keeps every trend ever reported with the time its section
+  was generated, so trend frequency can be followed over time
+
+Values are normalized (case, whitespace, "Trend 1:" style numbering,
+hashtag signs) so the same keyword from different reports groups together,
+and rows carry the project's normalized niche so per-niche queries use the
+(tenant_id, niche, ...) indexes.
+
+The index is maintained incrementally:
+- record_report() when the Orchestrator saves or refreshes a report
+- remove() when reports are overwritten (bulk imports with --replace)
+
+Each indexed report is stamped with ResearchReport.indexed_at. Reports
+without it (e.g. saved before these tables existed, or bulk-imported) are
+indexed when the server starts, or with:
+
+    python -m backend.research_index
+
+so the analytics routes only read.
+"""
+
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import func, distinct, exists
+from sqlalchemy.orm import Session, aliased
+
+from .models import Project, ResearchReport, ResearchKeyword, ResearchTrend, ResearchCompetitor
+from .db import SessionLocal, TENANT_DATABASE, TENANT_DB_DIR
+from .tenancy import current_tenant, tenant_scope, DEFAULT_TENANT
+
+KEYWORD_CLUSTERS = ("primary", "secondary", "trending")
+INDEXED_SECTIONS = ("keyword_clusters", "trends", "competitors")
+
+# strftime() formats of the trend history buckets
+INTERVALS = {"day": "%Y-%m-%d", "week": "%Y-W%W", "month": "%Y-%m"}
+
+# "Trend 1: ...", "Competitor 2 - ...", "3. ..." as produced by the research prompt
+_NUMBERING = re.compile(r"^\s*(?:(?:trend|competitor|keyword)\s*)?\d+\s*[:.)\-]\s*", re.IGNORECASE)
+# Competitor entries are often "Name - what they do"
+_DESCRIPTION = re.compile(r"\s+[-–—]\s+|:\s+|\s+\(")
+
+# SQLite limits the number of bound parameters per statement
+_IN_CHUNK = 500
+
+
+def normalize(value: str) -> str:
+    return re.sub(r"\s+", " ", (value or "").lower()).strip(" \t.,;:!?\"'#")
+
+
+def _label(value) -> str:
+    """Display text of one list entry (strings, or dicts with a name-like field)."""
+    if isinstance(value, dict):
+        value = value.get("name") or value.get("trend") or value.get("keyword") or next(
+            (v for v in value.values() if isinstance(v, str)), ""
+        )
+    if not isinstance(value, str):
+        return ""
+    return _NUMBERING.sub("", value).strip()
+
+
+def _entries(values, split_description: bool = False) -> list:
+    """(normalized, label) pairs of a JSON list, without blanks and duplicates, in order."""
+    entries, seen = [], set()
+    for value in values if isinstance(values, list) else []:
+        label = _label(value)
+        if split_description:
+            label = _DESCRIPTION.split(label, 1)[0].strip()
+        key = normalize(label)
+        if key and key not in seen:
+            seen.add(key)
+            entries.append((key, label[:200]))
+    return entries
+
+
+def _observed_at(report: ResearchReport) -> datetime:
+    stamp = (report.section_updated_at or {}).get("trends")
+    if stamp:
+        try:
+            return datetime.fromisoformat(stamp)
+        except ValueError:
+            pass
+    return report.created_at or datetime.utcnow()
+
+
+def record_report(db: Session, report: ResearchReport, niche: str, sections=INDEXED_SECTIONS, latest: bool = True):
+    """
+    Index the given sections of a saved report (its id must be assigned).
+    Keywords and competitors replace the project's previous rows; trends are
+    appended. A report that is not its project's latest (`latest=False`)
+    only contributes its trends. The caller commits.
+    """
+    report.indexed_at = datetime.utcnow()
+    niche = normalize(niche)
+    common = {"report_id": report.id, "project_id": report.project_id, "niche": niche}
+
+    if latest and "keyword_clusters" in sections:
+        db.query(ResearchKeyword).filter(ResearchKeyword.project_id == report.project_id).delete(
+            synchronize_session=False
+        )
+        clusters = report.keyword_clusters if isinstance(report.keyword_clusters, dict) else {}
+        db.add_all([
+            ResearchKeyword(cluster=cluster, keyword=key, label=label, position=position, **common)
+            for cluster in KEYWORD_CLUSTERS
+            for position, (key, label) in enumerate(_entries(clusters.get(cluster)))
+        ])
+
+    if latest and "competitors" in sections:
+        db.query(ResearchCompetitor).filter(ResearchCompetitor.project_id == report.project_id).delete(
+            synchronize_session=False
+        )
+        db.add_all([
+            ResearchCompetitor(competitor=key, label=label, **common)
+            for key, label in _entries(report.competitors, split_description=True)
+        ])
+
+    if "trends" in sections:
+        observed_at = _observed_at(report)
+        db.add_all([
+            ResearchTrend(trend=key, label=label, observed_at=observed_at, **common)
+            for key, label in _entries(report.trends)
+        ])
+
+
+def remove(db: Session, report_ids):
+    """Drop the index rows of the given reports and clear their stamps. The caller commits."""
+    report_ids = list(report_ids)
+    for start in range(0, len(report_ids), _IN_CHUNK):
+        chunk = report_ids[start:start + _IN_CHUNK]
+        for model in (ResearchKeyword, ResearchTrend, ResearchCompetitor):
+            db.query(model).filter(model.report_id.in_(chunk)).delete(synchronize_session=False)
+        db.query(ResearchReport).filter(ResearchReport.id.in_(chunk)).update(
+            {ResearchReport.indexed_at: None}, synchronize_session=False
+        )
+
+
+def ensure_indexed(db: Session, all_tenants: bool = False) -> int:
+    """
+    Index the current tenant's reports that have no indexed_at stamp (every
+    tenant's in this database with `all_tenants`). Reports indexed before
+    the stamp existed already have rows and are only stamped. Returns the
+    number of reports indexed; the caller commits.
+    """
+    query = db.query(ResearchReport, Project.niche).join(Project, Project.id == ResearchReport.project_id).filter(
+        ResearchReport.indexed_at.is_(None)
+    )
+    if not all_tenants:
+        query = query.filter(ResearchReport.tenant_id == current_tenant())
+    missing = query.order_by(ResearchReport.id).all()
+    if not missing:
+        return 0
+
+    report_ids = [report.id for report, _ in missing]
+    project_ids = {report.project_id for report, _ in missing}
+    latest_ids = {
+        row.latest_id for row in db.query(func.max(ResearchReport.id).label("latest_id")).filter(
+            ResearchReport.project_id.in_(project_ids)
+        ).group_by(ResearchReport.project_id)
+    }
+    has_rows = set()
+    for model in (ResearchKeyword, ResearchTrend, ResearchCompetitor):
+        for start in range(0, len(report_ids), _IN_CHUNK):
+            chunk = report_ids[start:start + _IN_CHUNK]
+            has_rows.update(row[0] for row in db.query(distinct(model.report_id)).filter(model.report_id.in_(chunk)))
+
+    indexed = 0
+    now = datetime.utcnow()
+    for report, niche in missing:
+        if report.id in has_rows:
+            report.indexed_at = now
+            continue
+        # Index rows take the report's tenant
+        with tenant_scope(report.tenant_id):
+            record_report(db, report, niche, latest=report.id in latest_ids)
+        indexed += 1
+    db.flush()
+    return indexed
+
+
+def backfill() -> int:
+    """Index unstamped reports in every database (shared, or one file per tenant). Commits."""
+    tenants = [DEFAULT_TENANT]
+    if TENANT_DATABASE == "file":
+        tenants += sorted(path.stem for path in Path(TENANT_DB_DIR).glob("*.sqlite"))
+    total = 0
+    for tenant in tenants:
+        with tenant_scope(tenant):
+            db = SessionLocal()
+            try:
+                total += ensure_indexed(db, all_tenants=True)
+                db.commit()
+            finally:
+                db.close()
+    return total
+
+
+# --- Aggregates ----------------------------------------------------------------
+
+def top_keywords(db: Session, niche: str = None, cluster: str = None, limit: int = 10) -> dict:
+    """
+    Most common keywords per niche ({niche: [...]}), counted by the number of
+    projects whose latest report lists them; one niche if `niche` is given.
+    """
+    query = db.query(
+        ResearchKeyword.niche,
+        ResearchKeyword.keyword,
+        func.min(ResearchKeyword.label).label("label"),
+        func.count(distinct(ResearchKeyword.project_id)).label("projects"),
+        func.avg(ResearchKeyword.position).label("avg_position"),
+    ).filter(ResearchKeyword.tenant_id == current_tenant())
+    if niche is not None:
+        query = query.filter(ResearchKeyword.niche == normalize(niche))
+    if cluster is not None:
+        query = query.filter(ResearchKeyword.cluster == cluster)
+    grouped = query.group_by(ResearchKeyword.niche, ResearchKeyword.keyword).subquery()
+
+    rank = func.row_number().over(
+        partition_by=grouped.c.niche,
+        order_by=(grouped.c.projects.desc(), grouped.c.avg_position, grouped.c.keyword)
+    ).label("rank")
+    ranked = db.query(grouped, rank).subquery()
+    rows = db.query(ranked).filter(ranked.c.rank <= limit).order_by(ranked.c.niche, ranked.c.rank).all()
+
+    result = {}
+    for row in rows:
+        result.setdefault(row.niche, []).append({
+            "keyword": row.keyword,
+            "label": row.label,
+            "projects": row.projects,
+            "avg_position": round(row.avg_position, 2)
+        })
+    return result
+
+
+def trend_frequency(db: Session, niche: str = None, interval: str = "week", days: int = 90, limit: int = 10) -> list:
+    """
+    The `limit` trends reported by the most projects in the last `days` days,
+    each with the number of projects reporting it per `interval` bucket.
+    """
+    filters = [ResearchTrend.tenant_id == current_tenant(),
+               ResearchTrend.observed_at >= datetime.utcnow() - timedelta(days=days)]
+    if niche is not None:
+        filters.append(ResearchTrend.niche == normalize(niche))
+
+    top = db.query(
+        ResearchTrend.trend,
+        func.min(ResearchTrend.label).label("label"),
+        func.count(distinct(ResearchTrend.project_id)).label("projects"),
+        func.max(ResearchTrend.observed_at).label("last_seen"),
+    ).filter(*filters).group_by(ResearchTrend.trend).order_by(
+        func.count(distinct(ResearchTrend.project_id)).desc(), ResearchTrend.trend
+    ).limit(limit).all()
+    if not top:
+        return []
+
+    period = func.strftime(INTERVALS[interval], ResearchTrend.observed_at).label("period")
+    series = {}
+    for row in db.query(
+        ResearchTrend.trend, period, func.count(distinct(ResearchTrend.project_id)).label("projects")
+    ).filter(*filters, ResearchTrend.trend.in_([row.trend for row in top])).group_by(
+        ResearchTrend.trend, period
+    ).order_by(period):
+        series.setdefault(row.trend, []).append({"period": row.period, "projects": row.projects})
+
+    return [
+        {
+            "trend": row.trend,
+            "label": row.label,
+            "projects": row.projects,
+            "last_seen": row.last_seen.isoformat() if row.last_seen else None,
+            "series": series.get(row.trend, [])
+        }
+        for row in top
+    ]
+
+
+def top_competitors(db: Session, niche: str = None, limit: int = 20) -> list:
+    """Competitors named by the most projects' latest reports."""
+    query = db.query(
+        ResearchCompetitor.competitor,
+        func.min(ResearchCompetitor.label).label("label"),
+        func.count(distinct(ResearchCompetitor.project_id)).label("projects"),
+    ).filter(ResearchCompetitor.tenant_id == current_tenant())
+    if niche is not None:
+        query = query.filter(ResearchCompetitor.niche == normalize(niche))
+    rows = query.group_by(ResearchCompetitor.competitor).order_by(
+        func.count(distinct(ResearchCompetitor.project_id)).desc(), ResearchCompetitor.competitor
+    ).limit(limit).all()
+    return [{"competitor": row.competitor, "label": row.label, "projects": row.projects} for row in rows]
+
+
+def competitor_overlap(db: Session, project_id: int, limit: int = 10) -> list:
+    """
+    Projects sharing competitors with `project_id`, most shared first, with
+    the Jaccard similarity of the two competitor sets.
+    """
+    tenant_id = current_tenant()
+    mine, theirs = aliased(ResearchCompetitor), aliased(ResearchCompetitor)
+    sizes = db.query(
+        ResearchCompetitor.project_id, func.count(ResearchCompetitor.id).label("size")
+    ).filter(ResearchCompetitor.tenant_id == tenant_id).group_by(ResearchCompetitor.project_id).subquery()
+    own_size = db.query(func.count(ResearchCompetitor.id)).filter(
+        ResearchCompetitor.tenant_id == tenant_id, ResearchCompetitor.project_id == project_id
+    ).scalar()
+
+    shared = func.count(theirs.id).label("shared")
+    rows = db.query(theirs.project_id, Project.niche, shared, sizes.c.size).join(
+        mine, (mine.competitor == theirs.competitor) & (mine.tenant_id == theirs.tenant_id)
+    ).join(sizes, sizes.c.project_id == theirs.project_id).join(Project, Project.id == theirs.project_id).filter(
+        mine.tenant_id == tenant_id, mine.project_id == project_id, theirs.project_id != project_id
+    ).group_by(theirs.project_id, Project.niche, sizes.c.size).order_by(shared.desc(), theirs.project_id).limit(limit).all()
+    if not rows:
+        return []
+
+    names = {}
+    for row in db.query(theirs.project_id, theirs.label).join(
+        mine, (mine.competitor == theirs.competitor) & (mine.tenant_id == theirs.tenant_id)
+    ).filter(
+        mine.tenant_id == tenant_id, mine.project_id == project_id,
+        theirs.project_id.in_([row.project_id for row in rows])
+    ).order_by(theirs.id):
+        names.setdefault(row.project_id, []).append(row.label)
+
+    return [
+        {
+            "project_id": row.project_id,
+            "niche": row.niche,
+            "shared": row.shared,
+            "jaccard": round(row.shared / (own_size + row.size - row.shared), 3),
+            "competitors": names.get(row.project_id, [])
+        }
+        for row in rows
+    ]
+
+
+if __name__ == "__main__":
+    from .db import Base, engine, add_missing_columns
+
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    print(f"[ResearchIndex] Indexed {backfill()} research reports")
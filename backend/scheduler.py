@@ -0,0 +1,315 @@
+"""
+Priority Scheduling
+Keeps interactive editor work responsive while heavy batch work is running.
+Work belongs to a priority class, highest first:
+
+- interactive: editor requests (/content/{id}/write, hashtags, repurpose)
+- batch: research runs and /generate (the default outside any request)
+- background: work nobody is waiting for (e.g. eager hashtag precompute)
+
+Two FairSchedulers gate the work, one per worker process:
+
+- `request_queue` admits LLM-heavy requests before they take a thread, at most
+  SCHEDULER_INTERACTIVE_REQUESTS / SCHEDULER_BATCH_REQUESTS at a time; the
+  rest wait in the event loop
+- `provider_queue` hands out SCHEDULER_PROVIDER_SLOTS concurrent provider calls
+  to AIClient. Batch and background calls never take the last
+  SCHEDULER_INTERACTIVE_RESERVED slots, and freed slots go to the highest
+  waiting class first, so an editor call waits for at most one provider call
+  even while a research run fans out
+
+Within a class, waiters are served round-robin by tenant (fair queuing), so
+one tenant's bulk run cannot starve another tenant's requests of its class.
+
+The class travels in a context variable, like the tenant and the deadline:
+
+    with priority_scope(INTERACTIVE):
+        ...  # AIClient calls in here are interactive
+
+Queue depth, running work and wait times per class are reported by
+metrics() and served at GET /scheduler/metrics.
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+from . import deadlines
+from .tenancy import current_tenant
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+BACKGROUND = "background"
+PRIORITY_CLASSES = (INTERACTIVE, BATCH, BACKGROUND)  # Highest priority first
+
+# LLM-heavy requests of each class running at once per worker
+INTERACTIVE_REQUESTS = int(os.getenv("SCHEDULER_INTERACTIVE_REQUESTS", "8"))
+BATCH_REQUESTS = int(os.getenv("SCHEDULER_BATCH_REQUESTS", "2"))
+# Concurrent provider calls per worker (0 = unlimited) and how many only interactive calls may use
+PROVIDER_SLOTS = int(os.getenv("SCHEDULER_PROVIDER_SLOTS", "8"))
+INTERACTIVE_RESERVED = int(os.getenv("SCHEDULER_INTERACTIVE_RESERVED", "2"))
+# Seconds a request may wait for admission before it is turned away with 503
+QUEUE_TIMEOUT = float(os.getenv("SCHEDULER_QUEUE_TIMEOUT", "300"))
+
+# How often waiters check their deadline, timeout or client
+POLL_SECONDS = 0.25
+# Wait times kept per class for the metrics percentiles
+WAIT_WINDOW = 1000
+
+_priority = contextvars.ContextVar("priority_class", default=BATCH)
+
+
+class QueueTimeout(Exception):
+    """Work waited longer than its queue timeout (or its client left) without being admitted."""
+
+
+class _Ticket:
+    __slots__ = ("priority", "tenant", "enqueued_at", "granted", "wake")
+
+    def __init__(self, priority: str, tenant: str):
+        self.priority = priority
+        self.tenant = tenant
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+        self.wake = None  # Set by async waiters; called on grant from any thread
+
+
+class _ClassMetrics:
+    def __init__(self):
+        self.admitted = 0
+        self.abandoned = 0
+        self.waits = deque(maxlen=WAIT_WINDOW)
+
+
+class FairScheduler:
+    """
+    Admission by priority class: a waiter of class c is admitted while fewer
+    than limits[c] of its class run and the total running stays below
+    `capacity` minus reserve[c] (slots kept for higher classes). Freed
+    capacity goes to the highest class with waiters, tenant by tenant.
+    """
+
+    def __init__(self, name: str, limits: dict, capacity: int = None, reserve: dict = None):
+        self.name = name
+        self.limits = limits
+        self.capacity = capacity
+        self.reserve = reserve or {}
+        self._cond = threading.Condition()
+        self._queues = {c: OrderedDict() for c in PRIORITY_CLASSES}  # class -> tenant -> deque of tickets
+        self._running = {c: 0 for c in PRIORITY_CLASSES}
+        self._metrics = {c: _ClassMetrics() for c in PRIORITY_CLASSES}
+
+    def _can_run(self, priority: str) -> bool:
+        if self._running[priority] >= self.limits.get(priority, float("inf")):
+            return False
+        if self.capacity is None:
+            return True
+        return sum(self._running.values()) < self.capacity - self.reserve.get(priority, 0)
+
+    def _dispatch(self):
+        # Called with the lock held
+        granted = False
+        while True:
+            for priority in PRIORITY_CLASSES:
+                queue = self._queues[priority]
+                if queue and self._can_run(priority):
+                    tenant, tickets = next(iter(queue.items()))
+                    ticket = tickets.popleft()
+                    if tickets:
+                        queue.move_to_end(tenant)  # Next turn goes to the next tenant
+                    else:
+                        del queue[tenant]
+                    self._grant(ticket)
+                    granted = True
+                    break
+            else:
+                break
+        if granted:
+            self._cond.notify_all()
+
+    def _grant(self, ticket: _Ticket):
+        ticket.granted = True
+        self._running[ticket.priority] += 1
+        metrics = self._metrics[ticket.priority]
+        metrics.admitted += 1
+        metrics.waits.append(time.monotonic() - ticket.enqueued_at)
+        if ticket.wake is not None:
+            ticket.wake()
+
+    def _enqueue(self, priority: str = None, tenant: str = None) -> _Ticket:
+        priority = priority or current_priority()
+        if priority not in self._queues:
+            raise ValueError(f"Unknown priority class '{priority}'")
+        return _Ticket(priority, tenant or current_tenant())
+
+    def _submit(self, ticket: _Ticket):
+        with self._cond:
+            self._queues[ticket.priority].setdefault(ticket.tenant, deque()).append(ticket)
+            self._dispatch()
+
+    def _abandon(self, ticket: _Ticket):
+        """Withdraw a waiting ticket (releasing it if it was granted meanwhile)."""
+        with self._cond:
+            if ticket.granted:
+                self._release_locked(ticket)
+                return
+            tickets = self._queues[ticket.priority].get(ticket.tenant)
+            if tickets is not None and ticket in tickets:
+                tickets.remove(ticket)
+                if not tickets:
+                    del self._queues[ticket.priority][ticket.tenant]
+            self._metrics[ticket.priority].abandoned += 1
+
+    def acquire(self, priority: str = None, tenant: str = None, deadline: "deadlines.Deadline" = None,
+                timeout: float = None) -> _Ticket:
+        """
+        Block until admitted. Raises DeadlineExceeded if `deadline` (default:
+        the request's) passes first, or QueueTimeout after `timeout` seconds.
+        """
+        deadline = deadline or deadlines.current()
+        ticket = self._enqueue(priority, tenant)
+        self._submit(ticket)
+        with self._cond:
+            while not ticket.granted:
+                waited = time.monotonic() - ticket.enqueued_at
+                if deadline.expired() or (timeout is not None and waited >= timeout):
+                    break
+                self._cond.wait(POLL_SECONDS)
+        if ticket.granted:
+            return ticket
+        self._abandon(ticket)
+        deadlines.check(deadline)
+        raise QueueTimeout(f"No {self.name} slot free after {timeout:.0f}s")
+
+    def try_acquire(self, priority: str = None, tenant: str = None) -> _Ticket:
+        """Admit immediately if nobody of the same or a higher class is waiting, else return None."""
+        ticket = self._enqueue(priority, tenant)
+        with self._cond:
+            higher = PRIORITY_CLASSES[:PRIORITY_CLASSES.index(ticket.priority) + 1]
+            if any(self._queues[c] for c in higher) or not self._can_run(ticket.priority):
+                return None
+            self._grant(ticket)
+        return ticket
+
+    async def acquire_async(self, priority: str = None, tenant: str = None, timeout: float = QUEUE_TIMEOUT,
+                            is_cancelled=None) -> _Ticket:
+        """
+        Wait for admission without holding a thread. `is_cancelled` is an
+        optional coroutine function (e.g. request.is_disconnected); raises
+        QueueTimeout when it returns True or after `timeout` seconds.
+        """
+        loop = asyncio.get_running_loop()
+        admitted = asyncio.Event()
+        ticket = self._enqueue(priority, tenant)
+        ticket.wake = lambda: loop.call_soon_threadsafe(admitted.set)
+        self._submit(ticket)
+        reason = None
+        while not ticket.granted:
+            try:
+                await asyncio.wait_for(admitted.wait(), POLL_SECONDS)
+            except asyncio.TimeoutError:
+                if timeout is not None and time.monotonic() - ticket.enqueued_at >= timeout:
+                    reason = f"No {self.name} slot free after {timeout:.0f}s"
+                elif is_cancelled is not None and await is_cancelled():
+                    reason = "Client disconnected while queued"
+                if reason:
+                    break
+        if not reason:
+            return ticket
+        self._abandon(ticket)
+        raise QueueTimeout(reason)
+
+    def release(self, ticket: _Ticket):
+        with self._cond:
+            self._release_locked(ticket)
+
+    def _release_locked(self, ticket: _Ticket):
+        if ticket.granted:
+            ticket.granted = False
+            self._running[ticket.priority] -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, priority: str = None, tenant: str = None, deadline: "deadlines.Deadline" = None,
+             timeout: float = None):
+        ticket = self.acquire(priority, tenant, deadline, timeout)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def metrics(self) -> dict:
+        """Queue depth (total and per tenant), running work and wait times per class."""
+        with self._cond:
+            snapshot = {
+                priority: {
+                    "limit": self.limits.get(priority),
+                    "running": self._running[priority],
+                    "queued": sum(len(tickets) for tickets in self._queues[priority].values()),
+                    "queued_by_tenant": {tenant: len(tickets) for tenant, tickets in self._queues[priority].items()},
+                    "oldest_wait_seconds": round(max(
+                        (time.monotonic() - tickets[0].enqueued_at for tickets in self._queues[priority].values()),
+                        default=0.0
+                    ), 3),
+                    "admitted": self._metrics[priority].admitted,
+                    "abandoned": self._metrics[priority].abandoned,
+                    "waits": list(self._metrics[priority].waits)
+                }
+                for priority in PRIORITY_CLASSES
+            }
+        for stats in snapshot.values():
+            waits = stats.pop("waits")
+            stats["wait_seconds"] = {
+                "p50": round(float(np.percentile(waits, 50)), 3) if waits else 0.0,
+                "p95": round(float(np.percentile(waits, 95)), 3) if waits else 0.0,
+                "max": round(max(waits), 3) if waits else 0.0
+            }
+        return {"capacity": self.capacity, "classes": snapshot}
+
+
+def _provider_scheduler() -> FairScheduler:
+    if PROVIDER_SLOTS <= 0:
+        return FairScheduler("provider", {})
+    shared = max(1, PROVIDER_SLOTS - INTERACTIVE_RESERVED)
+    return FairScheduler(
+        "provider",
+        {INTERACTIVE: PROVIDER_SLOTS, BATCH: shared, BACKGROUND: max(1, shared // 2)},
+        capacity=PROVIDER_SLOTS,
+        reserve={BATCH: INTERACTIVE_RESERVED, BACKGROUND: INTERACTIVE_RESERVED}
+    )
+
+
+request_queue = FairScheduler("request", {INTERACTIVE: INTERACTIVE_REQUESTS, BATCH: BATCH_REQUESTS})
+provider_queue = _provider_scheduler()
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+def set_priority(priority: str):
+    """Bind the priority class for the rest of the current context (e.g. one request)."""
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class '{priority}'")
+    _priority.set(priority)
+
+
+@contextmanager
+def priority_scope(priority: str):
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class '{priority}'")
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def metrics() -> dict:
+    return {"requests": request_queue.metrics(), "providers": provider_queue.metrics()}
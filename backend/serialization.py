@@ -0,0 +1,63 @@
+"""
+Response Serialization
+Fast path for list endpoints: query only the columns a response model needs,
+turn the row tuples into plain dicts and render them with orjson. This skips
+jsonable_encoder's reflection over ORM objects (and their lazy relationships)
+and response-model validation, which dominated CPU time on large calendars.
+The Pydantic response models still document the payload in OpenAPI.
+
+Listings that can grow without bound are streamed instead: json_array()
+renders an iterator of dicts chunk by chunk, so the response is never held
+in memory as a whole.
+"""
+
+import json
+from typing import Iterable, Type
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when installed, stdlib json otherwise."""
+
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return _dumps(content)
+
+
+def columns(orm_model, schema: Type[BaseModel], *extra) -> list:
+    """ORM columns for every field of `schema` (plus `extra` columns), in field order."""
+    return [getattr(orm_model, name) for name in schema.model_fields] + list(extra)
+
+
+def to_dicts(rows, schema: Type[BaseModel]) -> list:
+    """Row tuples selected with columns(...) -> list of dicts keyed by the schema's fields."""
+    fields = list(schema.model_fields)
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def _dumps(value) -> bytes:
+    if orjson is None:
+        return json.dumps(value).encode("utf-8")
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+
+def json_array(items: Iterable[dict], chunk_size: int = 100):
+    """Encode an iterable as a JSON array, yielding bytes every `chunk_size` items."""
+    yield b"["
+    chunk, first = [], True
+    for item in items:
+        chunk.append(_dumps(item))
+        if len(chunk) >= chunk_size:
+            yield (b"" if first else b",") + b",".join(chunk)
+            chunk, first = [], False
+    if chunk:
+        yield (b"" if first else b",") + b",".join(chunk)
+    yield b"]"
@@ -0,0 +1,126 @@
+"""
+Serving Lifecycle Helpers
+Used by both the single-process uvicorn setup and the multi-worker gunicorn
+profile (gunicorn_conf.py):
+
+- warm_up(): build the AI client, agents' shared resources and database
+  schema before workers fork, so the first request in each worker is fast
+- after_fork(): drop resources that must not be shared across processes
+- track_generation(): count in-flight generations in this worker
+- drain(): stop accepting generations and wait for in-flight ones to finish
+  before the worker exits (reloads, deploys, scale-down)
+- allow_generation(): cross-worker rate limit for LLM-heavy routes
+- on_exit_signal(): react to SIGTERM/SIGINT before the server stops, e.g. to
+  end event streams that would otherwise hold the shutdown
+"""
+
+import asyncio
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+from .shared_state import get_shared_state
+
+# Max generation requests per client per minute, shared by all workers (0 disables)
+GENERATION_RATE_LIMIT = int(os.getenv("GENERATION_RATE_LIMIT", "0"))
+# Seconds a shutting-down worker waits for in-flight generations
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", "120"))
+
+_lock = threading.Condition()
+_in_flight = 0
+_draining = False
+
+
+def warm_up():
+    """Initialize shared resources once, before workers are forked."""
+    from .db import Base, engine, add_missing_columns
+    from .agents.ai_client import get_ai_client
+    from .agents import readability
+
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    get_ai_client()
+    readability.analyze("Warm up the readability engine. It loads the syllable dictionary.")
+    get_shared_state()
+    print(f"[Serving] Warm-up complete (pid {os.getpid()})")
+
+
+def after_fork():
+    """Reset per-process resources inherited from a preloaded master."""
+    from .db import all_engines
+    from .agents.ai_client import get_ai_client
+
+    # Pooled SQLite connections and provider HTTP clients must not cross a fork
+    for engine in all_engines():
+        engine.dispose(close=False)
+    get_ai_client().reset_providers()
+
+
+def on_exit_signal(callback):
+    """
+    Run `callback` on the running event loop as soon as SIGTERM or SIGINT
+    arrives. Uvicorn waits for open connections to close before it runs the
+    lifespan shutdown, so long-lived responses must end here. The server's
+    own handler still runs afterwards.
+    """
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        previous = signal.getsignal(sig)
+
+        def handler(signum, frame, previous=previous):
+            loop.call_soon_threadsafe(callback)
+            if callable(previous):
+                previous(signum, frame)
+
+        try:
+            signal.signal(sig, handler)
+        except ValueError:
+            pass  # Not the main thread (embedded server); fall back to the lifespan shutdown
+
+
+def in_flight() -> int:
+    return _in_flight
+
+
+def is_draining() -> bool:
+    return _draining
+
+
+@contextmanager
+def track_generation():
+    """Mark a generation as in flight for the duration of the block."""
+    global _in_flight
+    with _lock:
+        _in_flight += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _in_flight -= 1
+            _lock.notify_all()
+
+
+def drain(timeout: float = DRAIN_TIMEOUT) -> bool:
+    """Refuse new generations and wait for in-flight ones. Returns True if fully drained."""
+    global _draining
+    deadline = time.monotonic() + timeout
+    with _lock:
+        _draining = True
+        if _in_flight:
+            print(f"[Serving] Draining {_in_flight} in-flight generation(s)...")
+        while _in_flight:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print(f"[Serving] ⚠ Drain timed out with {_in_flight} generation(s) still running")
+                return False
+            _lock.wait(remaining)
+    return True
+
+
+def allow_generation(client_id: str) -> bool:
+    """Apply GENERATION_RATE_LIMIT per client across all workers."""
+    if GENERATION_RATE_LIMIT <= 0:
+        return True
+    return get_shared_state().hit(f"ratelimit:generate:{client_id}", GENERATION_RATE_LIMIT, 60)
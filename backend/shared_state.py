@@ -0,0 +1,146 @@
+"""
+Shared Cache and Rate-Limit State
+
+Module-level singletons only live inside one process, so when the API runs
+with several workers (see gunicorn_conf.py) caches and rate limits have to be
+kept somewhere all workers can see. Two backends are available:
+
+- "memory": in-process dict, for a single uvicorn process (default)
+- "sqlite": a small WAL-mode SQLite file shared by all workers on the host
+
+Configure with environment variables:
+
+    SHARED_STATE_BACKEND=sqlite
+    SHARED_STATE_PATH=./shared_state.sqlite
+
+Values must be JSON-serializable.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class MemoryBackend:
+    """Per-process cache and rate-limit counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._windows = {}
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._cache[key]
+                return None
+            return json.loads(value)
+
+    def set(self, key: str, value, ttl: float = None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._cache[key] = (json.dumps(value), expires_at)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def hit(self, key: str, limit: int, window: float) -> bool:
+        """Count one request against `key`; False once `limit` is exceeded in the current window."""
+        now = time.time()
+        with self._lock:
+            start, count = self._windows.get(key, (now, 0))
+            if now - start >= window:
+                start, count = now, 0
+            count += 1
+            self._windows[key] = (start, count)
+            return count <= limit
+
+
+class SQLiteBackend:
+    """Cache and rate-limit counters in a SQLite file shared across worker processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, window_start REAL, count INTEGER)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread (and per process, since forked workers get new threads)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key: str):
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            self.delete(key)
+            return None
+        return json.loads(value)
+
+    def set(self, key: str, value, ttl: float = None):
+        expires_at = time.time() + ttl if ttl else None
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), expires_at)
+        )
+
+    def delete(self, key: str):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def hit(self, key: str, limit: int, window: float) -> bool:
+        """Count one request against `key`; False once `limit` is exceeded in the current window."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT window_start, count FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+            start, count = row if row else (now, 0)
+            if now - start >= window:
+                start, count = now, 0
+            count += 1
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limits (key, window_start, count) VALUES (?, ?, ?)",
+                (key, start, count)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return count <= limit
+
+
+# Singleton instance
+_shared_state = None
+
+def get_shared_state():
+    """Get the configured shared-state backend for this process."""
+    global _shared_state
+    if _shared_state is None:
+        backend = os.getenv("SHARED_STATE_BACKEND", "memory").lower()
+        if backend == "sqlite":
+            _shared_state = SQLiteBackend(os.getenv("SHARED_STATE_PATH", "./shared_state.sqlite"))
+        else:
+            _shared_state = MemoryBackend()
+        print(f"[SharedState] Using {backend} backend")
+    return _shared_state
@@ -0,0 +1,61 @@
+"""
+Tenancy
+Every request runs on behalf of one tenant (an agency workspace), taken from
+the X-Tenant-ID header; requests without it belong to the "default" tenant,
+which also owns all rows created before tenancy existed.
+
+This is data partitioning, not access control: the client chooses the
+tenant, so any caller can read any tenant by sending its id. Deployments
+serving several agencies must authenticate requests in front of the app
+(e.g. a proxy that sets X-Tenant-ID from the logged-in user and strips the
+client's own value, including the ?tenant= query of /events).
+
+The tenant is kept in a context variable, like the usage ledger scope:
+- new rows get it as their tenant_id column default
+- routes and the Orchestrator filter their lookups by it
+- db.SessionLocal() opens the tenant's own SQLite file when
+  TENANT_DATABASE=file (see db.get_engine)
+
+Background work must carry the tenant along:
+
+    with tenant_scope(tenant_id):
+        ...  # queries and inserts in here belong to tenant_id
+"""
+
+import contextvars
+import re
+from contextlib import contextmanager
+
+DEFAULT_TENANT = "default"
+TENANT_HEADER = "X-Tenant-ID"
+
+# Tenant ids end up in file names (TENANT_DATABASE=file), so keep them simple
+_VALID_TENANT = re.compile(r"^[a-z0-9][a-z0-9_-]{0,62}$")
+
+_tenant = contextvars.ContextVar("tenant_id", default=DEFAULT_TENANT)
+
+
+def normalize_tenant(tenant_id: str) -> str:
+    """Lower-case and validate a tenant id; raises ValueError if it is not usable."""
+    tenant_id = (tenant_id or DEFAULT_TENANT).strip().lower()
+    if not _VALID_TENANT.match(tenant_id):
+        raise ValueError("Tenant id must be 1-63 characters of a-z, 0-9, '-' or '_'")
+    return tenant_id
+
+
+def current_tenant() -> str:
+    return _tenant.get()
+
+
+def set_tenant(tenant_id: str):
+    """Bind the tenant for the rest of the current context (e.g. one request)."""
+    _tenant.set(normalize_tenant(tenant_id))
+
+
+@contextmanager
+def tenant_scope(tenant_id: str):
+    token = _tenant.set(normalize_tenant(tenant_id))
+    try:
+        yield
+    finally:
+        _tenant.reset(token)
@@ -0,0 +1,256 @@
+"""
+Topic Deduplication Index
+Per-project index of calendar topics for catching near-duplicates before they
+are inserted (and before the writer spends LLM calls on them).
+
+Each topic is normalized and split into character trigrams. A MinHash
+signature of the trigrams is cut into bands, and each band's hash is stored
+as a row in topic_bands (tenant_id, project_id, bucket, calendar_id). Topics sharing a
+bucket are candidates; candidates are confirmed with the exact trigram
+Jaccard similarity, so lookups touch only a handful of rows even in
+projects with thousands of calendar items.
+
+The index is maintained incrementally:
+- add() when calendar entries are inserted
+- remove() when calendar entries are deleted
+
+Calendar rows missing from the index (e.g. created before this table
+existed) are indexed on the next lookup for their project.
+"""
+
+import hashlib
+import os
+import re
+import zlib
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .models import ContentCalendar, TopicBand
+from .tenancy import current_tenant, tenant_scope
+
+# Trigram Jaccard similarity at or above which two topics are duplicates
+DUPLICATE_THRESHOLD = float(os.getenv("TOPIC_DUPLICATE_THRESHOLD", "0.8"))
+
+# 16 bands x 5 rows: pairs at 0.8 similarity share a bucket >99% of the time,
+# pairs at 0.3 only ~4% of the time
+NUM_BANDS = 16
+BAND_ROWS = 5
+
+# SQLite limits the number of bound parameters per statement
+_IN_CHUNK = 500
+
+_PRIME = np.uint64(4294967311)  # Smallest prime above 2**32
+_rng = np.random.RandomState(20240601)
+_PERM_A = _rng.randint(1, 2 ** 31, size=NUM_BANDS * BAND_ROWS).astype(np.uint64)
+_PERM_B = _rng.randint(0, 2 ** 31, size=NUM_BANDS * BAND_ROWS).astype(np.uint64)
+
+
+def normalize(topic: str) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", (topic or "").lower()).strip()
+
+
+def shingles(topic: str) -> set:
+    text = f" {normalize(topic)} "
+    return {text[i:i + 3] for i in range(len(text) - 2)} or {text}
+
+
+def similarity(a: str, b: str) -> float:
+    """Exact Jaccard similarity of two topics' trigram sets."""
+    sa, sb = shingles(a), shingles(b)
+    return len(sa & sb) / len(sa | sb) if sa or sb else 1.0
+
+
+def buckets(topic: str) -> list:
+    """LSH bucket ids (one per band) of a topic's MinHash signature."""
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles(topic)), dtype=np.uint64)
+    signature = ((np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _PRIME).min(axis=1)
+    result = []
+    for band in range(NUM_BANDS):
+        rows = signature[band * BAND_ROWS:(band + 1) * BAND_ROWS].tobytes()
+        digest = hashlib.blake2b(rows, digest_size=7, person=band.to_bytes(2, "little")).digest()
+        result.append(int.from_bytes(digest, "little"))
+    return result
+
+
+def _chunks(values: list):
+    for start in range(0, len(values), _IN_CHUNK):
+        yield values[start:start + _IN_CHUNK]
+
+
+def add(db: Session, items: list):
+    """Index newly inserted ContentCalendar rows (ids must be assigned). The caller commits."""
+    db.add_all([
+        TopicBand(project_id=item.project_id, calendar_id=item.id, bucket=bucket)
+        for item in items
+        for bucket in buckets(item.topic)
+    ])
+
+
+def remove(db: Session, calendar_ids: list):
+    """Drop deleted calendar rows from the index. The caller commits."""
+    for chunk in _chunks(list(calendar_ids)):
+        db.query(TopicBand).filter(
+            TopicBand.tenant_id == current_tenant(), TopicBand.calendar_id.in_(chunk)
+        ).delete(synchronize_session=False)
+
+
+def ensure_indexed(db: Session, project_id: int) -> int:
+    """Index any calendar rows of the project that are missing from topic_bands."""
+    missing = db.query(ContentCalendar).outerjoin(
+        TopicBand, TopicBand.calendar_id == ContentCalendar.id
+    ).filter(
+        ContentCalendar.tenant_id == current_tenant(), ContentCalendar.project_id == project_id, TopicBand.id.is_(None)
+    ).all()
+    if missing:
+        add(db, missing)
+        db.flush()
+    return len(missing)
+
+
+def filter_duplicates(db: Session, project_id: int, items: list) -> tuple:
+    """
+    Split planned calendar entries (dicts with a "topic") into (unique, duplicates).
+    An entry is a duplicate if it matches an existing calendar item of the
+    project or an earlier entry of the same batch. Each duplicate is returned
+    as {"topic", "duplicate_of", "calendar_id", "similarity"}, where calendar_id
+    is None for duplicates within the batch.
+    """
+    ensure_indexed(db, project_id)
+    item_buckets = [buckets(item.get("topic", "")) for item in items]
+
+    # One indexed lookup for every bucket of the batch
+    by_bucket = {}
+    all_buckets = list({b for bs in item_buckets for b in bs})
+    for chunk in _chunks(all_buckets):
+        rows = db.query(TopicBand.bucket, TopicBand.calendar_id).filter(
+            TopicBand.tenant_id == current_tenant(), TopicBand.project_id == project_id, TopicBand.bucket.in_(chunk)
+        ).all()
+        for bucket, calendar_id in rows:
+            by_bucket.setdefault(bucket, set()).add(calendar_id)
+
+    candidate_ids = list({cid for ids in by_bucket.values() for cid in ids})
+    topics = {}
+    for chunk in _chunks(candidate_ids):
+        topics.update(db.query(ContentCalendar.id, ContentCalendar.topic).filter(ContentCalendar.id.in_(chunk)).all())
+
+    unique, duplicates = [], []
+    batch_buckets = {}
+    for item, bs in zip(items, item_buckets):
+        topic = item.get("topic", "")
+        match = _best_match(topic, {cid for b in bs for cid in by_bucket.get(b, ())}, topics)
+        if match is None:
+            earlier = {i for b in bs for i in batch_buckets.get(b, ())}
+            batch_match = _best_match(topic, earlier, {i: unique[i].get("topic", "") for i in earlier})
+            if batch_match is not None:
+                index, score = batch_match
+                duplicates.append({"topic": topic, "duplicate_of": unique[index].get("topic", ""),
+                                   "calendar_id": None, "similarity": score})
+                continue
+            for b in bs:
+                batch_buckets.setdefault(b, set()).add(len(unique))
+            unique.append(item)
+        else:
+            calendar_id, score = match
+            duplicates.append({"topic": topic, "duplicate_of": topics[calendar_id],
+                               "calendar_id": calendar_id, "similarity": score})
+    return unique, duplicates
+
+
+def _best_match(topic: str, candidates, topics: dict):
+    """(key, similarity) of the most similar candidate at or above the threshold, or None."""
+    best = None
+    for key in candidates:
+        if key not in topics:
+            continue
+        score = similarity(topic, topics[key])
+        if score >= DUPLICATE_THRESHOLD and (best is None or score > best[1]):
+            best = (key, round(score, 3))
+    return best
+
+
+def duplicate_groups(db: Session, project_id: int) -> list:
+    """
+    Groups of near-duplicate calendar items in a project. Items sharing a
+    bucket are compared only against the groups already seen in that bucket,
+    so heavily duplicated topics don't degrade into all-pairs comparisons.
+    """
+    ensure_indexed(db, project_id)
+    by_bucket = {}
+    for bucket, calendar_id in db.query(TopicBand.bucket, TopicBand.calendar_id).filter(
+        TopicBand.tenant_id == current_tenant(), TopicBand.project_id == project_id
+    ).order_by(TopicBand.calendar_id):
+        by_bucket.setdefault(bucket, []).append(calendar_id)
+
+    ids = list({cid for members in by_bucket.values() if len(members) > 1 for cid in members})
+    if not ids:
+        return []
+    items = {}
+    for chunk in _chunks(ids):
+        for row in db.query(ContentCalendar.id, ContentCalendar.topic, ContentCalendar.date,
+                            ContentCalendar.platform).filter(ContentCalendar.id.in_(chunk)):
+            items[row.id] = row
+
+    # Union-find over confirmed pairs
+    parent = {}
+
+    def find(x):
+        while parent.get(x, x) != x:
+            parent[x] = parent.get(parent[x], parent[x])
+            x = parent[x]
+        return x
+
+    best, compared = {}, {}
+    for members in by_bucket.values():
+        if len(members) < 2:
+            continue
+        roots = []
+        for cid in members:
+            if cid not in items:
+                continue
+            for root in roots:
+                if find(root) == find(cid):
+                    break
+                pair = (min(root, cid), max(root, cid))
+                if pair not in compared:
+                    compared[pair] = similarity(items[root].topic, items[cid].topic)
+                score = compared[pair]
+                if score >= DUPLICATE_THRESHOLD:
+                    parent[max(find(root), find(cid))] = min(find(root), find(cid))
+                    best[root] = max(best.get(root, 0), score)
+                    best[cid] = max(best.get(cid, 0), score)
+                    break
+            else:
+                roots.append(cid)
+
+    groups = {}
+    for cid in best:
+        groups.setdefault(find(cid), []).append(cid)
+    return [
+        {
+            "items": [
+                {"id": cid, "topic": items[cid].topic, "date": items[cid].date, "platform": items[cid].platform}
+                for cid in sorted(members)
+            ],
+            "similarity": round(max(best[cid] for cid in members), 3)
+        }
+        for _, members in sorted(groups.items())
+    ]
+
+
+if __name__ == "__main__":
+    from .db import SessionLocal, Base, engine, add_missing_columns
+
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    db = SessionLocal()
+    try:
+        projects = db.query(ContentCalendar.tenant_id, ContentCalendar.project_id).distinct().all()
+        indexed = 0
+        for tenant_id, project_id in projects:
+            with tenant_scope(tenant_id):
+                indexed += ensure_indexed(db, project_id)
+        db.commit()
+        print(f"[TopicIndex] Indexed {indexed} calendar items across {len(projects)} projects")
+    finally:
+        db.close()
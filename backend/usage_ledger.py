@@ -0,0 +1,150 @@
+"""
+LLM Usage Ledger
+Records every provider call made by AIClient (and cache hits that avoided a
+call) in the llm_usage table: provider, model, agent, project/calendar id,
+prompt/completion tokens, latency, cache hit, fallback depth and outcome.
+
+Project and calendar ids are attached through a context scope set by the
+Orchestrator and routes, so agents don't have to pass them around:
+
+    with usage_scope(project_id=project.id, calendar_id=calendar_item.id):
+        ...  # every AIClient call in here is attributed to this item
+
+summarize() aggregates token usage, estimated cost and latency per project,
+agent, provider or model with SQL.
+"""
+
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+
+from .db import SessionLocal
+from .models import LLMUsage
+
+# Approximate USD prices per 1M (prompt, completion) tokens, for cost estimates
+MODEL_PRICES = {
+    "gemini-1.5-flash": (0.075, 0.30),
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "command": (1.00, 2.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "claude-3-haiku-20240307": (0.25, 1.25),
+}
+
+_scope = contextvars.ContextVar("llm_usage_scope", default={})
+
+GROUP_COLUMNS = {
+    "project": LLMUsage.project_id,
+    "calendar": LLMUsage.calendar_id,
+    "agent": LLMUsage.agent,
+    "provider": LLMUsage.provider,
+    "model": LLMUsage.model,
+}
+
+
+@contextmanager
+def usage_scope(**fields):
+    """Attribute AIClient calls in this block to e.g. project_id, calendar_id or agent."""
+    token = _scope.set({**_scope.get(), **{k: v for k, v in fields.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def bind(**fields):
+    """Add fields to the current scope, e.g. a project id looked up inside a usage_scope block."""
+    _scope.set({**_scope.get(), **{k: v for k, v in fields.items() if v is not None}})
+
+
+def current_scope() -> dict:
+    return dict(_scope.get())
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return ((prompt_tokens or 0) * prompt_price + (completion_tokens or 0) * completion_price) / 1_000_000
+
+
+def record(provider: str = None, model: str = None, agent: str = None, prompt_tokens: int = None,
+           completion_tokens: int = None, latency_ms: int = None, cache_hit: bool = False,
+           fallback_depth: int = None, outcome: str = "success", error: str = None):
+    """Write one ledger row. Never raises: accounting must not break generation."""
+    scope = current_scope()
+    db = SessionLocal()
+    try:
+        db.add(LLMUsage(
+            created_at=datetime.utcnow(),
+            provider=provider,
+            model=model,
+            agent=agent or scope.get("agent"),
+            project_id=scope.get("project_id"),
+            calendar_id=scope.get("calendar_id"),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost_usd=estimate_cost(model, prompt_tokens, completion_tokens),
+            latency_ms=latency_ms,
+            cache_hit=cache_hit,
+            fallback_depth=fallback_depth,
+            outcome=outcome,
+            error=(error or "")[:500] or None
+        ))
+        db.commit()
+    except Exception as e:
+        print(f"[UsageLedger] ✗ Failed to record usage: {e}")
+    finally:
+        db.close()
+
+
+def summarize(db: Session, group_by: str = "agent", project_id: int = None, tenant_id: str = None) -> list:
+    """Aggregate calls, tokens, cost and latency per group (optionally within one tenant or project)."""
+    column = GROUP_COLUMNS[group_by]
+    query = db.query(
+        column.label("key"),
+        func.count(LLMUsage.id).label("calls"),
+        func.sum(case((LLMUsage.cache_hit.is_(True), 1), else_=0)).label("cache_hits"),
+        func.sum(case((LLMUsage.outcome != "success", 1), else_=0)).label("errors"),
+        func.sum(LLMUsage.prompt_tokens).label("prompt_tokens"),
+        func.sum(LLMUsage.completion_tokens).label("completion_tokens"),
+        func.sum(LLMUsage.cost_usd).label("cost_usd"),
+        func.avg(LLMUsage.latency_ms).label("avg_latency_ms"),
+        func.max(LLMUsage.latency_ms).label("max_latency_ms"),
+    )
+    if tenant_id is not None:
+        query = query.filter(LLMUsage.tenant_id == tenant_id)
+    if project_id is not None:
+        query = query.filter(LLMUsage.project_id == project_id)
+
+    rows = query.group_by(column).order_by(func.sum(LLMUsage.cost_usd).desc()).all()
+    return [
+        {
+            group_by: row.key,
+            "calls": row.calls,
+            "cache_hits": row.cache_hits or 0,
+            "errors": row.errors or 0,
+            "prompt_tokens": row.prompt_tokens or 0,
+            "completion_tokens": row.completion_tokens or 0,
+            "cost_usd": round(row.cost_usd or 0.0, 6),
+            "avg_latency_ms": round(row.avg_latency_ms or 0.0, 1),
+            "max_latency_ms": row.max_latency_ms or 0
+        }
+        for row in rows
+    ]
+
+
+def recent_latencies(provider: str, limit: int = 200) -> list:
+    """Latencies (ms) of the provider's latest successful calls, newest first. Never raises."""
+    db = SessionLocal()
+    try:
+        rows = db.query(LLMUsage.latency_ms).filter(
+            LLMUsage.provider == provider, LLMUsage.outcome == "success",
+            LLMUsage.cache_hit.isnot(True), LLMUsage.latency_ms.isnot(None)
+        ).order_by(LLMUsage.id.desc()).limit(limit).all()
+        return [row.latency_ms for row in rows]
+    except Exception as e:
+        print(f"[UsageLedger] ✗ Failed to read latencies: {e}")
+        return []
+    finally:
+        db.close()
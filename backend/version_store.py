@@ -0,0 +1,308 @@
+"""
+Content Version Storage
+Keeps the latest ContentVersion body of every calendar item in full and stores
+older versions as compressed reverse deltas against the next newer version.
+
+Regenerating a post usually produces a near-copy of the previous draft, so a
+line-level delta is a fraction of the full text. If a rewrite changes too much
+for the delta to pay off, the version is stored as zlib-compressed text instead.
+
+Bodies are rebuilt transparently by walking from the latest version backwards:
+
+    bodies = reconstruct_bodies(versions)   # {version_id: body}
+
+Large listings use iter_versions(), which streams rows in batches and decodes
+bodies on the fly while holding only one body per calendar item.
+
+Existing databases can be compacted with:
+
+    python -m backend.version_store
+
+and the memory use of listings measured with:
+
+    python -m backend.version_store bench
+"""
+
+import difflib
+import json
+import zlib
+
+from sqlalchemy.orm import Session, undefer
+
+from .models import ContentVersion
+from .tenancy import current_tenant
+
+FULL = "full"
+DELTA = "delta"
+ZLIB = "zlib"
+
+# Rows fetched per round trip when streaming listings
+STREAM_BATCH = 500
+
+
+def encode_delta(target: str, base: str) -> bytes:
+    """
+    Encode `target` as a compressed line-level delta against `base`.
+    The delta is a JSON list where [i1, i2] copies base lines i1:i2 and a
+    string inserts new text.
+    """
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, base_lines, target_lines, autojunk=False)
+
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(target_lines[j1:j2]))
+    return zlib.compress(json.dumps(ops, separators=(",", ":")).encode("utf-8"), 9)
+
+
+def apply_delta(base: str, delta: bytes) -> str:
+    """Rebuild a body from its newer `base` and a delta from encode_delta()."""
+    base_lines = base.splitlines(keepends=True)
+    ops = json.loads(zlib.decompress(delta).decode("utf-8"))
+    parts = []
+    for op in ops:
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(base_lines[op[0]:op[1]])
+    return "".join(parts)
+
+
+def _compress_against(version: ContentVersion, body: str, newer_body: str):
+    """Store an older version's body in whichever encoding is smaller."""
+    delta = encode_delta(body, newer_body)
+    packed = zlib.compress(body.encode("utf-8"), 9)
+    if len(delta) <= len(packed):
+        version.body_delta, version.body_encoding = delta, DELTA
+    else:
+        version.body_delta, version.body_encoding = packed, ZLIB
+    version.body = None
+
+
+def _newest_first(versions):
+    return sorted(versions, key=lambda v: (v.version_number or 0, v.id or 0), reverse=True)
+
+
+def reconstruct_bodies(versions) -> dict:
+    """
+    Rebuild full bodies for a calendar item's versions.
+    `versions` must contain every version newer than the oldest one requested,
+    since each delta is decoded against the next newer body.
+    """
+    bodies = {}
+    newer_body = None
+    for version in _newest_first(versions):
+        body = _decode(version, newer_body)
+        bodies[version.id] = body
+        newer_body = body
+    return bodies
+
+
+def _decode(version, newer_body: str) -> str:
+    """One version's body, given the body of the next newer version of its calendar item."""
+    encoding = version.body_encoding or FULL
+    if encoding == FULL:
+        return version.body or ""
+    if encoding == ZLIB:
+        return zlib.decompress(version.body_delta).decode("utf-8")
+    if encoding == DELTA:
+        if newer_body is None:
+            raise ValueError(f"Version {version.id} is a delta but has no newer version to decode against")
+        return apply_delta(newer_body, version.body_delta)
+    raise ValueError(f"Unknown body encoding '{encoding}' on version {version.id}")
+
+
+def iter_versions(db: Session, columns: list, *filters, include_body: bool = False, batch_size: int = STREAM_BATCH):
+    """
+    Stream versions matching `filters` as dicts of `columns` (ORM column
+    attributes), ordered by calendar item and newest version first.
+    Rows are fetched `batch_size` at a time; with `include_body`, each body is
+    decoded against the previous row's and added as "body", so memory stays
+    flat however many versions match.
+    """
+    names = [column.key for column in columns]
+    selected = list(columns) + [ContentVersion.calendar_id, ContentVersion.id]
+    if include_body:
+        selected += [ContentVersion.body, ContentVersion.body_delta, ContentVersion.body_encoding]
+    query = db.query(*selected).filter(*filters).order_by(
+        ContentVersion.calendar_id, ContentVersion.version_number.desc(), ContentVersion.id.desc()
+    ).yield_per(batch_size)
+
+    calendar_id, newer_body = None, None
+    for row in query:
+        item = dict(zip(names, row))
+        if include_body:
+            if row.calendar_id != calendar_id:
+                calendar_id, newer_body = row.calendar_id, None
+            newer_body = item["body"] = _decode(row, newer_body)
+        yield item
+
+
+def add_version(db: Session, version: ContentVersion):
+    """
+    Add a new version and demote the previous latest version to a delta.
+    Versions saved before compaction are all stored in full; each of those is
+    encoded against its own next newer version. The caller commits the session.
+    """
+    previous = db.query(ContentVersion).options(undefer(ContentVersion.body)).filter(
+        ContentVersion.tenant_id == current_tenant(), ContentVersion.calendar_id == version.calendar_id,
+        (ContentVersion.body_encoding == FULL) | (ContentVersion.body_encoding.is_(None))
+    ).all()
+
+    if len(previous) > 1:
+        history = _newest_first(
+            db.query(ContentVersion).options(
+                undefer(ContentVersion.body), undefer(ContentVersion.body_delta)
+            ).filter(
+                ContentVersion.tenant_id == current_tenant(), ContentVersion.calendar_id == version.calendar_id
+            ).all()
+        )
+        bodies = reconstruct_bodies(history)
+        newer_body = version.body or ""
+        for old in history:
+            if (old.body_encoding or FULL) == FULL:
+                _compress_against(old, bodies[old.id], newer_body)
+            newer_body = bodies[old.id]
+    else:
+        for old in previous:
+            _compress_against(old, old.body or "", version.body or "")
+
+    db.add(version)
+    return version
+
+
+def compact(db: Session, calendar_id: int = None) -> dict:
+    """
+    Re-encode stored versions so only the latest of each calendar item is
+    kept in full. Safe to run repeatedly; used to migrate existing databases.
+    """
+    query = db.query(ContentVersion.calendar_id).distinct()
+    if calendar_id is not None:
+        query = query.filter(ContentVersion.calendar_id == calendar_id)
+    calendar_ids = [row[0] for row in query.all()]
+
+    stats = {"calendars": 0, "versions": 0, "bytes_before": 0, "bytes_after": 0}
+    for cid in calendar_ids:
+        versions = _newest_first(
+            db.query(ContentVersion).options(
+                undefer(ContentVersion.body), undefer(ContentVersion.body_delta)
+            ).filter(ContentVersion.calendar_id == cid).all()
+        )
+        bodies = reconstruct_bodies(versions)
+
+        for version in versions:
+            stats["bytes_before"] += len(version.body_delta or b"") + len((version.body or "").encode("utf-8"))
+
+        latest = versions[0]
+        latest.body, latest.body_delta, latest.body_encoding = bodies[latest.id], None, FULL
+        for newer, older in zip(versions, versions[1:]):
+            _compress_against(older, bodies[older.id], bodies[newer.id])
+
+        for version in versions:
+            stats["bytes_after"] += len(version.body_delta or b"") + len((version.body or "").encode("utf-8"))
+
+        db.commit()
+        stats["calendars"] += 1
+        stats["versions"] += len(versions)
+
+    return stats
+
+
+def _benchmark_listing(path: str, mode: str, queue):
+    """Child process: list every version in `path` and report the RSS growth (KB)."""
+    import resource
+    from sqlalchemy import create_engine
+
+    from .serialization import json_array
+
+    bench_engine = create_engine(f"sqlite:///{path}")
+    db = Session(bind=bench_engine)
+    columns = [ContentVersion.id, ContentVersion.calendar_id, ContentVersion.title, ContentVersion.seo_score,
+               ContentVersion.version_number]
+    db.query(ContentVersion.id).first()  # Connect and import everything before the baseline
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    size = 0
+    if mode == "stream":
+        for chunk in json_array(iter_versions(db, columns, include_body=True)):
+            size += len(chunk)
+    else:
+        # What a list endpoint did before streaming: load all rows, rebuild all bodies, encode at once
+        rows = db.query(*columns, ContentVersion.body, ContentVersion.body_delta, ContentVersion.body_encoding).all()
+        bodies = reconstruct_bodies(rows)
+        versions = [dict(zip([c.key for c in columns], row), body=bodies[row.id]) for row in rows]
+        size = len(b"".join(json_array(versions)))
+    queue.put((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before, size))
+    db.close()
+
+
+def benchmark(sizes=(1000, 3000, 6000), versions_per_item: int = 10):
+    """Peak RSS growth of listing N versions with bodies: load-all vs iter_versions()."""
+    import multiprocessing
+    import random
+    import tempfile
+    from pathlib import Path
+    from sqlalchemy import create_engine
+
+    from .db import Base
+    from .models import Project, ContentCalendar
+
+    context = multiprocessing.get_context("spawn")
+    words = "brand audience growth content strategy campaign launch story insight community".split()
+    random.seed(7)
+    print(f"{'versions':>9} {'payload MB':>11} {'load-all RSS MB':>16} {'streamed RSS MB':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for total in sizes:
+            path = str(Path(tmp) / f"bench_{total}.sqlite")
+            bench_engine = create_engine(f"sqlite:///{path}")
+            Base.metadata.create_all(bind=bench_engine)
+            db = Session(bind=bench_engine)
+            project = Project(niche="bench", audience="bench", tone="Professional", goals="bench")
+            db.add(project)
+            db.flush()
+            for _ in range(total // versions_per_item):
+                item = ContentCalendar(project_id=project.id, platform="Blog", topic="Benchmark topic")
+                db.add(item)
+                db.flush()
+                lines = [" ".join(random.choices(words, k=12)) for _ in range(60)]
+                for number in range(1, versions_per_item + 1):
+                    lines[random.randrange(len(lines))] = " ".join(random.choices(words, k=12))
+                    add_version(db, ContentVersion(calendar_id=item.id, title="Draft", body="\n".join(lines),
+                                                   version_number=number))
+                    db.flush()
+                db.commit()
+            db.close()
+            bench_engine.dispose()
+
+            results = {}
+            for mode in ("load", "stream"):
+                queue = context.Queue()
+                child = context.Process(target=_benchmark_listing, args=(path, mode, queue))
+                child.start()
+                results[mode] = queue.get()
+                child.join()
+            print(f"{total:>9} {results['stream'][1] / 1e6:>11.1f} {results['load'][0] / 1024:>16.1f} "
+                  f"{results['stream'][0] / 1024:>16.1f}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:2] == ["bench"]:
+        benchmark()
+        sys.exit()
+
+    from .db import SessionLocal, Base, engine, add_missing_columns
+
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    db = SessionLocal()
+    try:
+        result = compact(db)
+        print(f"[VersionStore] Compacted {result['versions']} versions across {result['calendars']} calendar items")
+        print(f"[VersionStore] Body storage: {result['bytes_before']} -> {result['bytes_after']} bytes")
+    finally:
+        db.close()
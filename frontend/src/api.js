@@ -7,4 +7,26 @@ const api = axios.create({
     },
 });
 
+// Scope every request to the signed-in user's workspace (tenant)
+api.interceptors.request.use((config) => {
+    const user = JSON.parse(localStorage.getItem('user') || 'null');
+    if (user?.tenant) {
+        config.headers['X-Tenant-ID'] = user.tenant;
+    }
+    return config;
+});
+
+// Live project events (research.completed, calendar.updated, version.created).
+// EventSource cannot send headers, so the tenant goes in the query string.
+// Returns the EventSource; call close() on it to unsubscribe.
+export const subscribeToProject = (projectId, handlers) => {
+    const user = JSON.parse(localStorage.getItem('user') || 'null');
+    const params = user?.tenant ? `?tenant=${encodeURIComponent(user.tenant)}` : '';
+    const source = new EventSource(`${api.defaults.baseURL}/projects/${projectId}/events${params}`);
+    Object.entries(handlers).forEach(([type, handler]) => {
+        source.addEventListener(type, (message) => handler(JSON.parse(message.data)));
+    });
+    return source;
+};
+
 export default api;
@@ -1,5 +1,5 @@
-import React, { useState, useEffect } from 'react';
-import api from '../api';
+import React, { useState, useEffect, useRef } from 'react';
+import api, { subscribeToProject } from '../api';
 import { Calendar as CalendarIcon, Loader2, FileEdit, Sparkles, Clock, ArrowRight, CheckCircle2, Twitter, Linkedin, FileText, Instagram, Download, FileDown, LayoutTemplate, X, Plus, Check } from 'lucide-react';
 import { Link, useNavigate } from 'react-router-dom';
 
@@ -36,6 +36,7 @@ const CalendarView = () => {
     const [appliedTemplates, setAppliedTemplates] = useState([]);
     const projectId = localStorage.getItem('currentProjectId');
     const navigate = useNavigate();
+    const eventsRef = useRef(null);
 
     useEffect(() => {
         if (projectId) {
@@ -43,6 +44,16 @@ const CalendarView = () => {
         }
     }, [projectId]);
 
+    // Refresh when research or templates change the calendar, instead of re-fetching after every action
+    useEffect(() => {
+        if (!projectId) return;
+        const source = subscribeToProject(projectId, {
+            'calendar.updated': () => fetchCalendar(),
+        });
+        eventsRef.current = source;
+        return () => source.close();
+    }, [projectId]);
+
     const fetchCalendar = async () => {
         try {
             const res = await api.get(`/projects/${projectId}/calendar`);
@@ -75,13 +86,14 @@ const CalendarView = () => {
                 topics: template.topics,
                 platform: template.platform
             });
+            // Without a live event stream, fetch the new items directly
+            if (eventsRef.current?.readyState !== EventSource.OPEN) {
+                await fetchCalendar();
+            }
 
             // Mark as applied
             setAppliedTemplates([...appliedTemplates, template.id]);
 
-            // Refresh calendar
-            await fetchCalendar();
-
             // Show success feedback briefly then close
             setTimeout(() => {
                 setShowTemplates(false);
@@ -1,8 +1,13 @@
-import React, { useState, useEffect } from 'react';
-import api from '../api';
+import React, { useState, useEffect, useRef } from 'react';
+import axios from 'axios';
+import api, { subscribeToProject } from '../api';
 import { useParams, Link } from 'react-router-dom';
 import { ArrowLeft, CheckCircle, AlertCircle, BarChart3, Type, Heart, RefreshCw, Copy, Check, Sparkles, Hash, Repeat, ChevronDown } from 'lucide-react';
 
+// Give up on a regeneration after this long; the server stops a little earlier
+// and returns the best draft it has by then
+const GENERATION_TIMEOUT_SECONDS = 120;
+
 const ContentEditor = () => {
     const { calendarId } = useParams();
     const [versions, setVersions] = useState([]);
@@ -18,11 +23,28 @@ const ContentEditor = () => {
     const [repurposedContent, setRepurposedContent] = useState(null);
     const [repurposing, setRepurposing] = useState(false);
     const [copiedHashtags, setCopiedHashtags] = useState(false);
+    const generationRef = useRef(null);
+
+    // Leaving the editor aborts a running regeneration, which stops it on the server
+    useEffect(() => () => generationRef.current?.abort(), []);
 
     useEffect(() => {
         fetchVersions();
     }, [calendarId]);
 
+    // New versions (from this page, the calendar's Auto-Write or another tab) arrive as events
+    const eventsRef = useRef(null);
+    useEffect(() => {
+        const projectId = localStorage.getItem('currentProjectId');
+        if (!projectId) return;
+        eventsRef.current = subscribeToProject(projectId, {
+            'version.created': (event) => {
+                if (String(event.data.calendar_id) === String(calendarId)) fetchVersions();
+            },
+        });
+        return () => eventsRef.current.close();
+    }, [calendarId]);
+
     const fetchVersions = async () => {
         try {
             const res = await api.get(`/content/${calendarId}/versions`);
@@ -39,10 +61,20 @@ const ContentEditor = () => {
 
     const handleRegenerate = async () => {
         setRegenerating(true);
+        const controller = new AbortController();
+        generationRef.current = controller;
         try {
-            await api.post(`/content/${calendarId}/write`);
-            await fetchVersions();
+            await api.post(`/content/${calendarId}/write`, null, {
+                signal: controller.signal,
+                timeout: GENERATION_TIMEOUT_SECONDS * 1000,
+                headers: { 'X-Request-Timeout': GENERATION_TIMEOUT_SECONDS - 10 },
+            });
+            // Without a live event stream, fetch the new version directly
+            if (eventsRef.current?.readyState !== EventSource.OPEN) {
+                await fetchVersions();
+            }
         } catch (error) {
+            if (axios.isCancel(error)) return;
             console.error("Failed to regenerate content", error);
             alert("Failed to regenerate content. Please try again.");
         } finally {
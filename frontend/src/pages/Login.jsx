@@ -31,6 +31,8 @@ const Login = () => {
             const user = {
                 name: formData.name || formData.email.split('@')[0],
                 email: formData.email,
+                // Workspace shared by everyone signing in with the same email domain
+                tenant: formData.email.split('@')[1]?.toLowerCase().replace(/[^a-z0-9_-]+/g, '-'),
                 isLoggedIn: true
             };
             localStorage.setItem('user', JSON.stringify(user));
@@ -0,0 +1,26 @@
+from sqlalchemy import create_engine, inspect, text
+
+from backend.db import add_missing_columns
+
+
+def test_add_missing_columns_creates_tenant_indexes(tmp_path):
+    # A database from before tenancy: no tenant_id columns, no tenant indexes
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.sqlite'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE generation_iterations (id INTEGER PRIMARY KEY, version_id INTEGER, "
+                          "calendar_id INTEGER, iteration INTEGER)"))
+        conn.execute(text("CREATE TABLE topic_bands (id INTEGER PRIMARY KEY, project_id INTEGER, "
+                          "calendar_id INTEGER, bucket INTEGER)"))
+        conn.execute(text("INSERT INTO topic_bands (project_id, calendar_id, bucket) VALUES (1, 1, 42)"))
+
+    add_missing_columns(engine)
+
+    inspector = inspect(engine)
+    indexes = {
+        table: {index["name"]: index["column_names"] for index in inspector.get_indexes(table)}
+        for table in ("generation_iterations", "topic_bands")
+    }
+    assert indexes["generation_iterations"]["ix_generation_iterations_tenant_version"] == ["tenant_id", "version_id"]
+    assert indexes["topic_bands"]["ix_topic_bands_tenant_project_bucket"] == ["tenant_id", "project_id", "bucket"]
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT tenant_id FROM topic_bands")).scalar() == "default"
@@ -0,0 +1,45 @@
+import asyncio
+import threading
+
+import pytest
+
+from backend import events
+
+
+@pytest.fixture
+def bus(tmp_path, monkeypatch):
+    monkeypatch.setattr(events, "EVENTS_POLL_INTERVAL", 0.02)
+    bus = events.SQLiteEventBus(str(tmp_path / "events.sqlite"))
+    yield bus
+    bus.close()
+
+
+def _pollers():
+    return [t for t in threading.enumerate() if t.name == "events-poller" and t.is_alive()]
+
+
+def test_new_subscriber_gets_no_replay(bus):
+    async def scenario():
+        # Published before this process had any subscriber (e.g. by another worker)
+        bus.publish("default", 1, events.VERSION_CREATED, {"version_id": 1})
+        subscription = bus.subscribe("default", 1)
+        bus.publish("default", 1, events.VERSION_CREATED, {"version_id": 2})
+        first = await asyncio.wait_for(subscription.get(), timeout=2)
+        assert first["data"] == {"version_id": 2}
+        await asyncio.sleep(0.1)
+        assert subscription.queue.empty()
+
+    asyncio.run(scenario())
+
+
+def test_close_stops_poller(bus):
+    async def scenario():
+        subscription = bus.subscribe("default", 1)
+        assert _pollers()
+        bus.close()
+        assert await asyncio.wait_for(subscription.get(), timeout=2) == events.CLOSED
+
+    asyncio.run(scenario())
+    for thread in _pollers():
+        thread.join(timeout=1)
+    assert not _pollers()
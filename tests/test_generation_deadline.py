@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import deadlines
+from backend.agents.writer_agent import WriterAgent
+from backend.db import Base
+from backend.models import Project, ContentCalendar, ContentVersion, GenerationIteration
+from backend.orchestrator import Orchestrator
+
+
+class _CancelledMidDraft:
+    """AIClient stand-in: the client disconnects while the provider call is running."""
+    providers = [{"name": "Remote"}]
+
+    def generate(self, *args, **kwargs):
+        deadlines.current().cancel("cancelled by client disconnect")
+        return None
+
+
+@pytest.fixture
+def orchestrator():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    sessions = sessionmaker(bind=engine)
+    with sessions() as db:
+        db.add(Project(id=1, niche="coffee", audience="students", tone="friendly", goals="awareness"))
+        db.add(ContentCalendar(id=1, project_id=1, platform="Blog", date="2026-01-01", topic="Brewing at home"))
+        db.commit()
+
+    orchestrator = Orchestrator.__new__(Orchestrator)
+    orchestrator.writer_agent = WriterAgent.__new__(WriterAgent)
+    orchestrator.writer_agent.name = "WriterAgent"
+    orchestrator.writer_agent.ai_client = _CancelledMidDraft()
+    orchestrator.get_db = sessions
+    orchestrator.sessions = sessions
+    return orchestrator
+
+
+def test_cancelled_first_draft_saves_nothing(orchestrator):
+    deadline = deadlines.Deadline()
+    with pytest.raises(deadlines.DeadlineExceeded):
+        orchestrator.generate_content(1, deadline=deadline)
+
+    assert deadline.cancelled
+    with orchestrator.sessions() as db:
+        assert db.query(ContentVersion).count() == 0
+        assert db.query(GenerationIteration).count() == 0
+
+
+def test_writer_skips_mock_content_once_out_of_time(orchestrator):
+    with deadlines.deadline_scope(deadlines.Deadline()):
+        assert orchestrator.writer_agent.run("Brewing at home", "friendly") is None
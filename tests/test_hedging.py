@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+
+from backend.agents import hedging
+from backend.agents.hedging import HedgeBudget, LatencyStats
+
+
+def test_budget_starts_with_the_burst():
+    budget = HedgeBudget(ratio=0.1, burst=3)
+    assert [budget.try_spend() for _ in range(4)] == [True, True, True, False]
+
+
+def test_calls_earn_hedges_at_the_ratio():
+    budget = HedgeBudget(ratio=0.25, burst=2)
+    budget.try_spend(), budget.try_spend()
+    for _ in range(3):
+        budget.earn()
+    assert not budget.try_spend()
+    budget.earn()
+    assert budget.try_spend() and not budget.try_spend()
+
+
+def test_saved_hedges_are_capped_by_the_burst():
+    budget = HedgeBudget(ratio=1, burst=2)
+    for _ in range(10):
+        budget.earn()
+    assert [budget.try_spend() for _ in range(3)] == [True, True, False]
+
+
+def test_zero_ratio_disables_hedging():
+    assert not HedgeBudget(ratio=0).enabled
+    assert HedgeBudget(ratio=0.1).enabled
+
+
+def test_concurrent_spends_never_exceed_the_budget():
+    budget = HedgeBudget(ratio=0.1, burst=50)
+    spent = []
+    start = threading.Barrier(8)
+
+    def spend():
+        start.wait()
+        spent.extend(ok for ok in (budget.try_spend() for _ in range(20)) if ok)
+
+    threads = [threading.Thread(target=spend) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(spent) == 50
+
+
+def test_hedge_delay_is_the_latency_percentile(monkeypatch):
+    monkeypatch.setattr(hedging.usage_ledger, "recent_latencies", lambda provider, limit: [])
+    stats = LatencyStats()
+    assert stats.hedge_delay("Groq") == hedging.HEDGE_DEFAULT_DELAY
+    for ms in range(1, 101):
+        stats.observe("Groq", ms / 100)
+    assert stats.hedge_delay("Groq") == pytest.approx(0.901)
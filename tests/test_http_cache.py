@@ -0,0 +1,72 @@
+import pytest
+from fastapi import FastAPI, Header, Request, Response
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import http_cache
+from backend.db import Base
+from backend.models import Project
+from backend.tenancy import tenant_scope, DEFAULT_TENANT
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/projects/{project_id}")
+    def read(project_id: int, request: Request, response: Response, x_tenant_id: str = Header(DEFAULT_TENANT)):
+        with tenant_scope(x_tenant_id):
+            etag = http_cache.make_etag("project", project_id, "2026-01-01T00:00:00")
+        return http_cache.conditional(request, response, etag) or {"id": project_id}
+
+    return TestClient(app)
+
+
+def test_etag_includes_the_tenant():
+    with tenant_scope("acme"):
+        acme = http_cache.make_etag("project", 1)
+    with tenant_scope("globex"):
+        globex = http_cache.make_etag("project", 1)
+    assert acme != globex
+    assert acme.startswith('"') and acme.endswith('"')
+
+
+def test_revalidation_returns_304(client):
+    first = client.get("/projects/1")
+    assert first.status_code == 200 and first.json() == {"id": 1}
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == http_cache.CACHE_CONTROL
+
+    again = client.get("/projects/1", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["ETag"] == etag
+
+    weak_in_list = client.get("/projects/1", headers={"If-None-Match": f'"stale", W/{etag}'})
+    assert weak_in_list.status_code == 304
+
+
+def test_other_tenant_does_not_revalidate(client):
+    etag = client.get("/projects/1", headers={"X-Tenant-ID": "acme"}).headers["ETag"]
+    other = client.get("/projects/1", headers={"X-Tenant-ID": "globex", "If-None-Match": etag})
+    assert other.status_code == 200
+
+
+def test_row_version_changes_with_rows(db):
+    before = http_cache.row_version(db, Project, Project.tenant_id == DEFAULT_TENANT)
+    assert before[0] == 0
+    db.add(Project(niche="coffee"))
+    db.commit()
+    after = http_cache.row_version(db, Project, Project.tenant_id == DEFAULT_TENANT)
+    assert after[0] == 1 and after != before
+    with tenant_scope(DEFAULT_TENANT):
+        assert http_cache.make_etag("projects", *before) != http_cache.make_etag("projects", *after)
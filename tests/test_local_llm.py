@@ -0,0 +1,116 @@
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from backend.agents import ai_client
+from backend.agents.local_llm import LocalLLM, LocalBusy
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    """OpenAI-compatible stand-in: chat answers "#local" (or fixed JSON), completions echo each prompt."""
+    calls = []
+    delay = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.calls.append((self.path, body))
+        time.sleep(self.delay)
+        if self.path.endswith("/chat/completions"):
+            text = body["messages"][-1]["content"]
+            answer = '{"fixed": true}' if "malformed JSON" in text else "#local"
+            response = {"choices": [{"message": {"content": answer}}],
+                        "usage": {"prompt_tokens": 3, "completion_tokens": 2}}
+        else:
+            response = {"choices": [{"index": i, "text": f"done:{p}"} for i, p in enumerate(body["prompt"])]}
+        data = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def server():
+    _StandIn.calls, _StandIn.delay = [], 0.0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}/v1"
+    httpd.shutdown()
+
+
+@pytest.fixture
+def client(server, monkeypatch):
+    monkeypatch.setattr(ai_client.usage_ledger, "record", lambda **kwargs: None)
+    client = ai_client.AIClient.__new__(ai_client.AIClient)
+    client.mode = "live"
+    client._call_pool = ai_client._new_call_pool()
+    client.latency = type("Latency", (), {"observe": lambda *args: None})()
+    remote_calls = []
+
+    def remote(c, model, prompt, system_prompt, temperature, max_tokens, timeout=None):
+        remote_calls.append(prompt)
+        return ('{"broken": ' if "JSON" in (system_prompt or "") else "remote"), {}
+
+    client.providers = [
+        {"name": "Remote", "model": "remote", "client": None, "generate": remote},
+        {"name": "Local", "model": "local", "client": LocalLLM(base_url=server), "generate": client._local_generate,
+         "local": True},
+    ]
+    client.remote_calls = remote_calls
+    return client
+
+
+def test_route_order(client):
+    assert [p["name"] for p in client.route(ai_client.HASHTAGS)] == ["Local", "Remote"]
+    assert [p["name"] for p in client.route(ai_client.draft_task("Twitter"))] == ["Local", "Remote"]
+    assert [p["name"] for p in client.route(ai_client.draft_task("Blog"))] == ["Remote", "Local"]
+    assert [p["name"] for p in client.route(None)] == ["Remote", "Local"]
+
+
+def test_cheap_tasks_go_local(client):
+    assert client.generate("tags please", task=ai_client.HASHTAGS) == "#local"
+    assert client.generate("an essay", task=ai_client.LONG_FORM) == "remote"
+    assert client.remote_calls == ["an essay"]
+
+
+def test_busy_local_model_falls_through_at_once(client, server):
+    local = LocalLLM(base_url=server, concurrency=1)
+    client.providers[1]["client"] = local
+    _StandIn.delay = 1.0
+    holder = threading.Thread(target=local.generate, args=("slow", None, 0.5, 10))
+    holder.start()
+    time.sleep(0.2)
+    start = time.monotonic()
+    assert client.generate("tags", task=ai_client.HASHTAGS) == "remote"
+    assert time.monotonic() - start < 0.5
+    with pytest.raises(LocalBusy):
+        local.generate("again", None, 0.5, 10)
+    holder.join()
+
+
+def test_batching_sends_one_request(server):
+    local = LocalLLM(base_url=server, batch_size=4, batch_window=0.5)
+    results = [None] * 4
+
+    def call(i):
+        results[i] = local.generate(f"p{i}", None, 0.5, 10)[0]
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["done:p0", "done:p1", "done:p2", "done:p3"]
+    assert len([path for path, _ in _StandIn.calls if path.endswith("/v1/completions")]) == 1
+
+
+def test_malformed_json_is_repaired_locally(client):
+    assert client.generate_json("give me json") == {"fixed": True}
+    repairs = [body for path, body in _StandIn.calls if "malformed JSON" in body["messages"][-1]["content"]]
+    assert len(repairs) == 1 and repairs[0]["temperature"] == 0.0
@@ -0,0 +1,33 @@
+import pytest
+
+from backend.orchestrator import LoopPolicy
+
+
+def test_defaults_come_from_the_environment(monkeypatch):
+    monkeypatch.setenv("GENERATION_MAX_ITERATIONS", "5")
+    monkeypatch.setenv("GENERATION_QUALITY_THRESHOLD", "80")
+    policy = LoopPolicy()
+    assert policy.max_iterations == 5 and policy.quality_threshold == 80
+    assert policy.patience == 1 and policy.time_budget == 0 and policy.token_budget == 0
+
+
+def test_explicit_zero_is_not_replaced_by_the_default(monkeypatch):
+    monkeypatch.setenv("GENERATION_MIN_IMPROVEMENT", "2")
+    monkeypatch.setenv("GENERATION_QUALITY_THRESHOLD", "70")
+    monkeypatch.setenv("GENERATION_TIME_BUDGET", "30")
+    policy = LoopPolicy(min_improvement=0, quality_threshold=0, time_budget=0)
+    assert policy.min_improvement == 0 and policy.quality_threshold == 0 and policy.time_budget == 0
+
+
+@pytest.mark.parametrize("options", [
+    {"max_iterations": 0},
+    {"patience": 0},
+    {"quality_threshold": -1},
+    {"quality_threshold": 101},
+    {"min_improvement": -0.5},
+    {"time_budget": -1},
+    {"token_budget": -100},
+])
+def test_out_of_range_options_are_rejected(options):
+    with pytest.raises(ValueError):
+        LoopPolicy(**options)
@@ -0,0 +1,33 @@
+import threading
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend import profiling
+
+
+def test_profiles_are_saved_off_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 1)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    save, saved_on = profiling.save, []
+
+    def recording_save(*args):
+        saved_on.append(threading.current_thread())
+        save(*args)
+
+    monkeypatch.setattr(profiling, "save", recording_save)
+
+    app = FastAPI()
+    loop_threads = []
+
+    @app.get("/ping")
+    async def ping():
+        loop_threads.append(threading.current_thread())
+        return {"ok": True}
+
+    app.add_middleware(profiling.ProfilingMiddleware)
+    assert TestClient(app).get("/ping").status_code == 200
+
+    assert len(saved_on) == 1 and saved_on[0] is not loop_threads[0]
+    profile, = profiling.list_profiles()
+    assert profile["path"] == "/ping" and profile["status"] == 200 and profile["reason"] == "sampled"
@@ -0,0 +1,40 @@
+import pytest
+
+from backend.agents import readability
+
+SAMPLES = [
+    "The cat sat on the mat. It was a sunny day and everyone was happy.",
+    "Content marketing helps small businesses reach customers online. "
+    "Start with a clear plan! Post regularly, measure results, and improve.",
+    "In today's fast-paced digital world, understanding your audience has become "
+    "more important than ever. Focus on relatable stories, local references and "
+    "value-first content that educates before it sells.",
+    "Hi. Go now. This sentence, however, is considerably longer than the two before it, and it keeps going.",
+    "Why do customers leave? They don't feel heard! Fix that: listen, respond quickly, and follow up within 24 hours.",
+]
+
+
+@pytest.mark.parametrize("text", ["", "   ", "!!! ..."])
+def test_empty_text_scores_zero(text):
+    result = readability.analyze(text)
+    assert result["flesch_reading_ease"] == 0.0
+    assert result["flesch_kincaid_grade"] == 0.0
+    assert result["words"] == 0
+
+
+def test_matches_textstat(monkeypatch):
+    textstat = pytest.importorskip("textstat")
+    pytest.importorskip("pyphen")
+    count_syllables = pytest.importorskip("textstat.backend.counts._count_syllables")
+    # cmudict needs a download; without it textstat counts every word with Pyphen, as we do
+    monkeypatch.setattr(count_syllables, "get_cmudict", lambda lang: None)
+    count_syllables.count_syllables.cache_clear()
+
+    for text, ours in zip(SAMPLES, readability.analyze_batch(SAMPLES)):
+        assert ours["flesch_reading_ease"] == pytest.approx(textstat.flesch_reading_ease(text), abs=0.5)
+        assert ours["flesch_kincaid_grade"] == pytest.approx(textstat.flesch_kincaid_grade(text), abs=0.5)
+
+
+def test_batch_matches_single_documents():
+    batch = readability.analyze_batch(SAMPLES + [""])
+    assert batch == [readability.analyze(text) for text in SAMPLES + [""]]
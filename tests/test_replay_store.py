@@ -0,0 +1,26 @@
+from backend.agents.replay_store import ReplayStore, request_key
+
+
+def test_key_ignores_dates_and_whitespace():
+    assert request_key("Write about  March 2026 on 2026-03-01", "sys", 0.7, 1500) == \
+        request_key("Write about May 2027\non 2027-05-02", "sys", 0.7, 1500)
+
+
+def test_key_includes_sampling_settings():
+    base = request_key("prompt", "sys", 0.7, 1500)
+    assert request_key("prompt", "sys", 0.70, 1500) == base
+    assert request_key("prompt", "sys", 0.0, 1500) != base
+    assert request_key("prompt", "sys", 0.7, 500) != base
+    assert request_key("prompt", "sys") != base
+
+
+def test_replay_matches_sampling_settings(tmp_path):
+    store = ReplayStore(str(tmp_path / "replay.sqlite"))
+    usage = {"prompt_tokens": 10, "completion_tokens": 5}
+    store.save("fix this", "Return JSON", 0.7, 1500, "draft", "Groq", "llama", 120, usage)
+    store.save("fix this", "Return JSON", 0.0, 500, '{"ok": true}', "Groq", "llama", 80, usage)
+
+    assert store.load("fix this", "Return JSON", 0.7, 1500)["response"] == "draft"
+    assert store.load("fix this", "Return JSON", 0.0, 500)["response"] == '{"ok": true}'
+    assert store.load("fix this", "Return JSON", 0.3, 500) is None
+    assert store.count() == 2
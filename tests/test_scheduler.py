@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from backend import deadlines, scheduler
+from backend.scheduler import FairScheduler, INTERACTIVE, BATCH, BACKGROUND
+
+
+def _single_slot() -> FairScheduler:
+    return FairScheduler("test", {INTERACTIVE: 1, BATCH: 1, BACKGROUND: 1}, capacity=1)
+
+
+def _queued(queue: FairScheduler) -> int:
+    return sum(stats["queued"] for stats in queue.metrics()["classes"].values())
+
+
+def _run_waiters(queue: FairScheduler, waiters: list) -> list:
+    """Queue (label, priority, tenant) waiters behind a held slot, in order; return the order they ran in."""
+    held = queue.acquire(BATCH, "holder")
+    order = []
+
+    def wait(label, priority, tenant):
+        with queue.slot(priority, tenant):
+            order.append(label)
+
+    threads = []
+    for label, priority, tenant in waiters:
+        thread = threading.Thread(target=wait, args=(label, priority, tenant))
+        thread.start()
+        threads.append(thread)
+        while _queued(queue) < len(threads):
+            time.sleep(0.005)
+    queue.release(held)
+    for thread in threads:
+        thread.join(timeout=5)
+    return order
+
+
+def test_higher_classes_run_first():
+    order = _run_waiters(_single_slot(), [
+        ("background", BACKGROUND, "a"), ("batch", BATCH, "a"), ("interactive", INTERACTIVE, "a"),
+    ])
+    assert order == ["interactive", "batch", "background"]
+
+
+def test_tenants_take_turns_within_a_class():
+    order = _run_waiters(_single_slot(), [
+        ("a1", BATCH, "a"), ("a2", BATCH, "a"), ("a3", BATCH, "a"), ("b1", BATCH, "b"),
+    ])
+    assert order == ["a1", "b1", "a2", "a3"]
+
+
+def test_reserved_slots_stay_free_for_interactive_work():
+    queue = FairScheduler("test", {INTERACTIVE: 4, BATCH: 4, BACKGROUND: 4}, capacity=4,
+                          reserve={BATCH: 2, BACKGROUND: 2})
+    batch = [queue.try_acquire(BATCH, "a") for _ in range(3)]
+    assert [ticket is not None for ticket in batch] == [True, True, False]
+    assert queue.try_acquire(BACKGROUND, "a") is None
+    assert queue.try_acquire(INTERACTIVE, "a") is not None
+    assert queue.try_acquire(INTERACTIVE, "a") is not None
+    assert queue.try_acquire(INTERACTIVE, "a") is None
+
+
+def test_acquire_gives_up_at_the_deadline():
+    queue = _single_slot()
+    queue.acquire(BATCH, "a")
+    start = time.monotonic()
+    with pytest.raises(deadlines.DeadlineExceeded):
+        queue.acquire(BATCH, "b", deadline=deadlines.Deadline(timeout=0.3))
+    assert 0.3 <= time.monotonic() - start < 0.3 + 2 * scheduler.POLL_SECONDS
+    stats = queue.metrics()["classes"][BATCH]
+    assert stats["queued"] == 0 and stats["abandoned"] == 1
+
+
+def test_acquire_wakes_on_cancellation():
+    queue = _single_slot()
+    queue.acquire(BATCH, "a")
+    deadline = deadlines.Deadline()
+    threading.Timer(0.1, deadline.cancel).start()
+    start = time.monotonic()
+    with pytest.raises(deadlines.DeadlineExceeded, match="cancelled"):
+        queue.acquire(BATCH, "b", deadline=deadline)
+    assert time.monotonic() - start < 0.1 + 2 * scheduler.POLL_SECONDS
+
+
+def test_acquire_timeout_raises_queue_timeout():
+    queue = _single_slot()
+    queue.acquire(INTERACTIVE, "a")
+    with pytest.raises(scheduler.QueueTimeout):
+        queue.acquire(INTERACTIVE, "a", deadline=deadlines.NO_DEADLINE, timeout=0.1)
+    assert _queued(queue) == 0
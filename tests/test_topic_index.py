@@ -0,0 +1,86 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import topic_index
+from backend.db import Base
+from backend.models import ContentCalendar, TopicBand
+
+BREWING = "10 tips for brewing coffee at home"
+BREWING_SPELLED = "Ten tips for brewing coffee at home"          # 0.816 similar to BREWING
+RITUALS_STUDENTS = "Morning coffee rituals for busy students"
+RITUALS_PARENTS = "Morning coffee rituals for busy parents"     # 0.756 similar to RITUALS_STUDENTS
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _add(db, project_id, *topics):
+    items = [ContentCalendar(project_id=project_id, platform="Blog", topic=topic) for topic in topics]
+    db.add_all(items)
+    db.flush()
+    topic_index.add(db, items)
+    db.flush()
+    return items
+
+
+def test_threshold_separates_near_duplicates():
+    assert topic_index.DUPLICATE_THRESHOLD == 0.8
+    assert topic_index.similarity(BREWING, BREWING_SPELLED) >= 0.8
+    assert topic_index.similarity(RITUALS_STUDENTS, RITUALS_PARENTS) < 0.8
+    assert topic_index.similarity("How to Brew: Coffee at Home", "how to brew coffee at home") == 1.0
+
+
+def test_near_duplicates_share_a_bucket():
+    assert set(topic_index.buckets(BREWING)) & set(topic_index.buckets(BREWING_SPELLED))
+    assert len(topic_index.buckets(BREWING)) == topic_index.NUM_BANDS
+
+
+def test_filter_duplicates_against_project_and_batch(db):
+    existing, = _add(db, 1, BREWING)
+    _add(db, 2, RITUALS_STUDENTS)  # Another project's topics are not duplicates
+
+    unique, duplicates = topic_index.filter_duplicates(db, 1, [
+        {"topic": BREWING_SPELLED},
+        {"topic": RITUALS_STUDENTS},
+        {"topic": RITUALS_PARENTS},
+        {"topic": RITUALS_STUDENTS + "!"},
+    ])
+
+    assert [item["topic"] for item in unique] == [RITUALS_STUDENTS, RITUALS_PARENTS]
+    assert duplicates == [
+        {"topic": BREWING_SPELLED, "duplicate_of": BREWING, "calendar_id": existing.id,
+         "similarity": round(topic_index.similarity(BREWING, BREWING_SPELLED), 3)},
+        {"topic": RITUALS_STUDENTS + "!", "duplicate_of": RITUALS_STUDENTS, "calendar_id": None, "similarity": 1.0},
+    ]
+
+
+def test_unindexed_rows_are_indexed_on_lookup(db):
+    db.add(ContentCalendar(project_id=1, platform="Blog", topic=BREWING))
+    db.flush()
+    assert db.query(TopicBand).count() == 0
+
+    _, duplicates = topic_index.filter_duplicates(db, 1, [{"topic": BREWING_SPELLED}])
+    assert len(duplicates) == 1
+    assert db.query(TopicBand).count() == topic_index.NUM_BANDS
+
+
+def test_duplicate_groups_merge_chains(db):
+    items = _add(db, 1, BREWING, BREWING_SPELLED, BREWING + " fast", RITUALS_STUDENTS, RITUALS_PARENTS)
+
+    groups = topic_index.duplicate_groups(db, 1)
+
+    assert [[item["id"] for item in group["items"]] for group in groups] == [[i.id for i in items[:3]]]
+    assert groups[0]["similarity"] == round(topic_index.similarity(BREWING, BREWING + " fast"), 3)
+
+
+def test_remove_drops_bands(db):
+    first, second = _add(db, 1, BREWING, RITUALS_STUDENTS)
+    topic_index.remove(db, [first.id])
+    assert {band.calendar_id for band in db.query(TopicBand)} == {second.id}
@@ -0,0 +1,87 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import version_store
+from backend.db import Base
+from backend.models import ContentVersion
+
+
+def _body(intro: str, n: int = 40) -> str:
+    return intro + "\n" + "".join(f"Shared paragraph line {i}\n" for i in range(n))
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _bodies(db, calendar_id=1) -> dict:
+    versions = db.query(ContentVersion).filter(ContentVersion.calendar_id == calendar_id).all()
+    bodies = version_store.reconstruct_bodies(versions)
+    return {v.version_number: bodies[v.id] for v in versions}
+
+
+def test_add_version_keeps_legacy_full_rows_intact(db):
+    texts = {1: _body("old intro"), 2: _body("new intro\nmore new intro"), 3: _body("third intro")}
+    # Legacy database: every version stored in full
+    for n in (1, 2):
+        db.add(ContentVersion(calendar_id=1, version_number=n, body=texts[n], body_encoding=None if n == 1 else "full"))
+    db.commit()
+
+    version_store.add_version(db, ContentVersion(calendar_id=1, version_number=3, body=texts[3]))
+    db.commit()
+
+    assert _bodies(db) == texts
+    encodings = {v.version_number: v.body_encoding for v in db.query(ContentVersion)}
+    assert encodings[3] == "full" and encodings[1] != "full" and encodings[2] != "full"
+
+
+def test_add_version_demotes_latest_only(db):
+    texts = {n: _body(f"intro {n}") for n in range(1, 5)}
+    for n, text in texts.items():
+        version_store.add_version(db, ContentVersion(calendar_id=1, version_number=n, body=text))
+        db.commit()
+
+    assert _bodies(db) == texts
+    full = [v.version_number for v in db.query(ContentVersion) if v.body_encoding == "full"]
+    assert full == [4]
+
+
+def test_delta_or_zlib_whichever_is_smaller(db):
+    similar = _body("first")
+    unrelated = "".join(f"Completely different sentence number {i} here.\n" for i in range(40))
+    version_store.add_version(db, ContentVersion(calendar_id=1, version_number=1, body=similar))
+    version_store.add_version(db, ContentVersion(calendar_id=2, version_number=1, body=similar))
+    db.commit()
+    version_store.add_version(db, ContentVersion(calendar_id=1, version_number=2, body=_body("second")))
+    version_store.add_version(db, ContentVersion(calendar_id=2, version_number=2, body=unrelated))
+    db.commit()
+
+    old = {v.calendar_id: v for v in db.query(ContentVersion).filter(ContentVersion.version_number == 1)}
+    assert old[1].body_encoding == "delta"
+    assert old[2].body_encoding == "zlib"
+    assert _bodies(db, 1)[1] == similar and _bodies(db, 2)[1] == similar
+
+
+def test_compact_migrates_legacy_rows(db):
+    texts = {n: _body(f"intro {n}") for n in range(1, 4)}
+    for n, text in texts.items():
+        db.add(ContentVersion(calendar_id=1, version_number=n, body=text, body_encoding="full"))
+    db.commit()
+
+    stats = version_store.compact(db)
+    assert stats["versions"] == 3 and stats["bytes_after"] < stats["bytes_before"]
+    assert _bodies(db) == texts
+    # Compacting again changes nothing
+    version_store.compact(db)
+    assert _bodies(db) == texts
+
+    listed = {row["version_number"]: row["body"] for row in version_store.iter_versions(
+        db, [ContentVersion.version_number], include_body=True, batch_size=1
+    )}
+    assert listed == texts